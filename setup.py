@@ -13,7 +13,7 @@ def package_env(file_name, strict=False):
         return ''
 
 if __name__ == '__main__':
-    required = ['comtypes', 'retrying==1.3.3']
+    required = ['comtypes']
     if platform.system() == 'Darwin':
         required.append('atomac')
     setup(
@@ -27,10 +27,15 @@ if __name__ == '__main__':
                                find_packages('uisoup')],
         include_package_data=True,
         install_requires=required,
+        extras_require={
+            'geometry': ['numpy']
+        },
         zip_safe=False,
         entry_points={
             'console_scripts': [
-                'ui-inspector = uisoup.ui_inspector:main'
+                'ui-inspector = uisoup.ui_inspector:main',
+                'uisoup-bench = uisoup.bench.cli:main',
+                'uisoup-agent = uisoup.remote.agent:main'
             ]
         }
     )
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import logging
+import threading
+import unittest
+
+from uisoup import TooSaltyUISoupException
+from uisoup.utils.dispatcher import SerialExecutor
+
+
+class _RecordingHandler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class SerialExecutorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = SerialExecutor(name='uisoup-test')
+
+    def tearDown(self):
+        self.executor.stop(5)
+
+    def test_commands_are_executed_in_order(self):
+        calls = []
+        futures = [self.executor.submit(calls.append, i) for i in xrange(20)]
+        self.executor.flush(5)
+
+        self.assertEqual(calls, range(20))
+        self.assertTrue(all(future.done() for future in futures))
+
+    def test_exception_is_raised_by_result(self):
+        future = self.executor.submit(lambda: 1 / 0)
+
+        self.assertRaises(ZeroDivisionError, future.result, 5)
+        self.assertIsInstance(future.exception(5), ZeroDivisionError)
+
+    def test_flush_and_stop_from_worker_raise(self):
+        flush = self.executor.submit(self.executor.flush)
+        stop = self.executor.submit(self.executor.stop)
+
+        self.assertIsInstance(flush.exception(5), TooSaltyUISoupException)
+        self.assertIsInstance(stop.exception(5), TooSaltyUISoupException)
+
+    def test_failed_callback_is_logged(self):
+        handler = _RecordingHandler()
+        logger = logging.getLogger('uisoup.utils.dispatcher')
+        logger.addHandler(handler)
+        called = threading.Event()
+        # Worker waits, so callbacks are added before future is done.
+        release = threading.Event()
+        try:
+            future = self.executor.submit(release.wait, 5)
+            future.add_done_callback(lambda _: 1 / 0)
+            future.add_done_callback(lambda _: called.set())
+            release.set()
+            self.executor.flush(5)
+        finally:
+            logger.removeHandler(handler)
+
+        self.assertTrue(called.is_set())
+        self.assertEqual(len(handler.records), 1)
+        self.assertIs(handler.records[0].exc_info[0], ZeroDivisionError)
+
+
+if __name__ == '__main__':
+    unittest.main()
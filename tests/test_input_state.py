@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import unittest
+
+from uisoup.synth_soup.desktop import SynthDesktop
+from uisoup.utils.input_state import InputState
+
+
+class RecordingPosition(object):
+    """
+    Stand-in of OS cursor that records position queries.
+    """
+
+    def __init__(self, position=(0, 0)):
+        self.position = position
+        self.queries = 0
+
+    def __call__(self):
+        self.queries += 1
+        return self.position
+
+
+class InputStateTest(unittest.TestCase):
+
+    def test_fresh_shadow_saves_query_when_cursor_is_elsewhere(self):
+        state = InputState(resync_interval=60)
+        cursor = RecordingPosition((10, 10))
+        state.set_position(10, 10)
+
+        self.assertFalse(state.is_at(20, 20, cursor))
+        self.assertEqual(cursor.queries, 0)
+
+    def test_real_position_is_checked_before_move_is_skipped(self):
+        state = InputState(resync_interval=60)
+        cursor = RecordingPosition((10, 10))
+        state.set_position(10, 10)
+
+        self.assertTrue(state.is_at(10, 10, cursor))
+        self.assertEqual(cursor.queries, 1)
+
+        # Real user moved cursor away.
+        cursor.position = (300, 200)
+        self.assertFalse(state.is_at(10, 10, cursor))
+        self.assertEqual(state.get_position(cursor), (300, 200))
+
+    def test_stale_shadow_is_resynced(self):
+        state = InputState(resync_interval=0)
+        cursor = RecordingPosition((5, 6))
+        state.set_position(1, 1)
+
+        self.assertEqual(state.get_position(cursor), (5, 6))
+        self.assertEqual(cursor.queries, 1)
+
+    def test_held_buttons_and_keys(self):
+        state = InputState()
+        state.press_button('b1c')
+        state.press_key(0x10)
+        state.press_key(0x41)
+        state.press_key(0x10)
+        state.release_key(0x41)
+
+        self.assertEqual(state.held_buttons, set(['b1c']))
+        self.assertEqual(state.held_keys, [0x10])
+
+
+class ShadowMouseTest(unittest.TestCase):
+    """
+    Synthetic mouse records events sent to OS.
+    """
+
+    def setUp(self):
+        self.desktop = SynthDesktop(windows=1, fan_out=1, depth=1)
+        self.mouse = self.desktop.mouse
+
+    def _moves(self):
+        return [event for event in self.desktop.events if
+                event[2] == 'move']
+
+    def test_repeated_move_is_skipped(self):
+        self.mouse.move(100, 100)
+        self.mouse.move(100, 100)
+
+        self.assertEqual(len(self._moves()), 1)
+
+    def test_move_is_sent_after_user_moved_cursor(self):
+        self.mouse.move(100, 100)
+        # Real user moves cursor, shadow position is still fresh.
+        self.mouse._position = (400, 300)
+        self.mouse.move(100, 100)
+
+        self.assertEqual([event[3:] for event in self._moves()],
+                         [(100, 100), (100, 100)])
+
+
+if __name__ == '__main__':
+    unittest.main()
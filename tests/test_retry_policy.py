@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import unittest
+
+from uisoup.utils.retry_policy import RetryPolicy, CircuitBreaker, \
+    CircuitOpenError
+
+
+class TransientError(Exception):
+    pass
+
+
+class PermanentError(Exception):
+    pass
+
+
+class FakeTime(object):
+    """
+    Clock and sleep of policy, sleeping moves clock forward.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FlakyPrimitive(object):
+    """
+    Stand-in of backend primitive that fails given number of times.
+    """
+
+    def __init__(self, failures, error=TransientError):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def __call__(self, target):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error('failure %d' % self.calls)
+
+        return 'ok'
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.time = FakeTime()
+
+    def _policy(self, **options):
+        options.setdefault('max_attempts', 4)
+        options.setdefault('base_delay', 0.1)
+        options.setdefault('max_delay', 0.3)
+        options.setdefault('jitter', 0.0)
+        options.setdefault('failure_threshold', 2)
+        options.setdefault('reset_timeout', 10.0)
+
+        return RetryPolicy('test', transient=(TransientError,),
+                           sleep=self.time.sleep, clock=self.time.clock,
+                           **options)
+
+    def _stats(self, policy):
+        return dict(policy._counters)
+
+    def test_transient_failures_are_retried_with_backoff(self):
+        policy = self._policy()
+        primitive = FlakyPrimitive(3)
+
+        self.assertEqual(policy.call(primitive, (1,), target=1), 'ok')
+        self.assertEqual(primitive.calls, 4)
+        self.assertEqual(self.time.sleeps, [0.1, 0.2, 0.3])
+        stats = self._stats(policy)
+        self.assertEqual(stats['attempts'], 4)
+        self.assertEqual(stats['retries'], 3)
+        self.assertEqual(stats['failures'], 0)
+
+    def test_jitter_shortens_delays(self):
+        policy = self._policy(jitter=0.5, random=lambda: 1.0)
+
+        self.assertEqual(list(policy.delays()), [0.05, 0.1, 0.15])
+
+    def test_permanent_failure_is_not_retried(self):
+        policy = self._policy()
+        primitive = FlakyPrimitive(1, PermanentError)
+
+        self.assertRaises(PermanentError, policy.call, primitive, (1,),
+                          target=1)
+        self.assertEqual(primitive.calls, 1)
+        self.assertEqual(self.time.sleeps, [])
+        self.assertEqual(self._stats(policy)['permanent'], 1)
+
+    def test_deadline_stops_retries(self):
+        policy = self._policy(deadline=0.25)
+        primitive = FlakyPrimitive(10)
+
+        self.assertRaises(TransientError, policy.call, primitive, (1,),
+                          target=1)
+        self.assertEqual(self.time.sleeps, [0.1])
+        self.assertEqual(primitive.calls, 2)
+
+    def test_breaker_opens_after_failed_calls(self):
+        policy = self._policy(max_attempts=2)
+        primitive = FlakyPrimitive(100)
+
+        for _ in xrange(2):
+            self.assertRaises(TransientError, policy.call, primitive, (7,),
+                              target=lambda target: target)
+        calls = primitive.calls
+        self.assertRaises(CircuitOpenError, policy.call, primitive, (7,),
+                          target=lambda target: target)
+        self.assertEqual(primitive.calls, calls)
+        self.assertEqual(policy.breaker(7).state, CircuitBreaker.OPEN)
+        self.assertEqual(self._stats(policy)['rejected'], 1)
+
+        # Other targets are not affected.
+        self.assertEqual(policy.call(FlakyPrimitive(0), (8,),
+                                     target=lambda target: target), 'ok')
+
+    def test_breaker_closes_after_successful_trial_call(self):
+        policy = self._policy(max_attempts=1)
+        failing = FlakyPrimitive(2)
+
+        for _ in xrange(2):
+            self.assertRaises(TransientError, policy.call, failing, (7,),
+                              target=7)
+        self.time.now += 10.0
+        self.assertEqual(policy.breaker(7).state, CircuitBreaker.HALF_OPEN)
+        self.assertEqual(policy.call(failing, (7,), target=7), 'ok')
+        self.assertEqual(policy.breaker(7).state, CircuitBreaker.CLOSED)
+        self.assertEqual(policy._failing, {})
+
+    def test_breakers_of_idle_targets_are_forgotten(self):
+        policy = self._policy(max_attempts=1)
+        resolved = []
+
+        def target(key):
+            resolved.append(key)
+            return key
+
+        for _ in xrange(2):
+            self.assertRaises(TransientError, policy.call,
+                              FlakyPrimitive(1), (7,), target=target)
+        self.time.now += 20.5
+        del resolved[:]
+
+        self.assertEqual(policy.call(FlakyPrimitive(0), (8,),
+                                     target=target), 'ok')
+        self.assertEqual(resolved, [])
+        self.assertEqual(policy._failing, {})
+        self.assertNotIn(7, policy._breakers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import threading
+import unittest
+
+from uisoup import TooSaltyUISoupException
+from uisoup.synth_soup.desktop import SynthDesktop, SynthCallFailed
+from uisoup.synth_soup.synth_soup import SynthSoup
+from uisoup.utils.session import Session
+
+
+def _soup(**options):
+    options.setdefault('windows', 2)
+    options.setdefault('fan_out', 3)
+    options.setdefault('depth', 3)
+    options.setdefault('seed', 1)
+    options.setdefault('invisible_rate', 0)
+
+    return SynthSoup(SynthDesktop(**options))
+
+
+def _names(obj_element):
+    return [(event, el.acc_role_name, el.acc_raw_name) for event, el, _ in
+            obj_element._iterwalk()]
+
+
+class SynthSoupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.soup = _soup()
+        self.window = self.soup.get_window('Window 1')
+
+    def test_tree_is_generated_from_seed(self):
+        self.assertEqual(_names(_soup().get_window()),
+                         _names(self.soup.get_window()))
+        self.assertNotEqual(_names(_soup(seed=2).get_window()),
+                            _names(self.soup.get_window()))
+
+    def test_windows_are_found_by_wildcard_and_handle(self):
+        window = self.soup.get_window('Window*')
+        self.assertEqual(window.acc_role_name, u'frm')
+        self.assertIs(self.soup.get_window(window._node.node_id), window)
+        self.assertTrue(window.is_top_level_window)
+        self.assertFalse(self.soup.is_window_exists('Missing'))
+        self.assertRaises(TooSaltyUISoupException, self.soup.get_window,
+                          'Missing')
+
+    def test_find_and_findall(self):
+        obj_element = self.window.findall(only_visible=False)[-1]
+        name = obj_element.acc_name
+
+        found = self.window.find(only_visible=False,
+                                 c_name=obj_element.acc_c_name)
+        self.assertEqual(found.acc_c_name, obj_element.acc_c_name)
+        self.assertIn(obj_element, self.window.findall(
+            only_visible=False, name=name))
+        self.assertTrue(all(el.acc_role_name == u'btn' for el in
+                            self.window.findall(role_name='btn')))
+
+    def test_names_are_normalized(self):
+        obj_element = list(self.window)[0]
+        obj_element._node.name = u'Save\xa0As\u2014'
+
+        self.assertEqual(obj_element.acc_raw_name, u'Save\xa0As\u2014')
+        self.assertEqual(obj_element.acc_name, u'Save As-')
+        self.assertIs(self.window.find(only_visible=False,
+                                       name=u'Save\xa0As*'), obj_element)
+
+    def test_failed_find_carries_diagnostics_and_flight_log(self):
+        try:
+            self.window.find(name='No such element')
+        except TooSaltyUISoupException as ex:
+            self.assertTrue(ex.diagnostics.nodes_visited > 0)
+            self.assertEqual(ex.flight_log[-1].name, 'element.find')
+            self.assertIsNotNone(ex.flight_log[-1].error)
+        else:
+            self.fail('Element was found.')
+
+    def test_object_by_coordinates_is_topmost_leaf(self):
+        obj_element = self.window.findall(
+            only_visible=False, child_count=lambda x: x == 0)[0]
+        x, y, w, h = obj_element.acc_location
+
+        self.assertEqual(
+            self.soup.get_object_by_coordinates(x + w / 2, y + h / 2),
+            obj_element)
+
+    def test_failures_are_injected_per_primitive(self):
+        soup = _soup(failure_rate={'children': 1.0})
+        window = soup.get_window('Window 1')
+
+        self.assertRaises(SynthCallFailed, list, window)
+        self.assertEqual(window.acc_name, u'Window 1')
+        self.assertEqual(soup.desktop.calls['children'], 1)
+
+    def test_input_is_recorded(self):
+        obj_element = list(self.window)[0]
+        x, y, w, h = obj_element.acc_location
+        obj_element.click()
+        keyboard = self.soup.keyboard
+        keyboard.send(keyboard.codes.SHIFT.modify(keyboard.codes.RETURN))
+
+        events = list(self.soup.desktop.events)
+        self.assertIn(('mouse', 'b1c_click', x + w / 2, y + h / 2),
+                      [event[1:] for event in events])
+        self.assertEqual([event[2:] for event in events if
+                          event[1] == 'keyboard'],
+                         [('down', 0x10), ('down', 0x0D), ('up', 0x0D),
+                          ('up', 0x10)])
+
+
+class ElementPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.soup = _soup()
+
+    def test_wrappers_are_shared_by_thread_only(self):
+        window = self.soup.get_window('Window 1')
+        self.assertIs(self.soup.get_window('Window 1'), window)
+
+        result = []
+        thread = threading.Thread(
+            target=lambda: result.append(self.soup.get_window('Window 1')))
+        thread.start()
+        thread.join()
+
+        self.assertIsNot(result[0], window)
+        self.assertEqual(result[0], window)
+
+    def test_sessions_do_not_share_wrappers(self):
+        first = Session(['Window 1'], soup=self.soup)
+        second = Session(['Window 1'], soup=self.soup)
+
+        self.assertIsNot(first.get_window(), second.get_window())
+        self.assertEqual(first.get_window(), second.get_window())
+        self.assertIsNot(first.input_lock, second.input_lock)
+
+    def test_session_rejects_elements_of_other_windows(self):
+        session = Session(['Window 1'], soup=self.soup)
+        other = self.soup.get_window('Window 2')
+        x, y, w, h = other.acc_location
+        inside = session.get_window().acc_location
+
+        points = [(x + dx, y + dy) for dx in xrange(0, w, 7) for dy in
+                  xrange(0, h, 7) if not
+                  (inside[0] <= x + dx < inside[0] + inside[2] and
+                   inside[1] <= y + dy < inside[1] + inside[3])]
+        self.assertRaises(TooSaltyUISoupException,
+                          session.get_object_by_coordinates, *points[0])
+        self.assertFalse(session.is_window_exists('Window 2'))
+        self.assertEqual([window.acc_name for window in
+                          session.get_visible_window_list() if
+                          window.is_top_level_window], [u'Window 1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
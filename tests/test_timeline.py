@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import time
+import unittest
+from platform import system
+
+from uisoup.utils import timeline
+from uisoup.utils.timeline import Timeline
+
+
+class ClockTest(unittest.TestCase):
+
+    @unittest.skipIf(system() not in ('Linux', 'Darwin'),
+                     'Clock of OS is used on Linux and Mac OS only.')
+    def test_clock_is_not_wall_clock(self):
+        self.assertIsNot(timeline.clock, time.time)
+
+    def test_clock_follows_sleep(self):
+        start = timeline.clock()
+        time.sleep(.05)
+        elapsed = timeline.clock() - start
+
+        self.assertTrue(.04 <= elapsed < 1, elapsed)
+
+
+class TimelineTest(unittest.TestCase):
+
+    def test_events_are_dispatched_at_offsets(self):
+        calls = []
+        line = Timeline('test')
+        line.add(lambda: calls.append(timeline.clock()))
+        line.wait(.05)
+        line.add(lambda: calls.append(timeline.clock()))
+        line.dispatch()
+
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(.04 <= calls[1] - calls[0] < 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
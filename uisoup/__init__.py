@@ -17,20 +17,201 @@
 __author__ = 'f1ashhimself@gmail.com'
 
 
+import os
+import threading
+from importlib import import_module
 from platform import system
 
-uisoup = None
-
 
 class TooSaltyUISoupException(Exception):
-    pass
-
-if system() == 'Windows':
-    from uisoup.win_soup import WinSoup
-    uisoup = WinSoup()
-elif system() == 'Darwin':
-    from uisoup.mac_soup import MacSoup
-    uisoup = MacSoup()
-else:
-    raise TooSaltyUISoupException('We are sorry but we don\'t have UISoup '
-                                  'implementation for "%s" OS.' % system())
+    """
+    Base exception of uisoup. Carries last operations of flight recorder
+    and diagnostics of failed search if any.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.diagnostics = kwargs.pop('diagnostics', None)
+        super(TooSaltyUISoupException, self).__init__(*args, **kwargs)
+
+        from .utils.flight_recorder import FlightRecorder
+        # Buffer is copied when log is requested, expected failures e.g. in
+        # is_object_exists don't pay for it.
+        self._flight_mark = FlightRecorder.mark()
+        self._flight_log = None
+        self._flight_record_attached = False
+
+    def _attach_flight_record(self, record):
+        """
+        Extends flight log up to record of operation that raised exception.
+        Only the first record is attached, i.e. record of the innermost
+        traced operation.
+
+        Arguments:
+            - record: FlightRecord instance.
+
+        Returns:
+            - None
+        """
+
+        if self._flight_record_attached:
+            return
+
+        self._flight_record_attached = True
+        self._flight_mark = record
+        self._flight_log = None
+
+    @property
+    def flight_log(self):
+        """
+        Property for operations recorded before exception, oldest first.
+        """
+
+        if self._flight_log is None:
+            from .utils.flight_recorder import FlightRecorder
+            self._flight_log = FlightRecorder.snapshot(self._flight_mark) \
+                if self._flight_mark is not None else []
+
+        return self._flight_log
+
+    def dump(self):
+        """
+        Gets human readable report with message, search diagnostics and
+        last operations.
+
+        Arguments:
+            - None
+
+        Returns:
+            - string.
+        """
+
+        from .utils.flight_recorder import format_record
+
+        lines = [repr(self)]
+        if self.diagnostics is not None:
+            lines.append(str(self.diagnostics))
+        if self.flight_log:
+            lines.append('Last operations (oldest first):')
+            lines.extend('  ' + format_record(record) for record in
+                         self.flight_log)
+
+        return '\n'.join(lines)
+
+
+class _BackendRegistry(object):
+    """
+    Registry of soup implementations. Backend is resolved lazily on first
+    use: explicitly selected backend or UISOUP_BACKEND environment variable
+    or current OS name.
+    """
+
+    _backends = {
+        'windows': ('uisoup.win_soup', 'WinSoup'),
+        'darwin': ('uisoup.mac_soup', 'MacSoup'),
+        'synth': ('uisoup.synth_soup', 'SynthSoup'),
+        'remote': ('uisoup.remote', 'RemoteSoup')
+    }
+    _selected = None
+    _soup = None
+    _lock = threading.RLock()
+
+    @classmethod
+    def register(cls, name, module_name, class_name):
+        """
+        Registers backend.
+
+        Arguments:
+            - name: string, backend name.
+            - module_name: string, full name of module with soup class.
+            - class_name: string, name of soup class.
+
+        Returns:
+            - None
+        """
+
+        with cls._lock:
+            cls._backends[name.lower()] = (module_name, class_name)
+
+    @classmethod
+    def select(cls, name):
+        """
+        Selects backend, soup will be created on next use.
+
+        Arguments:
+            - name: string, backend name, if None default backend will be
+            used.
+
+        Returns:
+            - None
+        """
+
+        with cls._lock:
+            cls._selected = name.lower() if name else None
+            cls._soup = None
+
+    @classmethod
+    def get_name(cls):
+        """
+        Gets name of backend that is used.
+        """
+
+        return cls._selected or \
+            os.environ.get('UISOUP_BACKEND', '').lower() or system().lower()
+
+    @classmethod
+    def create(cls, name=None):
+        """
+        Creates new soup instance that is not shared with uisoup proxy.
+
+        Arguments:
+            - name: string, backend name, if None backend that is used will
+            be created.
+
+        Returns:
+            - Soup instance.
+        """
+
+        name = name.lower() if name else cls.get_name()
+        if name not in cls._backends:
+            raise TooSaltyUISoupException(
+                'We are sorry but we don\'t have UISoup '
+                'implementation for "%s" OS.' % name)
+        module_name, class_name = cls._backends[name]
+
+        return getattr(import_module(module_name), class_name)()
+
+    @classmethod
+    def get_soup(cls):
+        """
+        Gets soup instance of current backend.
+        """
+
+        if cls._soup is None:
+            with cls._lock:
+                if cls._soup is None:
+                    cls._soup = cls.create()
+
+        return cls._soup
+
+
+class _LazySoup(object):
+    """
+    Proxy to soup of current backend.
+    """
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        return getattr(_BackendRegistry.get_soup(), name)
+
+    def __repr__(self):
+        return '<uisoup proxy for "%s" backend>' % \
+            _BackendRegistry.get_name()
+
+
+register_backend = _BackendRegistry.register
+set_backend = _BackendRegistry.select
+get_soup = _BackendRegistry.get_soup
+create_soup = _BackendRegistry.create
+
+uisoup = _LazySoup()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+from ..utils import _Utils
+from ..utils.glob_matcher import GlobMatcher
+from ..utils.timeline import Timeline
+from ..utils.snapshot import Snapshot
+from ..synth_soup.desktop import SynthDesktop
+from ..synth_soup.element import SynthElement
+
+
+# Tree shapes: name -> (fan out, depth).
+SHAPES = {
+    'wide': (40, 2),
+    'balanced': (6, 4),
+    'deep': (2, 10)
+}
+
+CASES = []
+
+
+def case(name, uses_tree=True):
+    """
+    Registers benchmark case. Decorated function takes SynthDesktop
+    (or None if case does not use tree) and returns tuple of measured
+    callable and number of operations done by one call.
+    """
+
+    def decorator(func):
+        CASES.append((name, uses_tree, func))
+        return func
+
+    return decorator
+
+
+def make_desktop(shape, seed=0):
+    """
+    Creates synthetic desktop with one window of given shape.
+
+    Arguments:
+        - shape: string, name of shape from SHAPES.
+        - seed: int, seed of tree generator.
+
+    Returns:
+        - SynthDesktop instance.
+    """
+
+    fan_out, depth = SHAPES[shape]
+
+    return SynthDesktop(windows=1, fan_out=fan_out, depth=depth, seed=seed,
+                        invisible_rate=0)
+
+
+def _window(desktop):
+    return SynthElement(desktop, desktop.root.children[0])
+
+
+def _elements(desktop):
+    result = []
+    queue = [desktop.root.children[0]]
+    while queue:
+        node = queue.pop()
+        result.append(SynthElement(desktop, node))
+        queue.extend(node.children)
+
+    return result
+
+
+@case('convert_wildcard_to_regex', uses_tree=False)
+def convert_wildcard_to_regex(desktop):
+    patterns = [u'Open', u'Open*', u'*Open', u'*Open*', u'O?en*', u'*a*b*c',
+                u'Save ??', u'File*Edit*View*Help'] * 16
+
+    def func():
+        for pattern in patterns:
+            _Utils.convert_wildcard_to_regex(pattern)
+
+    return func, len(patterns)
+
+
+@case('glob_match', uses_tree=False)
+def glob_match(desktop):
+    patterns = [u'Open', u'Open*', u'*Open', u'*Open*', u'O?en*', u'*a*b*c',
+                u'Save ??', u'File*Edit*View*Help'] * 16
+    values = [u'Open', u'Open file', u'Save as', u'File Edit View Help',
+              u'a' * 256]
+
+    def func():
+        for pattern in patterns:
+            matcher = GlobMatcher.get(pattern)
+            for value in values:
+                matcher.match(value)
+
+    return func, len(patterns) * len(values)
+
+
+@case('match_string')
+def match_string(desktop):
+    elements = _elements(desktop)
+
+    def func():
+        for element in elements:
+            element._match(False, name=u'Open*', role_name=u'btn')
+
+    return func, len(elements)
+
+
+@case('match_lambda')
+def match_lambda(desktop):
+    elements = _elements(desktop)
+
+    def func():
+        for element in elements:
+            element._match(False, name=lambda x: x.startswith(u'Open'),
+                           role_name=lambda x: x == u'btn')
+
+    return func, len(elements)
+
+
+@case('finditer')
+def finditer(desktop):
+    def func():
+        # New window on every run, otherwise results of previous run are
+        # cached in the window.
+        list(_window(desktop)._finditer(False, c_name=u'btnNo such name'))
+
+    return func, len(_elements(desktop))
+
+
+@case('snapshot_findall')
+def snapshot_findall(desktop):
+    snapshot = Snapshot.capture(_window(desktop))
+
+    def func():
+        snapshot.findall(False, c_name=u'btnNo such name')
+
+    return func, len(snapshot) - 1
+
+
+@case('toxml')
+def toxml(desktop):
+    def func():
+        _window(desktop).toxml()
+
+    return func, len(_elements(desktop))
+
+
+@case('key_expansion', uses_tree=False)
+def key_expansion(desktop):
+    keyboard = SynthDesktop(windows=0).keyboard
+    kc = keyboard.codes
+    keys = [kc.CONTROL.modify(kc.SHIFT.modify(kc.KEY_S)),
+            kc.SHIFT.modify(kc.KEY_H), kc.KEY_E, kc.KEY_L, kc.KEY_L,
+            kc.KEY_O, kc.ALT.modify(kc.F4)] * 30
+
+    def func():
+        keyboard._compile_keys(Timeline('bench'), keys)
+
+    return func, len(keys)
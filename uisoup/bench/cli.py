@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+from . import runner
+from .cases import CASES, SHAPES, make_desktop
+
+
+def run_cases(case_names=None, shapes=None, warmup=3, repetitions=20,
+              log=None):
+    """
+    Runs benchmark cases.
+
+    Arguments:
+        - case_names: list of case names, if not defined all cases will be
+        run.
+        - shapes: list of shape names, if not defined all shapes will be
+        used.
+        - warmup: int, number of not measured runs.
+        - repetitions: int, number of measured runs.
+        - log: file-like object for progress messages.
+
+    Returns:
+        - dict with environment and list of results.
+    """
+
+    shapes = shapes or sorted(SHAPES)
+    results = []
+
+    for name, uses_tree, setup in CASES:
+        if case_names and name not in case_names:
+            continue
+        for shape in (shapes if uses_tree else [None]):
+            desktop = make_desktop(shape) if uses_tree else None
+            func, operations = setup(desktop)
+            result = runner.run(func, warmup, repetitions)
+            result.update({'case': name, 'shape': shape,
+                           'operations': operations})
+            result['per_operation_p50'] = \
+                result['stats']['p50'] / operations
+            results.append(result)
+
+            if log:
+                log.write('%-28s %-9s p50 %10.6fs  p90 %10.6fs  ops %d\n' % (
+                    name, shape or '-', result['stats']['p50'],
+                    result['stats']['p90'], operations))
+
+    return {'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.time(),
+            'results': results}
+
+
+def main(argv=None):
+    """
+    Runs microbenchmarks of matching and traversal hot paths.
+
+    Arguments:
+        - argv: list of command line arguments.
+
+    Returns:
+        - int, exit code.
+    """
+
+    parser = argparse.ArgumentParser(
+        description='Microbenchmarks of uisoup matching and traversal.')
+    parser.add_argument('--case', action='append', dest='cases',
+                        choices=[name for name, _, _ in CASES],
+                        help='case to run, may be repeated')
+    parser.add_argument('--shape', action='append', dest='shapes',
+                        choices=sorted(SHAPES),
+                        help='tree shape to use, may be repeated')
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', default=None,
+                        help='path to JSON file with results, by default '
+                             'results are written to stdout')
+    args = parser.parse_args(argv)
+
+    report = run_cases(args.cases, args.shapes, args.warmup, args.repeat,
+                       sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
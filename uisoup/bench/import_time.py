@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+
+# Statements which cold-start cost is guarded and their budgets in seconds
+# on top of bare interpreter start.
+DEFAULT_STATEMENTS = [
+    ('import uisoup', .05),
+    ('from uisoup.interfaces.i_keyboard import Key', .05),
+    ('from uisoup import ui_inspector', .05)
+]
+
+
+def measure(statement, repeat=5):
+    """
+    Measures cold-start cost of statement in fresh interpreters.
+
+    Arguments:
+        - statement: string, python statement.
+        - repeat: int, number of interpreter starts.
+
+    Returns:
+        - float, median time in seconds on top of bare interpreter start.
+    """
+
+    def run(code):
+        timings = []
+        for _ in xrange(repeat):
+            start = time.time()
+            subprocess.check_call([sys.executable, '-c', code])
+            timings.append(time.time() - start)
+
+        return sorted(timings)[len(timings) / 2]
+
+    return max(run(statement) - run('pass'), 0.0)
+
+
+def main(argv=None):
+    """
+    Runs import-time benchmark.
+
+    Arguments:
+        - argv: list of command line arguments.
+
+    Returns:
+        - int, exit code: 1 if some statement exceeds its budget
+        otherwise 0.
+    """
+
+    parser = argparse.ArgumentParser(
+        description='Guards cold-start cost of uisoup imports.')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of interpreter starts per statement')
+    parser.add_argument('--budget', type=float, default=None,
+                        help='budget in seconds for every statement')
+    parser.add_argument('--output', default=None,
+                        help='path to JSON file with results')
+    args = parser.parse_args(argv)
+
+    results = []
+    for statement, budget in DEFAULT_STATEMENTS:
+        budget = args.budget if args.budget is not None else budget
+        cost = measure(statement, args.repeat)
+        results.append({'statement': statement, 'seconds': cost,
+                        'budget': budget, 'ok': cost <= budget})
+        print '%-50s %.4fs (budget %.4fs)%s' % (
+            statement, cost, budget, '' if cost <= budget else ' EXCEEDED')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    return 0 if all(result['ok'] for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
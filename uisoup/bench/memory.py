@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import argparse
+import json
+import sys
+
+from ..interfaces.i_keyboard import Key
+from ..synth_soup.desktop import SynthDesktop
+from ..synth_soup.element import SynthElement
+
+
+class _DictObject(object):
+    """
+    Object that keeps attributes in instance dictionary.
+    """
+
+
+def _attribute_names(cls):
+    names = []
+    for klass in cls.__mro__:
+        for name in getattr(klass, '__slots__', ()):
+            if name not in ('__weakref__', '__dict__') and name not in names:
+                names.append(name)
+
+    return names
+
+
+def object_size(obj):
+    """
+    Gets size of object itself and its instance dictionary if it has one,
+    attribute values are not counted.
+
+    Arguments:
+        - obj: object.
+
+    Returns:
+        - int, size in bytes.
+    """
+
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+
+    return size
+
+
+def dict_layout_size(obj):
+    """
+    Gets size of the same object if its attributes were kept in instance
+    dictionary.
+
+    Arguments:
+        - obj: object.
+
+    Returns:
+        - int, size in bytes.
+    """
+
+    if hasattr(obj, '__dict__'):
+        return object_size(obj)
+
+    clone = _DictObject()
+    for name in _attribute_names(type(obj)):
+        if hasattr(obj, name):
+            setattr(clone, name, getattr(obj, name))
+
+    return object_size(clone)
+
+
+def make_objects(count):
+    """
+    Creates objects that are created in large numbers by crawls and key
+    sequence building.
+
+    Arguments:
+        - count: int, number of objects of every kind.
+
+    Returns:
+        - dict where key is kind name and value is list of objects.
+    """
+
+    # Tree of 10 windows with fan out 10 and depth 4 has 111111 nodes.
+    fan_out = 10
+    depth = 1
+    while (fan_out ** (depth + 1) - 1) / (fan_out - 1) * 10 < count:
+        depth += 1
+    desktop = SynthDesktop(windows=10, fan_out=fan_out, depth=depth,
+                           invisible_rate=0)
+
+    nodes = []
+    queue = list(desktop.root.children)
+    while queue and len(nodes) < count:
+        node = queue.pop()
+        nodes.append(node)
+        queue.extend(node.children)
+
+    kc = desktop.keyboard.codes
+    keys = [Key(i % 256) for i in xrange(count - count / 2)] + \
+        [kc.SHIFT.modify(kc.KEY_A) for _ in xrange(count / 2)]
+
+    return {'SynthNode': nodes,
+            'SynthElement': [SynthElement(desktop, node) for node in nodes],
+            'Key': keys}
+
+
+def measure(count=100000):
+    """
+    Measures memory taken by object layouts.
+
+    Arguments:
+        - count: int, number of objects of every kind.
+
+    Returns:
+        - list of dicts with kind, count, bytes per object now and with
+        instance dictionary layout and total saving in bytes.
+    """
+
+    results = []
+    for kind, objects in sorted(make_objects(count).items()):
+        size = sum(object_size(obj) for obj in objects)
+        dict_size = sum(dict_layout_size(obj) for obj in objects)
+        results.append({'kind': kind, 'count': len(objects),
+                        'bytes_per_object': float(size) / len(objects),
+                        'dict_bytes_per_object':
+                            float(dict_size) / len(objects),
+                        'saving_bytes': dict_size - size})
+
+    return results
+
+
+def main(argv=None):
+    """
+    Runs memory benchmark.
+
+    Arguments:
+        - argv: list of command line arguments.
+
+    Returns:
+        - int, exit code.
+    """
+
+    parser = argparse.ArgumentParser(
+        description='Measures memory taken by hot uisoup objects.')
+    parser.add_argument('--count', type=int, default=100000,
+                        help='number of objects of every kind')
+    parser.add_argument('--output', default=None,
+                        help='path to JSON file with results')
+    args = parser.parse_args(argv)
+
+    results = measure(args.count)
+    for result in results:
+        print '%-15s %7d objects %6.1f bytes/object (%6.1f with __dict__), ' \
+              'saved %.1f MB' % (result['kind'], result['count'],
+                                 result['bytes_per_object'],
+                                 result['dict_bytes_per_object'],
+                                 result['saving_bytes'] / 1024.0 / 1024.0)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import gc
+
+from ..utils.timeline import clock
+
+
+def percentile(sorted_values, percent):
+    """
+    Gets percentile of sorted values using nearest-rank method.
+
+    Arguments:
+        - sorted_values: list of sorted floats.
+        - percent: float, percent from 0 to 100.
+
+    Returns:
+        - float value.
+    """
+
+    if not sorted_values:
+        return None
+    rank = int(round(percent / 100.0 * (len(sorted_values) - 1)))
+
+    return sorted_values[rank]
+
+
+def summarize(timings):
+    """
+    Summarizes timings.
+
+    Arguments:
+        - timings: list of floats, timings in seconds.
+
+    Returns:
+        - dict with min, max, mean and percentiles.
+    """
+
+    values = sorted(timings)
+
+    return {'min': values[0],
+            'max': values[-1],
+            'mean': sum(values) / len(values),
+            'p50': percentile(values, 50),
+            'p90': percentile(values, 90),
+            'p99': percentile(values, 99)}
+
+
+def run(func, warmup=3, repetitions=20):
+    """
+    Runs benchmark function.
+
+    Arguments:
+        - func: callable without arguments, measured operation.
+        - warmup: int, number of not measured runs.
+        - repetitions: int, number of measured runs.
+
+    Returns:
+        - dict with warmup, repetitions and stats of timings in seconds.
+    """
+
+    for _ in xrange(warmup):
+        func()
+
+    timings = []
+    gc_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in xrange(repetitions):
+            start = clock()
+            func()
+            timings.append(clock() - start)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    return {'warmup': warmup,
+            'repetitions': repetitions,
+            'stats': summarize(timings)}
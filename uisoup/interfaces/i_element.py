@@ -16,13 +16,19 @@
 
 __author__ = 'f1ashhimself@gmail.com'
 
-import re
 from inspect import ismethod
 from types import FunctionType
 from abc import ABCMeta, abstractmethod, abstractproperty
-import xml.dom.minidom
 
-from ..utils import _Utils
+from ..utils.glob_matcher import GlobMatcher
+from ..utils.text_normalizer import TextNormalizer
+from ..utils.tracing import traced
+from ..utils.xml_writer import XmlTreeWriter
+from .. import TooSaltyUISoupException
+
+
+def _xml_text(value):
+    return unicode(value) if value else ''
 
 
 class IElement(object):
@@ -32,6 +38,10 @@ class IElement(object):
 
     __metaclass__ = ABCMeta
 
+    # Elements are created in large numbers by crawls, implementations
+    # should define __slots__ too.
+    __slots__ = ()
+
     @abstractmethod
     def click(self, x_offset=None, y_offset=None):
         """
@@ -147,10 +157,16 @@ class IElement(object):
     @abstractproperty
     def acc_name(self):
         """
-        Property for element name.
+        Property for element name normalized by TextNormalizer.
         Also need to specify setter for this property
         """
 
+    @abstractproperty
+    def acc_raw_name(self):
+        """
+        Property for element name as it is reported by OS.
+        """
+
     @abstractmethod
     def set_focus(self):
         """
@@ -295,43 +311,152 @@ class IElement(object):
             - True if object exists otherwise False.
         """
 
-    def toxml(self):
+    @abstractproperty
+    def identity(self):
+        """
+        Property for identity key of UI object, wrappers of the same object
+        have equal keys while object exists.
         """
-        Convert Element Tree to XML.
+
+    @abstractmethod
+    def is_alive(self):
+        """
+        Verifies is UI object still exists.
 
         Arguments:
             - None
 
+        Returns:
+            - True if object exists otherwise False.
+        """
+
+    def _refresh(self, element):
+        """
+        Takes state of fresh wrapper of the same UI object. It is called when
+        pooled wrapper is handed out by new lookup: UI object could change
+        since caches were filled and fresh wrapper holds live reference to
+        it. Caches are replaced, not cleared, so iteration over old ones is
+        not broken.
+
+        Arguments:
+            - element: IElement instance of the same type and identity.
+
         Returns:
             - None
         """
 
-        obj_document = xml.dom.minidom.Document()
-        lst_queue = [(self, obj_document)]
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
 
-        while lst_queue:
-            obj_element, obj_tree = lst_queue.pop(0)
-            role_name = obj_element.acc_role_name
-            obj_name = obj_element.acc_name
-            str_name = unicode(obj_name) if obj_name else ''
-            str_location = ','.join(str(x) for x in obj_element.acc_location)
-            obj_sub_tree = xml.dom.minidom.Element(role_name)
-            obj_sub_tree.ownerDocument = obj_document
+        return self.identity == other.identity
 
-            try:
-                obj_sub_tree.attributes['Name'] = str_name
-            except:
-                obj_sub_tree.attributes['Name'] = \
-                    str_name.encode('unicode-escape')
+    def __ne__(self, other):
+        result = self.__eq__(other)
 
-            obj_sub_tree.attributes['Location'] = str_location
-            obj_tree.appendChild(obj_sub_tree)
+        return result if result is NotImplemented else not result
 
-            if obj_element.acc_child_count:
-                for obj_element_child in obj_element:
-                    lst_queue.append((obj_element_child, obj_sub_tree))
+    def __hash__(self):
+        return hash(self.identity)
 
-        return obj_document.toprettyxml()
+    def _iterwalk(self, max_depth=None):
+        """
+        Walks element tree depth-first without building it in memory. Only
+        children lists of elements on current path are kept.
+
+        Arguments:
+            - max_depth: int, maximal depth of walk, if not defined whole
+            tree will be walked.
+
+        Returns:
+            - Yield tuples (event, element, depth) where event is 'start' or
+            'end', depth of this element is 0.
+        """
+
+        yield 'start', self, 0
+        stack = [(self, self._iterchildren(self, max_depth, 0))]
+
+        while stack:
+            obj_element, obj_children = stack[-1]
+            obj_child = next(obj_children, None)
+            if obj_child is None:
+                stack.pop()
+                yield 'end', obj_element, len(stack)
+                continue
+
+            depth = len(stack)
+            yield 'start', obj_child, depth
+            stack.append(
+                (obj_child, self._iterchildren(obj_child, max_depth, depth)))
+
+    @staticmethod
+    def _iterchildren(obj_element, max_depth, depth):
+        if max_depth is not None and depth >= max_depth:
+            return iter(())
+        try:
+            if not obj_element.acc_child_count:
+                return iter(())
+            return iter(list(obj_element))
+        except Exception:
+            # Element disappeared or does not allow to read its children.
+            return iter(())
+
+    # Readers of element fields available in XML.
+    _XML_FIELDS = {
+        'Name': lambda el: _xml_text(el.acc_name),
+        'Location': lambda el: ','.join(str(x) for x in el.acc_location),
+        'Value': lambda el: _xml_text(el.acc_value),
+        'Description': lambda el: _xml_text(el.acc_description),
+        'ChildCount': lambda el: str(el.acc_child_count)
+    }
+    _XML_DEFAULT_FIELDS = ('Name', 'Location')
+
+    @traced('element.toxml')
+    def toxml(self, stream=None, fields=None, max_depth=None,
+              encoding='utf-8'):
+        """
+        Convert Element Tree to XML. Tree is written while it is walked, so
+        only current path is kept in memory.
+
+        Arguments:
+            - stream: file-like object, if defined XML is written to it
+            otherwise returned as string.
+            - fields: list of attribute names from Name, Location, Value,
+            Description and ChildCount, by default Name and Location are
+            used.
+            - max_depth: int, maximal depth of tree, if not defined whole
+            tree will be converted.
+            - encoding: string, encoding of XML written to stream.
+
+        Returns:
+            - String with XML if stream is not defined otherwise None.
+        """
+
+        fields = fields or self._XML_DEFAULT_FIELDS
+        unknown_fields = set(fields) - set(self._XML_FIELDS)
+        if unknown_fields:
+            raise TooSaltyUISoupException(
+                'Unknown XML fields: %s.' % ', '.join(sorted(unknown_fields)))
+        readers = [(field, self._XML_FIELDS[field]) for field in fields]
+
+        if stream is None:
+            chunks = []
+            writer = XmlTreeWriter(chunks.append)
+        else:
+            writer = XmlTreeWriter(stream.write, encoding=encoding)
+
+        writer.start_document()
+        for event, obj_element, _ in self._iterwalk(max_depth):
+            if event == 'end':
+                writer.end_element()
+                continue
+
+            tag = obj_element.acc_role_name
+            writer.start_element(tag, dict((field, reader(obj_element)) for
+                                           field, reader in readers))
+
+        if stream is None:
+            return ''.join(chunks)
 
     def __str__(self):
         result = '[Role: %s(0x%X) | Name: %r | Child count: %d]' % \
@@ -342,6 +467,20 @@ class IElement(object):
 
         return result
 
+    @property
+    def _normalized_name(self):
+        """
+        Property for name normalized by TextNormalizer, acc_name of
+        implementations returns it. Implementations keep raw and normalized
+        name in _name slot, so name is normalized once while it is not
+        changed.
+        """
+
+        self._name = TextNormalizer.normalize_pair(self._name,
+                                                   self.acc_raw_name or '')
+
+        return self._name[1]
+
     def _match(self, only_visible, **kwargs):
         """
         Match method.
@@ -363,6 +502,25 @@ class IElement(object):
             - True if element was matched otherwise False.
         """
 
+        return self._match_criteria(only_visible,
+                                    TextNormalizer.normalize_criteria(kwargs))
+
+    def _match_criteria(self, only_visible, kwargs, diagnostics=None):
+        """
+        Matches element with search criteria.
+
+        Arguments:
+            - only_visible: bool, flag that indicates will we search only
+            through visible elements.
+            - kwargs: dict of search criteria normalized by
+            TextNormalizer.normalize_criteria, see _match.
+            - diagnostics: SearchDiagnostics instance that records names
+            read while matching.
+
+        Returns:
+            - True if element was matched otherwise False.
+        """
+
         try:
             if only_visible and not self.is_visible:
                 return False
@@ -371,13 +529,15 @@ class IElement(object):
                 attr = getattr(self, 'acc_' + str_property)
                 if ismethod(attr):
                     attr = attr()
+                if diagnostics is not None and \
+                        str_property == diagnostics.criterion:
+                    diagnostics.sample(attr)
 
                 if type(expected_result) is FunctionType:
                     if not expected_result(attr):
                         return False
                 else:
-                    regex = _Utils.convert_wildcard_to_regex(expected_result)
-                    if not re.match(regex, attr):
+                    if not GlobMatcher.get(expected_result).match(attr):
                         return False
         except:
             return False
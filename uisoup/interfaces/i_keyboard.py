@@ -25,6 +25,8 @@ class Key(object):
     """Decorator class to specify modifier key relations.
     """
 
+    __slots__ = ('code', 'children')
+
     def __init__(self, hex_key_code):
         self.code = hex_key_code
         self.children = None
@@ -46,11 +48,51 @@ class Key(object):
         modified_key_press.children = args
         return modified_key_press
 
+    def to_data(self):
+        """Converts Key to JSON friendly data.
+
+        Arguments:
+            - None
+
+        Returns:
+            - int key code or list of key code and list of children data.
+        """
+
+        if self.children:
+            return [self.code, [child.to_data() for child in self.children]]
+
+        return self.code
+
+    @classmethod
+    def from_data(cls, data):
+        """Creates Key from data made by Key.to_data.
+
+        Arguments:
+            - data: int key code or list of key code and children data.
+
+        Returns:
+            - Key instance.
+        """
+
+        if isinstance(data, list):
+            code, children = data
+            return cls(code).modify(*[cls.from_data(child) for child in
+                                      children])
+
+        return cls(data)
+
 
 class IKeyboard(object):
 
     __metaclass__ = ABCMeta
 
+    # For key combinations timeout is needed to be processed.
+    _KEY_COMBO_TIMEOUT = .05
+    # Timeout between modifier key press and modified keys.
+    _MODIFIER_TIMEOUT = 0
+    # InputState instance shared with mouse of the same backend.
+    _state = None
+
     @abstractproperty
     def codes(self):
         """
@@ -103,3 +145,46 @@ class IKeyboard(object):
         Returns:
             - None
         """
+
+    def _compile_keys(self, timeline, keys, delay=0):
+        """Compiles key events as specified by Keys to timeline.
+
+        If Key contains children Keys they will be recursively
+        compiled with current Key code pressed as a modifier key.
+
+        Arguments:
+            - timeline: Timeline instance.
+            - keys: list of Keys.
+            - delay: float, delay between keys in seconds.
+        Returns:
+            - None
+        """
+
+        for key in keys:
+            if key.children:
+                timeline.add(self.press_key_and_hold, key.code)
+                timeline.wait(self._MODIFIER_TIMEOUT)
+                self._compile_keys(timeline, key.children)
+                timeline.add(self.release_key, key.code)
+            else:
+                timeline.add(self.press_key, key.code)
+            timeline.wait(self._KEY_COMBO_TIMEOUT)
+            timeline.wait(delay)
+
+    def release_held_keys(self, key_codes=None):
+        """Releases keys that are held according to input state, e.g. stuck
+        modifiers after interrupted key sequence.
+
+        Arguments:
+            - key_codes: list of integer key codes to release, if not
+            defined all held keys will be released.
+        Returns:
+            - None
+        """
+
+        held_keys = self._state.held_keys
+        if key_codes is not None:
+            held_keys = [code for code in held_keys if code in key_codes]
+
+        for key_code in reversed(held_keys):
+            self.release_key(key_code)
@@ -16,8 +16,11 @@
 
 __author__ = 'f1ashhimself@gmail.com'
 
+import threading
 from abc import ABCMeta, abstractmethod, abstractproperty
 
+from ..utils.dispatcher import InputDispatcher
+
 
 class ISoup(object):
     """
@@ -26,6 +29,9 @@ class ISoup(object):
 
     __metaclass__ = ABCMeta
 
+    _dispatcher = None
+    _dispatcher_lock = threading.Lock()
+
     @abstractproperty
     def mouse(self):
         """
@@ -38,6 +44,32 @@ class ISoup(object):
         Instance of IKeyboard implementation.
         """
 
+    @property
+    def dispatcher(self):
+        """
+        InputDispatcher that executes mouse and keyboard commands of this
+        soup in order on a single worker thread. Direct calls of mouse and
+        keyboard are not ordered with its commands.
+        """
+
+        with self._dispatcher_lock:
+            if self._dispatcher is None:
+                self._dispatcher = InputDispatcher(self.mouse, self.keyboard)
+
+        return self._dispatcher
+
+    def init_thread(self):
+        """
+        Prepares current thread to work with this soup. Should be called in
+        every thread except main one before soup or its elements are used.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
     @abstractmethod
     def get_object_by_coordinates(self, x, y):
         """
@@ -19,10 +19,17 @@ __author__ = 'f1ashhimself@gmail.com'
 from ..interfaces.i_element import IElement
 import atomac
 from ..utils.mac_utils import MacUtils
+from ..utils.instrumentation import Instrumentation, primitive
+from ..utils.tracing import traced
+from ..utils.element_pool import ElementPool
+from ..utils.ax_selector import AXSelector, match_value
+from ..utils.flight_recorder import SearchDiagnostics
+from ..utils.text_normalizer import TextNormalizer
 from .. import TooSaltyUISoupException
 from .mouse import MacMouse
 
 
+@Instrumentation.register
 class MacElement(IElement):
 
     _acc_role_name_map = {
@@ -63,6 +70,9 @@ class MacElement(IElement):
 
     _mouse = MacMouse()
 
+    __slots__ = ('_element', '_proc_name', '_proc_id', '_cached_children',
+                 '_cached_properties', '_name', '__weakref__')
+
     def __init__(self, atomac_object, process_name, process_id):
         """
         Constructor.
@@ -78,50 +88,62 @@ class MacElement(IElement):
         self._proc_id = process_id
         self._cached_children = set()
         self._cached_properties = None
+        # Raw and normalized name.
+        self._name = None
 
-    def _parse_c_name(self, **kwargs):
+    def _property(self, name, default=None):
         """
-        Used for back compatibility if 'find' or 'finall' method calls
-        witn 'c_name' parameter like 'typeTitle' ('btnOpen')
+        Gets element attribute. Attribute is read on first use and cached
+        until element is changed by action, so matching reads only
+        attributes its criteria need.
 
         Arguments:
-            - param kwargs
+            - name: string, attribute name.
+            - default: value returned if element has no such attribute.
+
         Returns:
-            - updated kwargs
+            - attribute value.
         """
-        axrole = axtitle = None
-        c_name = kwargs.pop('c_name', '')
-        for k, rolename in enumerate(self._acc_role_name_map):
-            if c_name.startswith(self._acc_role_name_map[rolename]):
-                axrole = rolename
-                axtitle = c_name[len(self._acc_role_name_map[rolename]):]
-                break
-        if axrole:
-            kwargs['AXRole'] = axrole
-        if axtitle:
-            kwargs['AXTitle'] = axtitle
-        return kwargs
 
-    @property
-    def _properties(self):
+        if self._cached_properties is None:
+            self._cached_properties = {}
+        try:
+            value = self._cached_properties[name]
+        except KeyError:
+            value = self._cached_properties[name] = self._read_attribute(name)
+
+        return default if value is None else value
+
+    @primitive('ax.getAttribute')
+    def _read_attribute(self, name):
         """
-        Gets all element properties.
+        Reads element attribute.
+
+        Arguments:
+            - name: string, attribute name.
+
+        Returns:
+            - attribute value or None if attribute is unsupported.
         """
 
-        if not self._cached_properties:
-            event_descriptors_list = self._element.getAttributes()
+        try:
+            return getattr(self._element, name)
+        except (atomac._a11y.ErrorUnsupported, AttributeError):
+            return None
+
+    @primitive('ax.findFirstR')
+    def _find_first(self, **kwargs):
+        return self._element.findFirstR(**kwargs)
 
-            # Unpacking properties to dict.
-            el_properties = dict()
-            for prop in event_descriptors_list:
-                try:
-                    prop_value = getattr(self._element, prop)
-                except atomac._a11y.ErrorUnsupported:
-                    prop_value = None
-                el_properties[prop] = prop_value
+    def _find_iter(self, **kwargs):
+        # atomac findAllR collects whole subtree before it returns, generator
+        # it is built on yields matched elements while tree is walked. The
+        # generator is private to atomac, public call is used if it is gone.
+        generate = getattr(self._element, '_generateFindR', None)
+        if generate is None:
+            return iter(self._element.findAllR(**kwargs) or [])
 
-            self._cached_properties = el_properties
-        return self._cached_properties
+        return generate(**kwargs)
 
     @property
     def _role(self):
@@ -129,8 +151,9 @@ class MacElement(IElement):
         Property for element role.
         """
 
-        return self._properties.get('AXRole', None)
+        return self._property('AXRole')
 
+    @primitive('ax.windowsR')
     def _find_windows_by_same_proc(self):
         """
         Find window by same process id.
@@ -146,6 +169,7 @@ class MacElement(IElement):
         app.activate()
         return app.windowsR()
 
+    @traced('element.click')
     def click(self, x_offset=None, y_offset=None):
         x, y, w, h = self.acc_location
         x += x_offset if x_offset is not None else int(w / 2)
@@ -154,6 +178,7 @@ class MacElement(IElement):
         self._mouse.click(x, y)
         self._cached_properties = None
 
+    @traced('element.right_click')
     def right_click(self, x_offset=None, y_offset=None):
         x, y, w, h = self.acc_location
         x += x_offset if x_offset is not None else w / 2
@@ -162,6 +187,7 @@ class MacElement(IElement):
         self._mouse.click(x, y, self._mouse.RIGHT_BUTTON)
         self._cached_properties = None
 
+    @traced('element.double_click')
     def double_click(self, x_offset=None, y_offset=None, click_interval=0.5):
         x, y, w, h = self.acc_location
         x += x_offset if x_offset is not None else w / 2
@@ -170,6 +196,7 @@ class MacElement(IElement):
         self._mouse.double_click(x, y, click_interval=click_interval)
         self._cached_properties = None
 
+    @traced('element.drag_to')
     def drag_to(self, x, y, x_offset=None, y_offset=None, smooth=True):
         el_x, el_y, el_w, el_h = self.acc_location
         el_x += x_offset if x_offset is not None else el_w / 2
@@ -184,13 +211,13 @@ class MacElement(IElement):
 
     @property
     def is_top_level_window(self):
-        return self._properties.get('AXParent', 'false') == 'false'
+        return self._property('AXParent', 'false') == 'false'
 
     @property
     def is_selected(self):
         result = False
         if self.acc_role_name == self._acc_role_name_map['AXRadioButton'] and \
-                self._properties.get('AXValue', 'false') == 'true':
+                self._property('AXValue', 'false') == 'true':
             result = True
 
         return result
@@ -199,7 +226,7 @@ class MacElement(IElement):
     def is_checked(self):
         result = False
         if self.acc_role_name == self._acc_role_name_map['AXCheckBox'] and \
-                self._properties.get('AXValue', 'false') == 'true':
+                self._property('AXValue', 'false') == 'true':
             result = True
 
         return result
@@ -210,9 +237,10 @@ class MacElement(IElement):
 
     @property
     def is_enabled(self):
-        return bool(self._properties.get('AXEnabled', False))
+        return bool(self._property('AXEnabled', False))
 
     @property
+    @primitive('ax.AXParent.chain')
     def acc_parent_count(self):
         result = 0
         current = self._element
@@ -226,25 +254,30 @@ class MacElement(IElement):
 
     @property
     def acc_child_count(self):
-        return len(self._properties.get('AXChildren'))
+        return len(self._property('AXChildren') or [])
 
     @property
     def acc_name(self):
-        result = self._properties.get('AXDescription') or \
-            self._properties.get('AXTitle') or \
-            self._properties.get('AXValue')
+        return self._normalized_name
 
-        return MacUtils.replace_inappropriate_symbols(result or '')
+    @property
+    def acc_raw_name(self):
+        return self._property('AXDescription') or \
+            self._property('AXTitle') or \
+            self._property('AXValue') or ''
 
+    @traced('element.set_focus')
     def set_focus(self):
         MacUtils.ApplescriptExecutor.set_element_attribute_value(
             self._object_selector, 'AXFocused', 'true', self._proc_name, False)
 
     @property
     def acc_c_name(self):
-        return self.acc_role_name + self.acc_name if self.acc_name else ''
+        name = self.acc_name
+        return self.acc_role_name + name if name else ''
 
     @property
+    @primitive('ax.AXPosition.AXSize')
     def acc_location(self):
         x, y = self._element.AXPosition
         w, h = self._element.AXSize
@@ -253,8 +286,9 @@ class MacElement(IElement):
 
     @property
     def acc_value(self):
-        return self._properties.get('AXValue', None)
+        return self._property('AXValue')
 
+    @traced('element.set_value')
     def set_value(self, value):
         MacUtils.ApplescriptExecutor.set_element_attribute_value(
             self._object_selector, 'AXValue', value, self._proc_name)
@@ -262,22 +296,22 @@ class MacElement(IElement):
 
     @property
     def acc_description(self):
-        return self._properties.get('AXDescription', None)
+        return self._property('AXDescription')
 
     @property
     def acc_parent(self):
         result = None
         if self.acc_parent_count > 0:
-            result = \
+            result = ElementPool.intern(
                 MacElement(self._element.AXParent,
                            self._proc_name,
-                           self._proc_id)
+                           self._proc_id))
 
         return result
 
     @property
     def acc_selection(self):
-        return self._properties.get('AXSelectedText', None)
+        return self._property('AXSelectedText')
 
     @property
     def acc_focused_element(self):
@@ -285,42 +319,113 @@ class MacElement(IElement):
 
         result = None
         for element in childs:
-            if self._properties.get('AXFocused', 'false') == 'true':
+            if self._property('AXFocused', 'false') == 'true':
                 result = element
                 break
 
         return result
 
     def __iter__(self):
-        pass
+        for child in self._property('AXChildren') or []:
+            yield ElementPool.intern(
+                MacElement(child, self._proc_name, self._proc_id))
 
     @property
     def acc_role_name(self):
         return self._acc_role_name_map.get(self._role, 'unknown')
 
-    def find(self, **kwargs):
-        kwargs = self._parse_c_name(**kwargs)
-        result = self._element.findFirstR(**kwargs)
+    def __findcacheiter(self, only_visible, **kwargs):
+        """
+        Find child element in the cache.
 
-        if not result:
-            attrs = ['%s=%s' % (k, v) for k, v in kwargs.iteritems()]
-            raise TooSaltyUISoupException(
-                'Can\'t find object with attributes "%s".' %
-                '; '.join(attrs))
-        return MacElement(result, self._proc_name, self.proc_id)
+        Arguments:
+            - only_visible: bool, flag that indicates will we search only
 
-    def findall(self, only_visible=True, **kwargs):
-        kwargs = self._parse_c_name(**kwargs)
-        result = self._element.findAllR(**kwargs)
+        Returns:
+            - Yield found element.
+        """
+
+        kwargs = TextNormalizer.normalize_criteria(kwargs)
+        attributes = dict((name, expected) for name, expected in
+                          kwargs.items() if name.startswith('AX'))
+        residual = dict((name, expected) for name, expected in
+                        kwargs.items() if name not in attributes)
+        # Cache is copied, search that runs meanwhile adds elements to it.
+        for obj_element in tuple(self._cached_children):
+            if obj_element._match_attributes(attributes) and \
+                    obj_element._match_criteria(only_visible, residual):
+                yield obj_element
+
+    def _search(self, only_visible, kwargs, first):
+        """
+        Searches elements natively by part of criteria atomac can match and
+        checks residual criteria on found elements.
+
+        Arguments:
+            - only_visible: bool, flag that indicates will we search only
+            through visible elements.
+            - kwargs: search criteria.
+            - first: bool, if True search stops on first element.
+
+        Returns:
+            - list of found elements.
+        """
+
+        selector = AXSelector(kwargs, self._acc_role_name_map)
+        diagnostics = SearchDiagnostics(kwargs)
+
+        result = []
+        if selector.impossible:
+            pass
+        elif first and not selector.has_residual:
+            found = self._find_first(**selector.native)
+            if found:
+                obj_element = ElementPool.intern(
+                    MacElement(found, self._proc_name, self.proc_id))
+                self._cached_children.add(obj_element)
+                result.append(obj_element)
+        else:
+            # Candidates are walked lazily, find stops on first match. atomac
+            # doesn't report depth of candidates, only they are counted.
+            for ax_element in self._find_iter(**selector.native):
+                obj_element = ElementPool.intern(
+                    MacElement(ax_element, self._proc_name, self.proc_id))
+                self._cached_children.add(obj_element)
+                diagnostics.visit()
+                if obj_element._match_attributes(selector.attributes) and \
+                        obj_element._match_criteria(only_visible,
+                                                    selector.residual,
+                                                    diagnostics):
+                    result.append(obj_element)
+                    if first:
+                        break
 
         if not result:
+            diagnostics.finish()
             attrs = ['%s=%s' % (k, v) for k, v in kwargs.iteritems()]
             raise TooSaltyUISoupException(
                 'Can\'t find object with attributes "%s".' %
-                '; '.join(attrs))
-        if not isinstance(result, list):
-            result = [result]
-        return [MacElement(r, self._proc_name, self.proc_id) for r in result]
+                '; '.join(attrs), diagnostics=diagnostics)
+
+        return result
+
+    def _match_attributes(self, attributes):
+        for name, expected in attributes.items():
+            if not match_value(expected, self._property(name)):
+                return False
+
+        return True
+
+    @traced('element.find')
+    def find(self, only_visible=True, **kwargs):
+        try:
+            return self.__findcacheiter(only_visible, **kwargs).next()
+        except StopIteration:
+            return self._search(only_visible, kwargs, True)[0]
+
+    @traced('element.findall')
+    def findall(self, only_visible=True, **kwargs):
+        return self._search(only_visible, kwargs, False)
 
     def is_object_exists(self, **kwargs):
         try:
@@ -328,3 +433,21 @@ class MacElement(IElement):
             return True
         except TooSaltyUISoupException:
             return False
+
+    @property
+    def identity(self):
+        # atomac compares and hashes elements by CFEqual and CFHash.
+        return self._proc_id, self._element
+
+    def _refresh(self, element):
+        self._element = element._element
+        self._cached_children = set()
+        self._cached_properties = None
+
+    def is_alive(self):
+        try:
+            self._element.getAttributes()
+        except atomac._a11y.Error:
+            return False
+
+        return True
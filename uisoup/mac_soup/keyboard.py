@@ -18,13 +18,18 @@ __author__ = 'alex.jakovenko@gmail.com'
 
 from Quartz import CoreGraphics as CG
 
-from time import sleep
-
 from ..interfaces.i_keyboard import Key, IKeyboard
+from ..utils.timeline import Timeline
+from ..utils.instrumentation import Instrumentation, primitive
+from ..utils.tracing import traced
+from .mouse import MacMouse
 
 
+@Instrumentation.register
 class MacKeyboard(IKeyboard):
 
+    _MODIFIER_TIMEOUT = .05
+
     class _KeyCodes(object):
         """ Holder for Macintosh keyboard codes stored as Keys.
         """
@@ -133,6 +138,7 @@ class MacKeyboard(IKeyboard):
         OEM_7 = Key(0x27)  # For the US standard keyboard, the ''"' key
 
     codes = _KeyCodes
+    _state = MacMouse._state
 
     def press_key(self, hex_key_code):
         """Presses (and releases) key specified by a hex code.
@@ -147,6 +153,7 @@ class MacKeyboard(IKeyboard):
         self.press_key_and_hold(hex_key_code)
         self.release_key(hex_key_code)
 
+    @primitive('quartz.CGEventPost')
     def press_key_and_hold(self, hex_key_code):
         """Presses (and holds) key specified by a hex code.
 
@@ -160,7 +167,9 @@ class MacKeyboard(IKeyboard):
         CG.CGEventPost(
             CG.kCGSessionEventTap,
             CG.CGEventCreateKeyboardEvent(None, hex_key_code, True))
+        self._state.press_key(hex_key_code)
 
+    @primitive('quartz.CGEventPost')
     def release_key(self, hex_key_code):
         """Releases key specified by a hex code.
 
@@ -174,7 +183,9 @@ class MacKeyboard(IKeyboard):
         CG.CGEventPost(
             CG.kCGSessionEventTap,
             CG.CGEventCreateKeyboardEvent(None, hex_key_code, False))
+        self._state.release_key(hex_key_code)
 
+    @traced('keyboard.send')
     def send(self, *args, **kwargs):
         """Send key events as specified by Keys.
 
@@ -187,20 +198,13 @@ class MacKeyboard(IKeyboard):
             - None
         """
 
-        delay = kwargs.get('delay', 0)
-
-        for key in args:
-            if key.children:
-                self.press_key_and_hold(key.code)
-                self._wait_for_key_combo_to_be_processed()
-                self.send(*key.children)
-                self.release_key(key.code)
-            else:
-                self.press_key(key.code)
-            self._wait_for_key_combo_to_be_processed()
-            sleep(delay)
-
-    def _wait_for_key_combo_to_be_processed(self):
-        # For key combinations timeout is needed to be processed.
-        # This method is expressive shortcut to be used where needed.
-        sleep(.05)
+        held_keys = self._state.held_keys
+        timeline = Timeline('send')
+        self._compile_keys(timeline, args, kwargs.get('delay', 0))
+        try:
+            timeline.dispatch()
+        finally:
+            # Modifiers pressed by this sequence should not stay stuck if
+            # dispatching was interrupted.
+            self.release_held_keys([code for code in self._state.held_keys
+                                    if code not in held_keys])
@@ -18,25 +18,61 @@
 __author__ = 'f1ashhimself@gmail.com'
 
 import sys
-import re
 
 from Quartz import CoreGraphics as CG
 import atomac
 
 from ..interfaces.i_soup import ISoup
 from ..utils.mac_utils import MacUtils
+from ..utils.glob_matcher import GlobMatcher
+from ..utils.instrumentation import Instrumentation, primitive
+from ..utils.tracing import traced
+from ..utils.element_pool import ElementPool
 from .element import MacElement
 from .mouse import MacMouse
 from .keyboard import MacKeyboard
 from .. import TooSaltyUISoupException
 
 
+@Instrumentation.register
 class MacSoup(ISoup):
 
     mouse = MacMouse()
     keyboard = MacKeyboard()
     _default_sys_encoding = sys.stdout.encoding or sys.getdefaultencoding()
 
+    @staticmethod
+    @primitive('quartz.CGWindowListCopyWindowInfo')
+    def _get_window_info_list(filters):
+        """
+        Gets info of windows.
+
+        Arguments:
+            - filters: int, window list options.
+
+        Returns:
+            - list of dicts with window info.
+        """
+
+        return CG.CGWindowListCopyWindowInfo(filters, CG.kCGNullWindowID)
+
+    @staticmethod
+    @primitive('ax.windows')
+    def _get_app_window(process_id):
+        """
+        Gets first window of application.
+
+        Arguments:
+            - process_id: int, process id.
+
+        Returns:
+            - atomac object of window.
+        """
+
+        app = atomac.getAppRefByPid(process_id)
+
+        return app.windows()[0]
+
     def get_object_by_coordinates(self, x, y):
         result = None
 
@@ -68,6 +104,7 @@ class MacSoup(ISoup):
         except TooSaltyUISoupException:
             return False
 
+    @traced('soup.get_window')
     def get_window(self, obj_handle=None):
         filters = CG.kCGWindowListOptionOnScreenOnly | \
             CG.kCGWindowListExcludeDesktopElements * bool(obj_handle)
@@ -76,16 +113,15 @@ class MacSoup(ISoup):
         obj_name = \
             obj_name if type(obj_name) == unicode else obj_name.decode('utf-8')
 
-        regex = MacUtils.convert_wildcard_to_regex(obj_name)
+        matcher = GlobMatcher.get(
+            MacUtils.replace_inappropriate_symbols(obj_name), ignore_case=True)
 
-        win_list = CG.CGWindowListCopyWindowInfo(filters, CG.kCGNullWindowID)
+        win_list = self._get_window_info_list(filters)
 
         window = filter(lambda x:
-                        re.match(MacUtils.replace_inappropriate_symbols(regex),
-                                 MacUtils.replace_inappropriate_symbols(
-                                     x.get('kCGWindowName', '')) +
-                                 x.get('kCGWindowOwnerName', ''),
-                                 re.IGNORECASE)
+                        matcher.match(MacUtils.replace_inappropriate_symbols(
+                            x.get('kCGWindowName', '')) +
+                            x.get('kCGWindowOwnerName', ''))
                         if x.get('kCGWindowName', '') else False,
                         win_list)
 
@@ -116,16 +152,15 @@ class MacSoup(ISoup):
         selector = \
             selector if type(selector) == unicode else selector.decode('utf-8')
 
-        app = atomac.getAppRefByPid(process_id)
-        window = app.windows()[0]
+        window = self._get_app_window(process_id)
 
-        return MacElement(window, process_name, process_id)
+        return ElementPool.intern(
+            MacElement(window, process_name, process_id))
 
     def get_visible_window_list(self):
-        win_list = CG.CGWindowListCopyWindowInfo(
+        win_list = self._get_window_info_list(
             CG.kCGWindowListOptionOnScreenOnly |
-            CG.kCGWindowListExcludeDesktopElements,
-            CG.kCGNullWindowID)
+            CG.kCGWindowListExcludeDesktopElements)
 
         win_names = \
             [w.get('kCGWindowName', '') + w.get('kCGWindowOwnerName', '') for
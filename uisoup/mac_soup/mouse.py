@@ -19,12 +19,15 @@ __author__ = 'alex.jakovenko@gmail.com'
 
 from Quartz import CoreGraphics as CG
 
-from time import sleep
-
 from ..interfaces.i_mouse import IMouse
 from ..utils.mac_utils import MacUtils
+from ..utils.timeline import Timeline
+from ..utils.input_state import InputState
+from ..utils.instrumentation import Instrumentation, primitive
+from ..utils.tracing import traced
 
 
+@Instrumentation.register
 class MacMouse(IMouse):
 
     LEFT_BUTTON = u'b1c'
@@ -40,6 +43,9 @@ class MacMouse(IMouse):
         CG.kCGEventRightMouseDragged,
         CG.kCGEventRightMouseUp]
 
+    # Shared by all mouse and keyboard instances as there is only one cursor.
+    _state = InputState()
+
     def _compose_mouse_event_chain(self, name, press=True, release=False):
         """
         Composes chain of mouse events based on button name and action flags.
@@ -70,6 +76,7 @@ class MacMouse(IMouse):
 
         return mouse_event_chain
 
+    @primitive('quartz.CGEventPost')
     def _do_event(self, code, x, y):
         """
         Generates mouse event for a special coordinate.
@@ -109,21 +116,30 @@ class MacMouse(IMouse):
         for code in codes:
             self._do_event(code, x, y)
 
+    @traced('mouse.move')
     def move(self, x, y, smooth=False):
         MacUtils.verify_xy_coordinates(x, y)
 
+        if self._state.is_at(x, y, self.get_position):
+            return
+
         if smooth:
-            curr_x, curr_y = self.get_position()
+            curr_x, curr_y = self._state.get_position(self.get_position)
             delta_x = (x - curr_x) / 100.0
             delta_y = (y - curr_y) / 100.0
+            timeline = Timeline('move')
             for i in xrange(100):
-                sleep(.01)
+                timeline.wait(.01)
                 curr_x += delta_x
                 curr_y += delta_y
-                self._do_event(CG.kCGEventMouseMoved, int(curr_x), int(curr_y))
+                timeline.add(self._do_event, CG.kCGEventMouseMoved,
+                             int(curr_x), int(curr_y), coalesce='move')
+            timeline.dispatch()
         else:
             self._do_event(CG.kCGEventMouseMoved, int(x), int(y))
+        self._state.set_position(x, y)
 
+    @traced('mouse.drag')
     def drag(self, x1, y1, x2, y2, smooth=True):
         MacUtils.verify_xy_coordinates(x1, y1)
         MacUtils.verify_xy_coordinates(x2, y2)
@@ -135,13 +151,17 @@ class MacMouse(IMouse):
             y = y1
             delta_x = (x2 - x1) / 100.0
             delta_y = (y2 - y1) / 100.0
+            timeline = Timeline('drag')
             for i in xrange(100):
-                sleep(.01)
+                timeline.wait(.01)
                 x += delta_x
                 y += delta_y
-                self._do_event(CG.kCGEventLeftMouseDragged, int(x), int(y))
+                timeline.add(self._do_event, CG.kCGEventLeftMouseDragged,
+                             int(x), int(y), coalesce='drag')
+            timeline.dispatch()
         else:
             self._do_event(CG.kCGEventLeftMouseDragged, int(x2), int(y2))
+        self._state.set_position(x2, y2)
 
         self.release_button(self.LEFT_BUTTON)
 
@@ -153,6 +173,8 @@ class MacMouse(IMouse):
         event_codes = self._compose_mouse_event_chain(
             button_name, press=True, release=False)
         self._do_events(event_codes, x, y)
+        self._state.set_position(x, y)
+        self._state.press_button(button_name)
 
     def release_button(self, button_name=LEFT_BUTTON):
         MacUtils.verify_mouse_button_name(button_name,
@@ -160,9 +182,11 @@ class MacMouse(IMouse):
 
         event_codes = self._compose_mouse_event_chain(
             button_name, press=False, release=True)
-        curr_x, curr_y = self.get_position()
+        curr_x, curr_y = self._state.get_position(self.get_position)
         self._do_events(event_codes, curr_x, curr_y)
+        self._state.release_button(button_name)
 
+    @traced('mouse.click')
     def click(self, x, y, button_name=LEFT_BUTTON):
         MacUtils.verify_xy_coordinates(x, y)
         MacUtils.verify_mouse_button_name(button_name,
@@ -171,7 +195,9 @@ class MacMouse(IMouse):
         event_codes = self._compose_mouse_event_chain(
             button_name, press=True, release=True)
         self._do_events(event_codes, x, y)
+        self._state.set_position(x, y)
 
+    @traced('mouse.double_click')
     def double_click(self, x, y, button_name=LEFT_BUTTON, click_interval=0.5):
         MacUtils.verify_xy_coordinates(x, y)
         MacUtils.verify_mouse_button_name(button_name,
@@ -188,19 +214,24 @@ class MacMouse(IMouse):
 
         # http://www.codeitive.com/0iJqgkejVj/performing-a-double-click-using-cgeventcreatemouseevent.html
         event = CG.CGEventCreateMouseEvent(None, down, (x, y), button)
-        CG.CGEventPost(CG.kCGSessionEventTap, event)
-        CG.CGEventSetType(event, up)
-        CG.CGEventPost(CG.kCGSessionEventTap, event)
+        timeline = Timeline('double_click')
+        timeline.add(CG.CGEventPost, CG.kCGSessionEventTap, event)
+        timeline.add(CG.CGEventSetType, event, up)
+        timeline.add(CG.CGEventPost, CG.kCGSessionEventTap, event)
 
-        CG.CGEventSetIntegerValueField(event, CG.kCGMouseEventClickState, 2)
+        timeline.add(CG.CGEventSetIntegerValueField, event,
+                     CG.kCGMouseEventClickState, 2)
         # https://msdn.microsoft.com/en-us/library/windows/desktop/ms646263%28v=vs.85%29.aspx
-        sleep(click_interval)
+        timeline.wait(click_interval)
 
-        CG.CGEventSetType(event, down)
-        CG.CGEventPost(CG.kCGSessionEventTap, event)
-        CG.CGEventSetType(event, up)
-        CG.CGEventPost(CG.kCGSessionEventTap, event)
+        timeline.add(CG.CGEventSetType, event, down)
+        timeline.add(CG.CGEventPost, CG.kCGSessionEventTap, event)
+        timeline.add(CG.CGEventSetType, event, up)
+        timeline.add(CG.CGEventPost, CG.kCGSessionEventTap, event)
+        timeline.dispatch()
+        self._state.set_position(x, y)
 
+    @primitive('quartz.CGEventGetLocation')
     def get_position(self):
         position = CG.CGEventGetLocation(CG.CGEventCreate(None))
         return int(position.x), int(position.y)
@@ -0,0 +1,422 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import itertools
+import socket
+import SocketServer
+import sys
+import threading
+
+from .. import TooSaltyUISoupException
+from ..interfaces.i_element import IElement
+from ..interfaces.i_keyboard import Key, IKeyboard
+from ..interfaces.i_mouse import IMouse
+from ..interfaces.i_soup import ISoup
+from ..utils.dispatcher import SerialExecutor
+from .protocol import DEFAULT_PORT, send_message, recv_message, \
+    error_to_data, parse_address
+
+
+def _public_names(interface, extra=()):
+    return frozenset([name for name in dir(interface) if
+                      not name.startswith('_')] + list(extra))
+
+
+class Agent(object):
+    """
+    Executes remote calls against local soup. All calls are executed on one
+    worker thread, so UI objects are used only by thread that created them.
+    Elements returned to clients are kept in handle table until clients
+    release them or close all their connections, the same element always
+    gets the same handle and is released as many times as it was returned.
+
+    Agent has no authentication, so it should listen on trusted networks
+    only.
+    """
+
+    _ALLOWED_NAMES = {
+        'soup': _public_names(ISoup),
+        'mouse': _public_names(IMouse),
+        'keyboard': _public_names(IKeyboard),
+        'element': _public_names(IElement, ['acc_role', '__iter__']),
+        'agent': frozenset(['release', 'ping'])
+    }
+
+    def __init__(self, soup=None):
+        """
+        Constructor.
+
+        Arguments:
+            - soup: soup instance, if not defined soup of current backend
+            will be used.
+        """
+
+        if soup is None:
+            from .. import get_soup
+            soup = get_soup()
+        self.soup = soup
+        self._handles = {}
+        self._handle_refs = {}
+        self._element_handles = {}
+        self._handle_ids = itertools.count(1)
+        # Handle references and connection count of every client, client
+        # is identified by id sent in requests, so handles may be used and
+        # released over any connection of the same client.
+        self._owner_refs = {}
+        self._owner_connections = {}
+        # Client of calls being executed.
+        self._owner = None
+        # Handle tables are used only by worker thread, so they are not
+        # locked.
+        self._executor = SerialExecutor(name='uisoup-agent-worker')
+
+    @property
+    def handle_count(self):
+        return len(self._handles)
+
+    def ping(self):
+        return 'pong'
+
+    def release(self, handles):
+        """
+        Releases element handles of client which calls are executed.
+
+        Arguments:
+            - handles: list of int handles, handle is listed once for every
+            time it was returned.
+
+        Returns:
+            - None
+        """
+
+        owner_refs = self._owner_refs.get(self._owner, {})
+        for handle in handles:
+            refs = owner_refs.get(handle, 0) - 1
+            if refs < 0:
+                # Handle was not returned to this client.
+                continue
+            if refs:
+                owner_refs[handle] = refs
+            else:
+                del owner_refs[handle]
+            self._release_handle(handle)
+
+    def _release_handle(self, handle, count=1):
+        refs = self._handle_refs.get(handle, 0) - count
+        if refs > 0:
+            self._handle_refs[handle] = refs
+            return
+        self._handle_refs.pop(handle, None)
+        element = self._handles.pop(handle, None)
+        if element is not None:
+            self._element_handles.pop(element, None)
+
+    def connect(self, owner):
+        """
+        Registers connection of client.
+
+        Arguments:
+            - owner: hashable id of client.
+
+        Returns:
+            - None
+        """
+
+        self._executor.submit(self._connect, owner).result()
+
+    def disconnect(self, owner):
+        """
+        Unregisters connection of client, when last connection of client is
+        closed all handles returned to it are released.
+
+        Arguments:
+            - owner: hashable id of client.
+
+        Returns:
+            - None
+        """
+
+        self._executor.submit(self._disconnect, owner).result()
+
+    def _connect(self, owner):
+        self._owner_connections[owner] = \
+            self._owner_connections.get(owner, 0) + 1
+
+    def _disconnect(self, owner):
+        connections = self._owner_connections.get(owner, 0) - 1
+        if connections > 0:
+            self._owner_connections[owner] = connections
+            return
+        self._owner_connections.pop(owner, None)
+        for handle, refs in self._owner_refs.pop(owner, {}).items():
+            self._release_handle(handle, refs)
+
+    def close(self):
+        """
+        Stops worker thread, it is started again by next call.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        self._executor.stop()
+
+    def _encode(self, value):
+        if isinstance(value, IElement):
+            handle = self._element_handles.get(value)
+            if handle is None:
+                handle = self._handle_ids.next()
+                self._handles[handle] = value
+                self._element_handles[value] = handle
+            self._handle_refs[handle] = self._handle_refs.get(handle, 0) + 1
+            owner_refs = self._owner_refs.setdefault(self._owner, {})
+            owner_refs[handle] = owner_refs.get(handle, 0) + 1
+            return {'__element__': handle}
+        if isinstance(value, (list, tuple)):
+            return [self._encode(item) for item in value]
+        if isinstance(value, dict):
+            return dict((k, self._encode(v)) for k, v in value.items())
+        if value is None or isinstance(value, (bool, int, long, float,
+                                               basestring)):
+            return value
+
+        return repr(value)
+
+    def _decode(self, value, results):
+        if isinstance(value, list):
+            return [self._decode(item, results) for item in value]
+        if isinstance(value, dict):
+            if '__element__' in value:
+                try:
+                    return self._handles[value['__element__']]
+                except KeyError:
+                    raise TooSaltyUISoupException(
+                        'Unknown element handle %r.' % value['__element__'])
+            if '__key__' in value:
+                return Key.from_data(value['__key__'])
+            if '__result__' in value:
+                return results[value['__result__']]
+            return dict((k, self._decode(v, results)) for k, v in
+                        value.items())
+
+        return value
+
+    def _resolve_target(self, target, results):
+        if target == 'soup':
+            return 'soup', self.soup
+        if target == 'mouse':
+            return 'mouse', self.soup.mouse
+        if target == 'keyboard':
+            return 'keyboard', self.soup.keyboard
+        if target == 'agent':
+            return 'agent', self
+
+        obj = self._decode(target, results)
+        if not isinstance(obj, IElement):
+            raise TooSaltyUISoupException('Target %r is not an element.' %
+                                          (target,))
+
+        return 'element', obj
+
+    def _call(self, target, name, args, kwargs, results):
+        kind, obj = self._resolve_target(target, results)
+        if name not in self._ALLOWED_NAMES[kind]:
+            raise TooSaltyUISoupException('%s.%s is not allowed.' %
+                                          (kind, name))
+        args = self._decode(args, results)
+        kwargs = dict((str(k), v) for k, v in
+                      self._decode(kwargs, results).items())
+
+        if kind == 'keyboard' and name == 'codes':
+            return dict((code_name, key.code) for code_name, key in
+                        vars(obj.codes).items() if isinstance(key, Key))
+        if name == '__iter__':
+            return list(obj)
+
+        attr = getattr(obj, name)
+        if callable(attr):
+            return attr(*args, **kwargs)
+        if args or kwargs:
+            raise TooSaltyUISoupException('%s.%s is not callable.' %
+                                          (kind, name))
+
+        return attr
+
+    def execute(self, calls, owner=None):
+        """
+        Executes calls in order on worker thread, stops on first failed
+        call.
+
+        Arguments:
+            - calls: list of [target, name, args, kwargs].
+            - owner: hashable id of client, returned handles are released
+            when its last connection is closed.
+
+        Returns:
+            - list of [True, encoded result] or [False, error data].
+        """
+
+        return self._executor.submit(self._execute, calls, owner).result()
+
+    def _execute(self, calls, owner):
+        self.soup.init_thread()
+        self._owner = owner
+
+        results = []
+        response = []
+        try:
+            for target, name, args, kwargs in calls:
+                try:
+                    result = self._call(target, name, args, kwargs, results)
+                except Exception as ex:
+                    response.append([False, error_to_data(ex)])
+                    break
+                results.append(result)
+                response.append([True, self._encode(result)])
+        finally:
+            self._owner = None
+
+        return response
+
+
+class _AgentHandler(SocketServer.BaseRequestHandler):
+
+    def setup(self):
+        # Clients served by this connection.
+        self.owners = set()
+
+    def handle(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        agent = self.server.agent
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (socket.error, ValueError):
+                break
+            if message is None:
+                break
+            # Client without id owns handles of this connection only.
+            owner = message.get('client') or self
+            if owner not in self.owners:
+                self.owners.add(owner)
+                agent.connect(owner)
+            response = {'results': agent.execute(message.get('calls', []),
+                                                 owner)}
+            try:
+                send_message(self.request, response)
+            except socket.error:
+                break
+
+    def finish(self):
+        for owner in self.owners:
+            self.server.agent.disconnect(owner)
+
+
+class AgentServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    """
+    TCP server of agent, every connection is served by own thread, calls
+    are executed by agent worker thread.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', DEFAULT_PORT), agent=None):
+        """
+        Constructor.
+
+        Arguments:
+            - address: tuple (host, port), port 0 selects free port.
+            - agent: Agent instance, if not defined agent over soup of
+            current backend will be created.
+        """
+
+        SocketServer.TCPServer.__init__(self, address, _AgentHandler)
+        self.agent = agent or Agent()
+
+    def start(self):
+        """
+        Serves requests in daemon thread.
+
+        Arguments:
+            - None
+
+        Returns:
+            - Thread instance.
+        """
+
+        thread = threading.Thread(target=self.serve_forever,
+                                  name='uisoup-agent')
+        thread.daemon = True
+        thread.start()
+
+        return thread
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self.agent.close()
+
+
+def main(argv=None):
+    """
+    Runs remote automation agent.
+
+    Arguments:
+        - argv: list of command line arguments.
+
+    Returns:
+        - int, exit code.
+    """
+
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Exposes uisoup API of this machine over TCP.')
+    parser.add_argument('--listen', default='127.0.0.1:%d' % DEFAULT_PORT,
+                        help='host:port to listen on, agent has no '
+                             'authentication so listen on trusted networks '
+                             'only (default: %(default)s)')
+    parser.add_argument('--backend', default=None,
+                        help='backend used by agent, by default backend of '
+                             'current OS')
+    args = parser.parse_args(argv)
+
+    if args.backend:
+        from .. import set_backend
+        set_backend(args.backend)
+
+    server = AgentServer(parse_address(args.listen))
+    sys.stderr.write('uisoup agent listening on %s:%d\n' %
+                     server.server_address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.agent.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
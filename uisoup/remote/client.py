@@ -0,0 +1,601 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import os
+import socket
+import threading
+import weakref
+import Queue
+
+from .. import TooSaltyUISoupException
+from ..interfaces.i_element import IElement
+from ..interfaces.i_keyboard import Key, IKeyboard
+from ..interfaces.i_mouse import IMouse
+from ..interfaces.i_soup import ISoup
+from .protocol import DEFAULT_PORT, RemoteError, send_message, \
+    recv_message, parse_address
+
+
+class ConnectionPool(object):
+    """
+    Pool of connections to agent. Connections are created on demand and
+    reused, broken connections are dropped.
+    """
+
+    def __init__(self, address, size=4, timeout=60):
+        """
+        Constructor.
+
+        Arguments:
+            - address: tuple (host, port).
+            - size: int, maximal number of simultaneous connections.
+            - timeout: float, socket timeout in seconds.
+        """
+
+        self.address = address
+        self.timeout = timeout
+        self._idle = Queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.created = 0
+        self.closed = False
+
+    def acquire(self):
+        """
+        Gets idle connection or creates new one, blocks while all
+        connections are busy.
+
+        Arguments:
+            - None
+
+        Returns:
+            - socket.
+        """
+
+        if self.closed:
+            raise TooSaltyUISoupException(
+                'Connections to agent %s:%d are closed.' % self.address)
+
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except Queue.Empty:
+            pass
+
+        try:
+            sock = socket.create_connection(self.address, self.timeout)
+        except:
+            self._slots.release()
+            raise
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.created += 1
+
+        return sock
+
+    def release(self, sock, broken=False):
+        """
+        Returns connection to pool.
+
+        Arguments:
+            - sock: socket got by acquire.
+            - broken: bool, if True connection will be closed.
+
+        Returns:
+            - None
+        """
+
+        if broken or self.closed:
+            sock.close()
+        else:
+            self._idle.put(sock)
+        self._slots.release()
+
+    def close(self):
+        """
+        Closes idle connections, busy ones are closed when they are
+        released. Agent releases handles of client when its last connection
+        is closed.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        self.closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Queue.Empty:
+                break
+
+
+class RemoteClient(object):
+    """
+    Sends calls to agent and converts results. There is one RemoteElement
+    per handle, handles of garbage collected elements are released with
+    next request.
+    """
+
+    def __init__(self, address, pool_size=4, timeout=60):
+        self.pool = ConnectionPool(parse_address(address), pool_size, timeout)
+        # Agent keeps handles of client until its last connection is closed,
+        # so handles got over one pooled connection are valid on others.
+        self.client_id = os.urandom(8).encode('hex')
+        self._released = []
+        self._elements = weakref.WeakValueDictionary()
+        self._elements_lock = threading.Lock()
+
+    def _encode(self, value):
+        if isinstance(value, RemoteElement):
+            return {'__element__': value._handle}
+        if isinstance(value, _Pending):
+            return {'__result__': value._index}
+        if isinstance(value, Key):
+            return {'__key__': value.to_data()}
+        if isinstance(value, (list, tuple)):
+            return [self._encode(item) for item in value]
+        if isinstance(value, dict):
+            return dict((k, self._encode(v)) for k, v in value.items())
+        if value is None or isinstance(value, (bool, int, long, float,
+                                               basestring)):
+            return value
+
+        raise TooSaltyUISoupException(
+            '%r can not be sent to remote agent, only strings, numbers, '
+            'keys and elements are supported.' % (value,))
+
+    def _decode(self, value):
+        if isinstance(value, list):
+            return [self._decode(item) for item in value]
+        if isinstance(value, dict):
+            if '__element__' in value:
+                return self._get_element(value['__element__'])
+            return dict((k, self._decode(v)) for k, v in value.items())
+
+        return value
+
+    def _get_element(self, handle):
+        with self._elements_lock:
+            element = self._elements.get(handle)
+            if element is None:
+                element = RemoteElement(self, handle)
+                self._elements[handle] = element
+            # Agent counts every time handle is returned.
+            element._refs += 1
+
+        return element
+
+    def release_handle(self, handle, count=1):
+        # list.extend is atomic, so it is safe in __del__.
+        self._released.extend([handle] * count)
+
+    def execute(self, calls):
+        """
+        Executes calls in one round trip.
+
+        Arguments:
+            - calls: list of tuples (target, name, args, kwargs), targets
+            are "soup", "mouse", "keyboard", "agent", RemoteElement or
+            _Pending result of previous call.
+
+        Returns:
+            - list of results, exception of first failed call is raised.
+        """
+
+        encoded = [[self._encode(target), name, self._encode(list(args)),
+                    self._encode(kwargs)] for target, name, args, kwargs in
+                   calls]
+
+        released = []
+        while self._released:
+            released.append(self._released.pop())
+        if released:
+            # Result references are shifted by one because of release call.
+            encoded = [['agent', 'release', [released], {}]] + \
+                [self._shift_references(call) for call in encoded]
+
+        sock = self.pool.acquire()
+        try:
+            send_message(sock, {'client': self.client_id, 'calls': encoded})
+            response = recv_message(sock)
+        except:
+            self.pool.release(sock, broken=True)
+            raise
+        if response is None:
+            self.pool.release(sock, broken=True)
+            raise TooSaltyUISoupException('Agent closed connection.')
+        self.pool.release(sock)
+
+        results = response['results'][1:] if released else \
+            response['results']
+        values = []
+        for ok, value in results:
+            if not ok:
+                raise RemoteError(value['type'], value['message'])
+            values.append(self._decode(value))
+
+        return values
+
+    @classmethod
+    def _shift_references(cls, value):
+        if isinstance(value, list):
+            return [cls._shift_references(item) for item in value]
+        if isinstance(value, dict):
+            if '__result__' in value:
+                return {'__result__': value['__result__'] + 1}
+            return dict((k, cls._shift_references(v)) for k, v in
+                        value.items())
+
+        return value
+
+    def call(self, target, name, args=(), kwargs=None):
+        return self.execute([(target, name, args, kwargs or {})])[0]
+
+    def batch(self):
+        return RemoteBatch(self)
+
+    def close(self):
+        self.pool.close()
+
+
+def _batch_method(batch, target, name):
+    def method(*args, **kwargs):
+        return batch.call(target, name, args, kwargs)
+
+    return method
+
+
+class _Pending(object):
+    """
+    Result of call added to batch. It can be used as target or argument of
+    next calls of the same batch: attribute access makes call on result.
+    """
+
+    def __init__(self, batch, index):
+        self._batch = batch
+        self._index = index
+
+    @property
+    def result(self):
+        if self._batch.results is None:
+            raise TooSaltyUISoupException('Batch is not executed yet.')
+
+        return self._batch.results[self._index]
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        return _batch_method(self._batch, self, name)
+
+
+class _BatchTarget(object):
+
+    def __init__(self, batch, target):
+        self._batch = batch
+        self._target = target
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        return _batch_method(self._batch, self._target, name)
+
+
+class RemoteBatch(object):
+    """
+    Collects calls and executes them in one round trip on exit from with
+    block. Results of calls can be used as targets or arguments of next
+    calls, e.g.:
+
+        with soup.batch() as batch:
+            button = batch.soup.get_window('Notepad*').find(c_name='btnOK')
+            button.click()
+            name = button.acc_name()
+        print name.result
+
+    Properties are read by calling them without arguments.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._calls = []
+        self.results = None
+        self.soup = _BatchTarget(self, 'soup')
+        self.mouse = _BatchTarget(self, 'mouse')
+        self.keyboard = _BatchTarget(self, 'keyboard')
+
+    def on(self, element):
+        """
+        Gets batch target for element got before batch.
+        """
+
+        return _BatchTarget(self, element)
+
+    def call(self, target, name, args=(), kwargs=None):
+        """
+        Adds call to batch.
+
+        Arguments:
+            - target: "soup", "mouse", "keyboard", RemoteElement or result of
+            previous call of this batch.
+            - name: string, name of method or property.
+            - args: tuple of method arguments.
+            - kwargs: dict of method keyword arguments.
+
+        Returns:
+            - _Pending result.
+        """
+
+        self._calls.append((target, name, args, kwargs or {}))
+
+        return _Pending(self, len(self._calls) - 1)
+
+    def execute(self):
+        self.results = self._client.execute(self._calls) if self._calls \
+            else []
+
+        return self.results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.execute()
+
+
+def _remote_property(name):
+    def getter(self):
+        return self._client.call(self, name)
+
+    getter.__name__ = name
+
+    return property(getter)
+
+
+def _remote_method(name):
+    def method(self, *args, **kwargs):
+        return self._client.call(self, name, args, kwargs)
+
+    method.__name__ = name
+
+    return method
+
+
+class RemoteElement(IElement):
+    """
+    Proxy of element living in agent.
+    """
+
+    __slots__ = ('_client', '_handle', '_refs', '__weakref__')
+
+    def __init__(self, client, handle):
+        """
+        Constructor.
+
+        Arguments:
+            - client: RemoteClient instance.
+            - handle: int, element handle in agent.
+        """
+
+        self._client = client
+        self._handle = handle
+        self._refs = 0
+
+    def __del__(self):
+        try:
+            self._client.release_handle(self._handle, self._refs)
+        except Exception:
+            pass
+
+    for _name in ['proc_id', 'is_top_level_window', 'is_selected',
+                  'is_checked', 'is_visible', 'is_enabled',
+                  'acc_parent_count', 'acc_child_count', 'acc_name',
+                  'acc_raw_name', 'acc_c_name', 'acc_value',
+                  'acc_description', 'acc_parent', 'acc_selection',
+                  'acc_focused_element', 'acc_role', 'acc_role_name']:
+        locals()[_name] = _remote_property(_name)
+
+    for _name in ['click', 'right_click', 'double_click', 'drag_to',
+                  'set_focus', 'set_value', 'find', 'findall',
+                  'is_object_exists']:
+        locals()[_name] = _remote_method(_name)
+
+    del _name
+
+    @property
+    def acc_location(self):
+        # Tuple of agent element comes as JSON list.
+        location = self._client.call(self, 'acc_location')
+
+        return tuple(location) if location is not None else None
+
+    @property
+    def identity(self):
+        return id(self._client), self._handle
+
+    def is_alive(self):
+        return self._client.call(self, 'is_alive')
+
+    def __iter__(self):
+        return iter(self._client.call(self, '__iter__'))
+
+    def toxml(self, stream=None, fields=None, max_depth=None,
+              encoding='utf-8'):
+        # XML is built by agent in one call instead of walking remote tree.
+        result = self._client.call(self, 'toxml', kwargs={
+            'fields': fields, 'max_depth': max_depth})
+        if stream is None:
+            return result
+
+        header, _, body = result.partition('\n')
+        stream.write(('<?xml version="1.0" encoding="%s"?>\n' % encoding) +
+                     body.encode(encoding))
+
+
+class RemoteMouse(IMouse):
+    """
+    Proxy of agent mouse.
+    """
+
+    LEFT_BUTTON = u'b1c'
+    RIGHT_BUTTON = u'b3c'
+
+    def __init__(self, client):
+        self._client = client
+
+    def move(self, x, y, smooth=False):
+        self._client.call('mouse', 'move', (x, y), {'smooth': smooth})
+
+    def drag(self, x1, y1, x2, y2, smooth=True):
+        self._client.call('mouse', 'drag', (x1, y1, x2, y2),
+                          {'smooth': smooth})
+
+    def press_button(self, x, y, button_name=LEFT_BUTTON):
+        self._client.call('mouse', 'press_button', (x, y, button_name))
+
+    def release_button(self, button_name=LEFT_BUTTON):
+        self._client.call('mouse', 'release_button', (button_name,))
+
+    def click(self, x, y, button_name=LEFT_BUTTON):
+        self._client.call('mouse', 'click', (x, y, button_name))
+
+    def double_click(self, x, y, button_name=LEFT_BUTTON, click_interval=0.5):
+        self._client.call('mouse', 'double_click', (x, y, button_name),
+                          {'click_interval': click_interval})
+
+    def get_position(self):
+        return tuple(self._client.call('mouse', 'get_position'))
+
+
+class RemoteKeyboard(IKeyboard):
+    """
+    Proxy of agent keyboard. Key codes are fetched from agent once.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._codes = None
+
+    @property
+    def codes(self):
+        if self._codes is None:
+            codes = self._client.call('keyboard', 'codes')
+            self._codes = type('_KeyCodes', (object,), dict(
+                (str(name), Key(code)) for name, code in codes.items()))
+
+        return self._codes
+
+    def press_key(self, hex_key_code):
+        self._client.call('keyboard', 'press_key', (hex_key_code,))
+
+    def press_key_and_hold(self, hex_key_code):
+        self._client.call('keyboard', 'press_key_and_hold',
+                          (hex_key_code,))
+
+    def release_key(self, hex_key_code):
+        self._client.call('keyboard', 'release_key', (hex_key_code,))
+
+    def send(self, *args, **kwargs):
+        self._client.call('keyboard', 'send', args, kwargs)
+
+    def release_held_keys(self, key_codes=None):
+        self._client.call('keyboard', 'release_held_keys', (key_codes,))
+
+
+class RemoteSoup(ISoup):
+    """
+    Soup that drives agent running on another machine, see
+    uisoup.remote.agent. Address of agent is "host:port" from constructor
+    argument or UISOUP_REMOTE environment variable.
+    """
+
+    def __init__(self, address=None, pool_size=4, timeout=60):
+        """
+        Constructor.
+
+        Arguments:
+            - address: string "host:port" or tuple (host, port).
+            - pool_size: int, maximal number of connections to agent.
+            - timeout: float, socket timeout in seconds.
+        """
+
+        address = address or os.environ.get('UISOUP_REMOTE',
+                                            '127.0.0.1:%d' % DEFAULT_PORT)
+        self.client = RemoteClient(address, pool_size, timeout)
+        self._mouse = RemoteMouse(self.client)
+        self._keyboard = RemoteKeyboard(self.client)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Closes connections to agent, agent releases elements of this soup.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        self.client.close()
+
+    @property
+    def mouse(self):
+        return self._mouse
+
+    @property
+    def keyboard(self):
+        return self._keyboard
+
+    def batch(self):
+        """
+        Creates batch of calls executed in one round trip.
+
+        Arguments:
+            - None
+
+        Returns:
+            - RemoteBatch instance.
+        """
+
+        return self.client.batch()
+
+    def get_object_by_coordinates(self, x, y):
+        return self.client.call('soup', 'get_object_by_coordinates',
+                                (x, y))
+
+    def is_window_exists(self, obj_handle):
+        return self.client.call('soup', 'is_window_exists', (obj_handle,))
+
+    def get_window(self, obj_handle=None):
+        return self.client.call('soup', 'get_window', (obj_handle,))
+
+    def get_visible_window_list(self):
+        return self.client.call('soup', 'get_visible_window_list')
+
+    def get_visible_object_list(self, window_name):
+        return self.client.call('soup', 'get_visible_object_list',
+                                (window_name,))
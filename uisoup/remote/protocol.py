@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+# Wire protocol of remote agent.
+#
+# Every message is 4 bytes big-endian length followed by UTF-8 JSON.
+#
+# Request is {"client": id, "calls": [[target, name, args, kwargs], ...]}
+# where target is "soup", "mouse", "keyboard", "agent", element reference or
+# result reference. Handles returned to client are released when last
+# connection of client is closed, without id handles belong to connection.
+# Response is {"results": [[true, value], ...]}. If some call failed, results
+# of calls before it are followed by [false, {"type": ..., "message": ...}].
+#
+# Special values:
+#     - {"__element__": handle} element handle registered by agent.
+#     - {"__key__": data} Key, see Key.to_data.
+#     - {"__result__": index} result of previous call of the same request,
+#     so dependent calls are pipelined in one round trip.
+
+import json
+import socket
+import struct
+
+from .. import TooSaltyUISoupException
+
+
+DEFAULT_PORT = 4610
+
+_HEADER = struct.Struct('>I')
+MAX_MESSAGE_SIZE = 256 * 1024 * 1024
+
+
+class RemoteError(TooSaltyUISoupException):
+    """
+    Exception raised by agent for remote call.
+    """
+
+    def __init__(self, type_name, message):
+        super(RemoteError, self).__init__(
+            u'%s: %s' % (type_name, message))
+        self.type_name = type_name
+
+
+def parse_address(address):
+    """
+    Parses "host:port" address.
+
+    Arguments:
+        - address: string "host:port" or "host" or tuple (host, port).
+
+    Returns:
+        - tuple (host, port).
+    """
+
+    if isinstance(address, tuple):
+        return address
+    host, _, port = address.rpartition(':')
+    if not host:
+        return port, DEFAULT_PORT
+
+    return host, int(port)
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+
+    return ''.join(chunks)
+
+
+def send_message(sock, message):
+    """
+    Sends message.
+
+    Arguments:
+        - sock: socket.
+        - message: JSON friendly object.
+
+    Returns:
+        - None
+    """
+
+    data = json.dumps(message, separators=(',', ':'))
+    if isinstance(data, unicode):
+        data = data.encode('utf-8')
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def recv_message(sock):
+    """
+    Receives message.
+
+    Arguments:
+        - sock: socket.
+
+    Returns:
+        - received object or None if connection was closed.
+    """
+
+    header = _recv_exactly(sock, _HEADER.size)
+    if header is None:
+        return None
+    size, = _HEADER.unpack(header)
+    if size > MAX_MESSAGE_SIZE:
+        raise socket.error('Message of %d bytes is too big.' % size)
+    data = _recv_exactly(sock, size)
+    if data is None:
+        return None
+
+    return json.loads(data.decode('utf-8'))
+
+
+def error_to_data(error):
+    """
+    Converts exception to error data of response.
+    """
+
+    try:
+        message = unicode(error)
+    except UnicodeError:
+        message = str(error).decode('utf-8', 'replace')
+
+    return {'type': type(error).__name__, 'message': message}
@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import math
+import random
+import threading
+import time
+from collections import deque
+
+from .. import TooSaltyUISoupException
+from ..utils.instrumentation import Instrumentation
+
+
+class SynthCallFailed(TooSaltyUISoupException):
+    """
+    Injected failure of synthetic backend primitive.
+    """
+
+    def __init__(self, primitive):
+        super(SynthCallFailed, self).__init__(
+            'Injected failure of "%s" call.' % primitive)
+        self.primitive = primitive
+
+
+class SynthNode(object):
+    """
+    Node of synthetic UI tree.
+    """
+
+    __slots__ = ('node_id', 'role_name', 'name', 'location', 'parent',
+                 'proc_id', 'value', 'description', 'visible', 'enabled',
+                 'selected', 'checked', 'children')
+
+    def __init__(self, node_id, role_name, name, location, parent=None,
+                 proc_id=0):
+        self.node_id = node_id
+        self.role_name = role_name
+        self.name = name
+        self.location = location
+        self.parent = parent
+        self.proc_id = proc_id
+        self.value = None
+        self.description = None
+        self.visible = True
+        self.enabled = True
+        self.selected = False
+        self.checked = False
+        self.children = []
+
+
+class SynthDesktop(object):
+    """
+    Generated UI tree with cost model of backend primitives.
+
+    Primitives are "property" (any property read), "parent", "children",
+    "enum_windows", "from_point", "action" (set_focus, set_value) and
+    "input" (any mouse or keyboard event).
+    """
+
+    LATENCY_PRESETS = {
+        'none': {},
+        # Typical costs of out-of-process IAccessible calls.
+        'com': {'property': .0002, 'parent': .0003, 'children': .001,
+                'enum_windows': .005, 'from_point': .002, 'action': .001,
+                'input': .0005},
+        # Typical costs of AppleScript and AX API calls.
+        'applescript': {'property': .002, 'parent': .003, 'children': .05,
+                        'enum_windows': .02, 'from_point': .1, 'action': .05,
+                        'input': .001}
+    }
+
+    # Role names and their weights in generated tree.
+    ROLE_WEIGHTS = [(u'btn', 20), (u'lbl', 20), (u'txt', 10), (u'grp', 10),
+                    (u'pane', 8), (u'lst', 8), (u'chk', 6), (u'rbtn', 4),
+                    (u'mnu', 4), (u'tblc', 6), (u'lnk', 4)]
+
+    _NAME_WORDS = [u'Open', u'Save', u'Cancel', u'OK', u'File', u'Edit',
+                   u'View', u'Help', u'Name', u'Value', u'Item', u'Next']
+
+    def __init__(self, windows=3, fan_out=5, depth=4, names=None, seed=0,
+                 latency='none', failure_rate=None, sleep=True,
+                 screen=(1920, 1080), invisible_rate=.05):
+        """
+        Constructor.
+
+        Arguments:
+            - windows: int, number of top level windows.
+            - fan_out: int or tuple of two ints (min, max), number of
+            children of every non leaf element.
+            - depth: int, depth of window subtree.
+            - names: list of names to choose from or callable that takes
+            random.Random instance, role name, depth and index and returns
+            name. If not defined names like "Open 12" will be generated.
+            - seed: int, seed of tree generator and failure injection.
+            - latency: string with name of preset from LATENCY_PRESETS or
+            dict where key is primitive name and value is latency in seconds.
+            - failure_rate: float, probability of failure of every
+            primitive or dict where key is primitive name and value is
+            probability.
+            - sleep: bool, indicates will latency be slept or only
+            accounted in simulated_time.
+            - screen: tuple of two ints, screen width and height.
+            - invisible_rate: float, probability that element is invisible.
+        """
+
+        if isinstance(latency, basestring):
+            if latency not in self.LATENCY_PRESETS:
+                raise TooSaltyUISoupException(
+                    'Latency preset should be one of %r.' %
+                    sorted(self.LATENCY_PRESETS))
+            latency = self.LATENCY_PRESETS[latency]
+        if not isinstance(failure_rate, dict):
+            failure_rate = dict.fromkeys(
+                ['property', 'parent', 'children', 'enum_windows',
+                 'from_point', 'action', 'input'], failure_rate or 0)
+
+        self.latency = dict(latency)
+        self.failure_rate = failure_rate
+        self.sleep = sleep
+        self.screen = screen
+        self.simulated_time = 0.0
+        self.calls = {}
+        self.events = deque(maxlen=10000)
+        self.focused = None
+
+        self._lock = threading.Lock()
+        self._failure_random = random.Random(seed)
+        self._nodes = {}
+        self._generate(random.Random(seed), windows, fan_out, depth, names,
+                       invisible_rate)
+
+        # Imported here as input classes need desktop to be defined.
+        from .mouse import SynthMouse
+        from .keyboard import SynthKeyboard
+        self.mouse = SynthMouse(self)
+        self.keyboard = SynthKeyboard(self)
+
+    @classmethod
+    def from_spec(cls, spec):
+        """
+        Creates desktop from string specification, e.g.
+        "windows=2,fan_out=4,depth=6,seed=1,latency=com,failure_rate=0.01".
+
+        Arguments:
+            - spec: string, comma separated key=value pairs.
+
+        Returns:
+            - SynthDesktop instance.
+        """
+
+        converters = {'windows': int, 'fan_out': int, 'depth': int,
+                      'seed': int, 'latency': str, 'failure_rate': float,
+                      'sleep': lambda x: x.lower() in ('1', 'true', 'yes'),
+                      'invisible_rate': float}
+        kwargs = {}
+        for pair in filter(None, (spec or '').split(',')):
+            key, _, value = pair.partition('=')
+            key = key.strip()
+            if key not in converters:
+                raise TooSaltyUISoupException(
+                    'Unknown synthetic desktop option "%s".' % key)
+            kwargs[key] = converters[key](value.strip())
+
+        return cls(**kwargs)
+
+    @property
+    def root(self):
+        """
+        Property for Desktop Window node.
+        """
+
+        return self._nodes[0]
+
+    def get_node(self, node_id):
+        """
+        Gets node by id.
+
+        Arguments:
+            - node_id: int, node id.
+
+        Returns:
+            - SynthNode instance or None.
+        """
+
+        return self._nodes.get(node_id)
+
+    def call(self, primitive):
+        """
+        Accounts call of primitive: injects latency and failure.
+
+        Arguments:
+            - primitive: string, primitive name.
+
+        Returns:
+            - None
+        """
+
+        latency = self.latency.get(primitive, 0)
+        with self._lock:
+            self.calls[primitive] = self.calls.get(primitive, 0) + 1
+            self.simulated_time += latency
+            failed = self.failure_rate.get(primitive) and \
+                self._failure_random.random() < self.failure_rate[primitive]
+
+        if latency and self.sleep:
+            time.sleep(latency)
+        if Instrumentation.enabled:
+            # Simulated latency is accounted, so histograms look the same
+            # whether desktop sleeps or not.
+            Instrumentation.record('synth.' + primitive, latency,
+                                   bool(failed))
+        if failed:
+            raise SynthCallFailed(primitive)
+
+    def _new_node(self, role_name, name, location, parent, proc_id):
+        node = SynthNode(len(self._nodes), role_name, name, location, parent,
+                         proc_id)
+        self._nodes[node.node_id] = node
+        if parent is not None:
+            parent.children.append(node)
+
+        return node
+
+    def _generate_name(self, rng, names, role_name, depth, index):
+        if callable(names):
+            return names(rng, role_name, depth, index)
+        if names:
+            return rng.choice(names)
+
+        chance = rng.random()
+        if chance < .1:
+            return u''
+        name = u'%s %d' % (rng.choice(self._NAME_WORDS), rng.randint(1, 99))
+        if chance > .98:
+            # Some applications use non-breaking spaces and dashes in names.
+            name = name.replace(u' ', u'\xa0') + u'\u2014'
+
+        return name
+
+    def _split(self, location, count):
+        x, y, w, h = location
+        cols = int(math.ceil(math.sqrt(count))) or 1
+        rows = int(math.ceil(count / float(cols))) or 1
+        cell_w, cell_h = w / cols, h / rows
+
+        return [(x + (i % cols) * cell_w, y + (i / cols) * cell_h,
+                 cell_w, cell_h) for i in xrange(count)]
+
+    def _generate(self, rng, windows, fan_out, depth, names, invisible_rate):
+        width, height = self.screen
+        root = self._new_node(u'clnt', u'Desktop', (0, 0, width, height),
+                              None, 0)
+        roles = [role for role, weight in self.ROLE_WEIGHTS
+                 for _ in xrange(weight)]
+        min_fan_out, max_fan_out = fan_out if isinstance(fan_out, tuple) \
+            else (fan_out, fan_out)
+
+        for i in xrange(windows):
+            w = rng.randint(width / 4, width / 2)
+            h = rng.randint(height / 4, height / 2)
+            location = (rng.randint(0, width - w), rng.randint(0, height - h),
+                        w, h)
+            window = self._new_node(u'frm', u'Window %d' % (i + 1), location,
+                                    root, 1000 + i)
+
+            queue = [(window, 0)]
+            while queue:
+                parent, level = queue.pop()
+                if level >= depth:
+                    continue
+                count = rng.randint(min_fan_out, max_fan_out)
+                for j, child_location in \
+                        enumerate(self._split(parent.location, count)):
+                    role_name = rng.choice(roles)
+                    node = self._new_node(
+                        role_name,
+                        self._generate_name(rng, names, role_name, level, j),
+                        child_location, parent, window.proc_id)
+                    node.visible = rng.random() >= invisible_rate
+                    if role_name in (u'txt', u'tblc'):
+                        node.value = u'%d' % rng.randint(0, 1000)
+                    queue.append((node, level + 1))
@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+from ..interfaces.i_element import IElement
+from ..utils.text_normalizer import TextNormalizer
+from ..utils.tracing import Tracer, traced
+from ..utils.element_pool import ElementPool
+from ..utils.flight_recorder import SearchDiagnostics
+from .. import TooSaltyUISoupException
+
+
+class SynthElement(IElement):
+    """
+    Element of synthetic UI tree.
+    """
+
+    _acc_role_map = {
+        u'clnt': 10,
+        u'frm': 9,
+        u'mnu': 12,
+        u'pane': 16,
+        u'grp': 20,
+        u'tblc': 29,
+        u'lnk': 30,
+        u'lst': 34,
+        u'lbl': 41,
+        u'txt': 42,
+        u'btn': 43,
+        u'chk': 44,
+        u'rbtn': 45
+    }
+
+    __slots__ = ('_desktop', '_node', '_cached_children',
+                 '_name', '__weakref__')
+
+    def __init__(self, desktop, node):
+        """
+        Constructor.
+
+        Arguments:
+            - desktop: SynthDesktop instance.
+            - node: SynthNode instance.
+        """
+
+        self._desktop = desktop
+        self._node = node
+        self._cached_children = set()
+        # Raw and normalized name.
+        self._name = None
+
+    @property
+    def _mouse(self):
+        return self._desktop.mouse
+
+    def _property(self, name):
+        self._desktop.call('property')
+        return getattr(self._node, name)
+
+    @traced('element.click')
+    def click(self, x_offset=None, y_offset=None):
+        x, y, w, h = self.acc_location
+        x += x_offset if x_offset is not None else w / 2
+        y += y_offset if y_offset is not None else h / 2
+
+        self._mouse.click(x, y)
+
+    @traced('element.right_click')
+    def right_click(self, x_offset=None, y_offset=None):
+        x, y, w, h = self.acc_location
+        x += x_offset if x_offset is not None else w / 2
+        y += y_offset if y_offset is not None else h / 2
+
+        self._mouse.click(x, y, self._mouse.RIGHT_BUTTON)
+
+    @traced('element.double_click')
+    def double_click(self, x_offset=None, y_offset=None, click_interval=0.5):
+        x, y, w, h = self.acc_location
+        x += x_offset if x_offset is not None else w / 2
+        y += y_offset if y_offset is not None else h / 2
+
+        self._mouse.double_click(x, y, click_interval=click_interval)
+
+    @traced('element.drag_to')
+    def drag_to(self, x, y, x_offset=None, y_offset=None, smooth=True):
+        el_x, el_y, el_w, el_h = self.acc_location
+        el_x += x_offset if x_offset is not None else el_w / 2
+        el_y += y_offset if y_offset is not None else el_h / 2
+
+        self._mouse.drag(el_x, el_y, x, y, smooth)
+
+    @property
+    def proc_id(self):
+        return self._property('proc_id')
+
+    @property
+    def is_top_level_window(self):
+        parent = self._property('parent')
+        return parent is not None and parent.parent is None
+
+    @property
+    def is_selected(self):
+        return self._property('selected')
+
+    @property
+    def is_checked(self):
+        return self._property('checked')
+
+    @property
+    def is_visible(self):
+        return self._property('visible')
+
+    @property
+    def is_enabled(self):
+        return self._property('enabled')
+
+    @property
+    def acc_parent_count(self):
+        parent_count = 0
+        parent = self.acc_parent
+        while parent:
+            parent_count += 1
+            parent = parent.acc_parent
+
+        return parent_count
+
+    @property
+    def acc_child_count(self):
+        return len(self._property('children'))
+
+    @property
+    def acc_name(self):
+        return self._normalized_name
+
+    @property
+    def acc_raw_name(self):
+        return self._property('name')
+
+    @traced('element.set_focus')
+    def set_focus(self):
+        self._desktop.call('action')
+        self._desktop.focused = self._node
+
+    @property
+    def acc_c_name(self):
+        name = self.acc_name
+        return self.acc_role_name + name if name else ''
+
+    @property
+    def acc_location(self):
+        return self._property('location')
+
+    @property
+    def acc_value(self):
+        return self._property('value')
+
+    @traced('element.set_value')
+    def set_value(self, value):
+        self._desktop.call('action')
+        self._node.value = value
+
+    @property
+    def acc_description(self):
+        return self._property('description')
+
+    @property
+    def acc_parent(self):
+        self._desktop.call('parent')
+        if self._node.parent is None:
+            return None
+
+        return ElementPool.intern(
+            SynthElement(self._desktop, self._node.parent))
+
+    @property
+    def acc_selection(self):
+        self._desktop.call('property')
+        return None
+
+    @property
+    def acc_focused_element(self):
+        self._desktop.call('property')
+        focused = self._desktop.focused
+        node = focused
+        while node is not None:
+            if node is self._node:
+                return ElementPool.intern(
+                    SynthElement(self._desktop, focused))
+            node = node.parent
+
+        return None
+
+    @property
+    def acc_role(self):
+        return self._acc_role_map.get(self._property('role_name'), 0)
+
+    @property
+    def acc_role_name(self):
+        return self._property('role_name')
+
+    def __iter__(self):
+        self._desktop.call('children')
+        for node in self._node.children:
+            yield ElementPool.intern(SynthElement(self._desktop, node))
+
+    def __findcacheiter(self, only_visible, **kwargs):
+        """
+        Find child element in the cache.
+
+        Arguments:
+            - only_visible: bool, flag that indicates will we search only
+
+        Returns:
+            - Yield found element.
+        """
+
+        kwargs = TextNormalizer.normalize_criteria(kwargs)
+        # Cache is copied, search that runs meanwhile adds elements to it.
+        for obj_element in tuple(self._cached_children):
+            if obj_element._match_criteria(only_visible, kwargs):
+                yield obj_element
+
+    def _finditer(self, only_visible, **kwargs):
+        """
+        Find child element.
+
+        Arguments:
+            - only_visible: bool, flag that indicates will we search only
+
+        Returns:
+            - Yield found element.
+        """
+
+        return self._search_iter(only_visible, kwargs)
+
+    def _search_iter(self, only_visible, kwargs, diagnostics=None):
+        """
+        Walks subtree and yields matched elements.
+
+        Arguments:
+            - only_visible: bool, flag that indicates will we search only
+            through visible elements.
+            - kwargs: dict of search criteria.
+            - diagnostics: SearchDiagnostics instance or None.
+
+        Returns:
+            - Yield found element.
+        """
+
+        # Criteria are normalized once per search.
+        kwargs = TextNormalizer.normalize_criteria(kwargs)
+        lst_queue = [(el, 1) for el in self]
+
+        while lst_queue:
+            obj_element, depth = lst_queue.pop(0)
+            self._cached_children.add(obj_element)
+            if diagnostics is not None:
+                diagnostics.visit(depth)
+            if Tracer.enabled:
+                Tracer.count('nodes_visited')
+
+            if obj_element._match_criteria(only_visible, kwargs,
+                                           diagnostics):
+                yield obj_element
+
+            if obj_element.acc_child_count:
+                lst_queue[:0] = [(el, depth + 1) for el in obj_element]
+
+    @traced('element.find')
+    def find(self, only_visible=True, **kwargs):
+        try:
+            return self.__findcacheiter(only_visible,
+                                        **kwargs).next()
+        except StopIteration:
+            diagnostics = SearchDiagnostics(kwargs)
+            try:
+                return self._search_iter(only_visible, kwargs,
+                                         diagnostics).next()
+            except StopIteration:
+                diagnostics.finish()
+                attrs = ['%s=%s' % (k, v) for k, v in kwargs.iteritems()]
+                raise TooSaltyUISoupException(
+                    'Can\'t find object with attributes "%s".' %
+                    '; '.join(attrs), diagnostics=diagnostics)
+
+    @traced('element.findall')
+    def findall(self, only_visible=True, **kwargs):
+        return list(self._finditer(only_visible, **kwargs))
+
+    def is_object_exists(self, **kwargs):
+        try:
+            self.find(**kwargs)
+            return True
+        except TooSaltyUISoupException:
+            return False
+
+    @property
+    def identity(self):
+        return id(self._desktop), self._node.node_id
+
+    def _refresh(self, element):
+        self._node = element._node
+        self._cached_children = set()
+
+    def is_alive(self):
+        self._desktop.call('property')
+        return self._desktop.get_node(self._node.node_id) is self._node
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+from ..interfaces.i_mouse import IMouse
+from ..utils.synth_utils import SynthUtils
+from ..utils.timeline import Timeline, clock
+from ..utils.input_state import InputState
+from ..utils.tracing import traced
+
+
+class SynthMouse(IMouse):
+    """
+    Mouse that records events to desktop events instead of sending them
+    to OS.
+    """
+
+    LEFT_BUTTON = u'b1c'
+    RIGHT_BUTTON = u'b3c'
+    _SUPPORTED_BUTTON_NAMES = [LEFT_BUTTON, RIGHT_BUTTON]
+
+    def __init__(self, desktop):
+        """
+        Constructor.
+
+        Arguments:
+            - desktop: SynthDesktop instance.
+        """
+
+        self._desktop = desktop
+        self._state = InputState()
+        self._position = (0, 0)
+
+    def _do_event(self, event, x, y):
+        """
+        Records mouse event.
+
+        Arguments:
+            - event: string, event name e.g. "move", "down" or "up".
+            - x: integer value with x coordinate.
+            - y: integer value with y coordinate.
+
+        Returns:
+            - None
+        """
+
+        self._desktop.call('input')
+        self._position = (x, y)
+        self._desktop.events.append((clock(), 'mouse', event, x, y))
+
+    @traced('mouse.move')
+    def move(self, x, y, smooth=False):
+        SynthUtils.verify_xy_coordinates(x, y)
+
+        if self._state.is_at(x, y, self.get_position):
+            return
+
+        if smooth:
+            curr_x, curr_y = self._state.get_position(self.get_position)
+            delta_x = (x - curr_x) / 100.0
+            delta_y = (y - curr_y) / 100.0
+            timeline = Timeline('move')
+            for i in xrange(100):
+                timeline.wait(.01)
+                curr_x += delta_x
+                curr_y += delta_y
+                timeline.add(self._do_event, 'move', int(curr_x), int(curr_y),
+                             coalesce='move')
+            timeline.dispatch()
+        else:
+            self._do_event('move', x, y)
+        self._state.set_position(x, y)
+
+    @traced('mouse.drag')
+    def drag(self, x1, y1, x2, y2, smooth=True):
+        SynthUtils.verify_xy_coordinates(x1, y1)
+        SynthUtils.verify_xy_coordinates(x2, y2)
+
+        self.press_button(x1, y1, self.LEFT_BUTTON)
+        self.move(x2, y2, smooth=smooth)
+        self.release_button(self.LEFT_BUTTON)
+
+    def press_button(self, x, y, button_name=LEFT_BUTTON):
+        SynthUtils.verify_xy_coordinates(x, y)
+        SynthUtils.verify_mouse_button_name(button_name,
+                                            self._SUPPORTED_BUTTON_NAMES)
+
+        self.move(x, y)
+        self._do_event(button_name + '_down', x, y)
+        self._state.press_button(button_name)
+
+    def release_button(self, button_name=LEFT_BUTTON):
+        SynthUtils.verify_mouse_button_name(button_name,
+                                            self._SUPPORTED_BUTTON_NAMES)
+
+        curr_x, curr_y = self._state.get_position(self.get_position)
+        self._do_event(button_name + '_up', curr_x, curr_y)
+        self._state.release_button(button_name)
+
+    @traced('mouse.click')
+    def click(self, x, y, button_name=LEFT_BUTTON):
+        SynthUtils.verify_xy_coordinates(x, y)
+        SynthUtils.verify_mouse_button_name(button_name,
+                                            self._SUPPORTED_BUTTON_NAMES)
+
+        self.move(x, y)
+        self._do_event(button_name + '_click', x, y)
+
+    @traced('mouse.double_click')
+    def double_click(self, x, y, button_name=LEFT_BUTTON, click_interval=0.5):
+        SynthUtils.verify_xy_coordinates(x, y)
+        SynthUtils.verify_mouse_button_name(button_name,
+                                            self._SUPPORTED_BUTTON_NAMES)
+
+        self.move(x, y)
+        timeline = Timeline('double_click')
+        timeline.add(self._do_event, button_name + '_click', x, y)
+        timeline.wait(click_interval)
+        timeline.add(self._do_event, button_name + '_click', x, y)
+        timeline.dispatch()
+
+    def get_position(self):
+        self._desktop.call('property')
+        return self._position
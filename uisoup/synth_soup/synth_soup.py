@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import os
+
+from ..utils.synth_utils import SynthUtils
+from ..utils.glob_matcher import GlobMatcher
+from ..utils.tracing import traced
+from ..utils.element_pool import ElementPool
+from .. import TooSaltyUISoupException
+from ..interfaces.i_soup import ISoup
+from .desktop import SynthDesktop
+from .element import SynthElement
+
+
+class SynthSoup(ISoup):
+    """
+    Pure Python soup over generated UI tree, works on any OS.
+
+    Desktop is configured by UISOUP_SYNTH environment variable, see
+    SynthDesktop.from_spec, or by desktop constructor argument.
+    """
+
+    def __init__(self, desktop=None):
+        """
+        Constructor.
+
+        Arguments:
+            - desktop: SynthDesktop instance, if not defined it will be
+            created from UISOUP_SYNTH environment variable.
+        """
+
+        if desktop is None:
+            desktop = SynthDesktop.from_spec(os.environ.get('UISOUP_SYNTH'))
+        self.desktop = desktop
+
+    @property
+    def mouse(self):
+        return self.desktop.mouse
+
+    @property
+    def keyboard(self):
+        return self.desktop.keyboard
+
+    def get_object_by_coordinates(self, x, y):
+        self.desktop.call('from_point')
+
+        node = self.desktop.root
+        found = True
+        while found:
+            found = False
+            # Last child is the topmost one.
+            for child in reversed(node.children):
+                c_x, c_y, c_w, c_h = child.location
+                if child.visible and c_x <= x < c_x + c_w and \
+                        c_y <= y < c_y + c_h:
+                    node = child
+                    found = True
+                    break
+
+        return ElementPool.intern(SynthElement(self.desktop, node))
+
+    def is_window_exists(self, obj_handle):
+        try:
+            self.get_window(obj_handle)
+            return True
+        except TooSaltyUISoupException:
+            return False
+
+    @traced('soup.get_window')
+    def get_window(self, obj_handle=None):
+        if obj_handle in (0, None):
+            node = self.desktop.root
+        elif isinstance(obj_handle, basestring):
+            matcher = GlobMatcher.get(
+                SynthUtils.replace_inappropriate_symbols(unicode(obj_handle)))
+
+            self.desktop.call('enum_windows')
+            node = None
+            for window in self.desktop.root.children:
+                if matcher.match(SynthUtils.replace_inappropriate_symbols(
+                        window.name)):
+                    node = window
+
+            if node is None:
+                raise TooSaltyUISoupException('Can\'t find window "%s".' %
+                                              obj_handle)
+        else:
+            node = self.desktop.get_node(obj_handle)
+            if node is None:
+                raise TooSaltyUISoupException(
+                    'Error when retrieving window with handle=%r' %
+                    obj_handle)
+
+        return ElementPool.intern(SynthElement(self.desktop, node))
+
+    def get_visible_window_list(self):
+        result = self.get_window().findall(
+            only_visible=True,
+            name=lambda x: x,
+            role_name=lambda x: x in ['frm', 'pane'],
+            location=lambda x: 0 not in x[2:])
+
+        return result
+
+    def get_visible_object_list(self, window_name):
+        window = self.get_window(window_name)
+        objects = window.findall(
+            only_visible=True,
+            role_name=lambda x: x != 'frm',
+            location=lambda x: 0 not in x[2:])
+
+        return objects
@@ -17,6 +17,7 @@
 
 __author__ = 'f1ashhimself@gmail.com, svchipiga@yandex-team.ru'
 
+import json
 from os import system
 from sys import stdout
 from time import sleep
@@ -24,70 +25,387 @@ from inspect import ismethod
 from platform import system as platform_system
 
 from . import uisoup
+from .utils.timeline import clock
 
 
 class UIInspector(object):
 
+    _ATTRIBUTES = ['acc_role_name',
+                   'acc_name',
+                   'acc_value',
+                   'acc_location',
+                   'acc_description',
+                   'acc_child_count']
+
+    # Clears whole screen, moves cursor home, clears to end of line and to
+    # end of screen, hides and shows cursor.
+    _ANSI_CLEAR_ALL = '\x1b[2J'
+    _ANSI_HOME = '\x1b[H'
+    _ANSI_CLEAR_LINE = '\x1b[K'
+    _ANSI_CLEAR_SCREEN = '\x1b[J'
+    _ANSI_HIDE_CURSOR = '\x1b[?25l'
+    _ANSI_SHOW_CURSOR = '\x1b[?25h'
+
+    def __init__(self, soup=uisoup, stream=stdout, poll_interval=.02,
+                 debounce=.08, max_delay=.3, refresh_interval=1.0):
+        """
+        Constructor.
+
+        Arguments:
+            - soup: soup instance.
+            - stream: file-like object of terminal.
+            - poll_interval: float, interval of cheap cursor position
+            queries in seconds.
+            - debounce: float, time cursor must rest before hit-test.
+            - max_delay: float, maximal delay of hit-test while cursor is
+            moving.
+            - refresh_interval: float, interval of refreshing info of element
+            under resting cursor.
+        """
+
+        self._soup = soup
+        self._stream = stream
+        self._poll_interval = poll_interval
+        self._debounce = debounce
+        self._max_delay = max_delay
+        self._refresh_interval = refresh_interval
+        self._ansi = self._enable_ansi()
+
+        self._last_position = None
+        self._moved_at = 0
+        self._shown_position = None
+        self._hit_at = 0
+        self._rect = None
+        self._shown_text = None
+
     @classmethod
-    def get_current_element_info(cls, obj_element):
+    def fetch_element_info(cls, obj_element):
         """
-        Gets current element info.
+        Reads all displayed attributes of element in one pass.
 
         Arguments:
             - obj_element: object element.
 
         Returns:
-            - String with element attributes.
+            - list of tuples (attribute name, value).
         """
 
-        dict_info = {}
-        lst_attribute_name_list = ['acc_role_name',
-                                   'acc_name',
-                                   'acc_value',
-                                   'acc_location',
-                                   'acc_description',
-                                   'acc_child_count']
-
-        for attr in lst_attribute_name_list:
+        result = []
+        for attr in cls._ATTRIBUTES:
             try:
                 value = getattr(obj_element, attr)
                 if ismethod(value):
-                    dict_info[attr] = value()
-                else:
-                    dict_info[attr] = value
+                    value = value()
             except:
-                dict_info[attr] = None
+                value = None
+            result.append((attr, value))
+
+        return result
+
+    @classmethod
+    def get_current_element_info(cls, obj_element):
+        """
+        Gets current element info.
+
+        Arguments:
+            - obj_element: object element.
+
+        Returns:
+            - String with element attributes.
+        """
+
+        result = u'\n'.join(u'{}:\t{}'.format(attr, value) for attr, value in
+                            cls.fetch_element_info(obj_element))
+        result = result.encode(stdout.encoding or 'utf-8', errors='replace')
+        return result
+
+    @classmethod
+    def _enable_ansi(cls):
+        """
+        Enables processing of ANSI sequences by Windows console.
+
+        Arguments:
+            - None
+
+        Returns:
+            - bool, True if terminal supports ANSI sequences.
+        """
+
+        if platform_system() != 'Windows':
+            return True
+
+        try:
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+            mode = ctypes.c_ulong()
+            if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+                return False
+            # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+            return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))
+        except Exception:
+            return False
+
+    def _redraw(self, text):
+        """
+        Redraws screen in place if text was changed.
+        """
+
+        if text == self._shown_text:
+            return
+        self._shown_text = text
+
+        if self._ansi:
+            lines = [line + self._ANSI_CLEAR_LINE for line in text.split('\n')]
+            self._stream.write(self._ANSI_HOME + '\n'.join(lines) +
+                               '\n' + self._ANSI_CLEAR_SCREEN)
+        else:
+            system('cls' if platform_system() == 'Windows' else 'clear')
+            self._stream.write(text + '\n')
+        self._stream.flush()
+
+    def _is_in_rect(self, x, y):
+        if not self._rect:
+            return False
+        r_x, r_y, r_w, r_h = self._rect
+
+        return r_x <= x < r_x + r_w and r_y <= y < r_y + r_h
+
+    def _hit_test(self, x, y):
+        """
+        Gets info of element under cursor and redraws it.
+        """
+
+        self._hit_at = clock()
+        self._shown_position = x, y
+        obj_element = self._soup.get_object_by_coordinates(x, y)
+        if obj_element is None:
+            self._rect = None
+            self._redraw('No element under cursor (%d, %d).' % (x, y))
+            return
+
+        info = self.fetch_element_info(obj_element)
+        location = dict(info)['acc_location']
+        # Only rectangle of leaf element is skipped by hit-test, cursor
+        # inside container can be over one of its children.
+        self._rect = tuple(location) if location and \
+            not dict(info)['acc_child_count'] else None
+        text = u'\n'.join(u'{}:\t{}'.format(attr, value) for attr, value in
+                          info)
+        self._redraw(text.encode(getattr(self._stream, 'encoding', None) or
+                                 'utf-8', errors='replace'))
+
+    def step(self):
+        """
+        Makes one iteration of inspector loop: queries cursor position and
+        does hit-test if cursor left rectangle of shown element and rests or
+        moves for too long, or if shown element should be refreshed.
+        Cursor movement over container element always leads to hit-test.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        now = clock()
+        position = self._soup.mouse.get_position()
+        if position != self._last_position:
+            self._last_position = position
+            self._moved_at = now
+
+        if position == self._shown_position:
+            if now - self._hit_at >= self._refresh_interval:
+                self._hit_test(*position)
+            return
+
+        if self._is_in_rect(*position):
+            # Cursor is still over shown element.
+            self._shown_position = position
+            return
+
+        if now - self._moved_at >= self._debounce or \
+                now - self._hit_at >= self._max_delay:
+            self._hit_test(*position)
+
+    def run(self):
+        """
+        Runs inspector loop until KeyboardInterrupt.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        if self._ansi:
+            self._stream.write(self._ANSI_CLEAR_ALL + self._ANSI_HIDE_CURSOR)
+        try:
+            while True:
+                self.step()
+                sleep(self._poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self._ansi:
+                self._stream.write(self._ANSI_SHOW_CURSOR + '\n')
+                self._stream.flush()
+
+
+class TreeDumper(object):
+    """
+    Streams element trees as JSON Lines while walking them, one element per
+    line.
+    """
+
+    _STATES = ['is_visible', 'is_enabled', 'is_selected', 'is_checked']
+
+    def __init__(self, stream=stdout, max_depth=None):
+        """
+        Constructor.
+
+        Arguments:
+            - stream: file-like object.
+            - max_depth: int, maximal depth of walk.
+        """
+
+        self._stream = stream
+        self._max_depth = max_depth
+        self.count = 0
+
+    @classmethod
+    def _read(cls, obj_element, attr):
+        try:
+            return getattr(obj_element, attr)
+        except Exception:
+            return None
+
+    @classmethod
+    def top_level_windows(cls, windows):
+        """
+        Drops windows nested in other windows of list, e.g. panes listed by
+        get_visible_window_list, so every tree is dumped once.
+
+        Arguments:
+            - windows: list of window objects.
+
+        Returns:
+            - list of windows that have no ancestor in list, in list order.
+        """
+
+        listed = set(windows)
+        result = []
+        for window in windows:
+            parent = cls._read(window, 'acc_parent')
+            while parent is not None and parent not in listed:
+                parent = cls._read(parent, 'acc_parent')
+            if parent is None:
+                result.append(window)
 
-        result = u'\n'.join(u'{}:\t{}'.format(attr, dict_info[attr]) for
-                         attr in lst_attribute_name_list)
-        result = result.encode(stdout.encoding, errors='replace')
         return result
 
+    @classmethod
+    def element_to_dict(cls, obj_element, path):
+        """
+        Reads element attributes.
+
+        Arguments:
+            - obj_element: object element.
+            - path: string, path of element from root.
+
+        Returns:
+            - dict with path, role, name, value, location and state.
+        """
+
+        location = cls._read(obj_element, 'acc_location')
+        value = cls._read(obj_element, 'acc_value')
+
+        return {'path': path,
+                'role': cls._read(obj_element, 'acc_role_name'),
+                'name': cls._read(obj_element, 'acc_name'),
+                'value': value if value is None else unicode(value),
+                'location': list(location) if location else None,
+                'state': dict((state[3:], cls._read(obj_element, state))
+                              for state in cls._STATES)}
+
+    def dump(self, obj_element, index=0):
+        """
+        Walks element tree and writes its elements.
 
-def main():
+        Arguments:
+            - obj_element: root element.
+            - index: int, index of root used in paths.
+
+        Returns:
+            - None
+        """
+
+        # Path parts of elements on current path and indexes of their
+        # next children.
+        parts = []
+        next_index = [index]
+        for event, obj_child, depth in obj_element._iterwalk(self._max_depth):
+            if event == 'end':
+                parts.pop()
+                next_index.pop()
+                continue
+
+            role = self._read(obj_child, 'acc_role_name') or 'unknown'
+            parts.append('%s[%d]' % (role, next_index[-1]))
+            next_index[-1] += 1
+            next_index.append(0)
+
+            self._stream.write(json.dumps(
+                self.element_to_dict(obj_child, '/' + '/'.join(parts))) +
+                '\n')
+            self._stream.flush()
+            self.count += 1
+
+
+def main(argv=None):
     """
-    Starts UI Inspector.
+    Starts UI Inspector or dumps element trees.
 
     Arguments:
-        - None
+        - argv: list of command line arguments.
 
     Returns:
-        - None
+        - int, exit code.
     """
 
+    # Imported here to keep import of this module cheap.
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Shows element under cursor or dumps element trees.')
+    parser.add_argument('--dump', nargs='?', const='', default=None,
+                        metavar='WINDOW_PATTERN',
+                        help='stream elements of window matching wildcard '
+                             'or of all visible windows as JSON Lines')
+    parser.add_argument('--max-depth', type=int, default=None,
+                        help='maximal depth of dumped trees')
+    args = parser.parse_args(argv)
+
+    if args.dump is None:
+        UIInspector().run()
+        return 0
+
+    if args.dump:
+        windows = [uisoup.get_window(args.dump)]
+    else:
+        windows = TreeDumper.top_level_windows(
+            uisoup.get_visible_window_list())
+
+    dumper = TreeDumper(stdout, args.max_depth)
     try:
-        x_old, y_old = None, None
-        while True:
-            x, y = uisoup.mouse.get_position()
-            if (x, y) != (x_old, y_old):
-                x_old, y_old = x, y
-                obj_element = uisoup.get_object_by_coordinates(x, y)
-                clear_command = \
-                    'cls' if platform_system() == 'Windows' else 'clear'
-                printable_data = \
-                    UIInspector.get_current_element_info(obj_element)
-                system(clear_command)
-                print printable_data
-            sleep(0.5)
+        for i, window in enumerate(windows):
+            dumper.dump(window, i)
     except KeyboardInterrupt:
-        system('cls')
+        pass
+    except IOError:
+        # Output pipe was closed e.g. by head.
+        pass
+
+    return 0
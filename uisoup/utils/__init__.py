@@ -19,6 +19,7 @@ __author__ = 'f1ashhimself@gmail.com'
 import re
 
 from .. import TooSaltyUISoupException
+from .text_normalizer import TextNormalizer
 
 
 class _Utils(object):
@@ -45,7 +46,7 @@ class _Utils(object):
     def replace_inappropriate_symbols(cls, text):
         """
         Replaces inappropriate symbols e.g. \xa0 (non-breaking space) to
-        normal space.
+        normal space, see TextNormalizer for full list and options.
 
         Arguments:
             - text: string, text in which symbols should be replaced.
@@ -55,13 +56,7 @@ class _Utils(object):
             - string with processed text.
         """
 
-        replace_pairs = [(u'\xa0', ' '),
-                         (u'\u2014', '-')]
-
-        for from_, to_ in replace_pairs:
-            text = text.replace(from_, to_)
-
-        return text
+        return TextNormalizer.normalize(text)
 
     @classmethod
     def verify_xy_coordinates(self, x, y):
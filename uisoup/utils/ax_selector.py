@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import os
+import re
+from types import FunctionType
+
+from .glob_matcher import GlobMatcher
+from .prefix_trie import PrefixTrie
+from .text_normalizer import TextNormalizer
+
+
+def match_value(expected, value):
+    """
+    Matches value the same way as IElement._match does.
+
+    Arguments:
+        - expected: string with wildcard or lambda.
+        - value: value of element attribute.
+
+    Returns:
+        - True if value matches otherwise False.
+    """
+
+    try:
+        if type(expected) is FunctionType:
+            return bool(expected(value))
+        return GlobMatcher.get(expected).match(value)
+    except Exception:
+        return False
+
+
+class AXSelector(object):
+    """
+    Splits search criteria of MacElement into part that atomac matches
+    while it walks the tree (native) and residual part that is checked in
+    Python on elements found natively.
+
+    Native part is a necessary condition only: e.g. role_name "mnu" is
+    pushed down as AXRole "AXMenu*", residual check keeps exact semantics of
+    IElement._match.
+    """
+
+    # Abbreviation of roles that are not in role name map.
+    UNKNOWN_ROLE_NAME = u'unknown'
+
+    _tries = {}
+
+    def __init__(self, kwargs, role_name_map):
+        """
+        Constructor.
+
+        Arguments:
+            - kwargs: search criteria of find/findall, uisoup names (name,
+            c_name, role_name...) and AX attribute names (AXRole...).
+            - role_name_map: dict of AX role and role name abbreviation.
+        """
+
+        kwargs = TextNormalizer.normalize_criteria(kwargs)
+        self.criteria = kwargs
+        # Criteria atomac matches while it walks the tree.
+        self.native = {}
+        # AX attributes that atomac can't match, e.g. lambdas.
+        self.attributes = {}
+        # uisoup criteria checked by IElement._match.
+        self.residual = {}
+        # Criteria that no element can satisfy.
+        self.impossible = False
+
+        self._trie = self._role_trie(role_name_map)
+
+        roles = None
+        for name, expected in kwargs.items():
+            if name.startswith('AX'):
+                if type(expected) is FunctionType:
+                    self.attributes[name] = expected
+                else:
+                    self.native[name] = expected
+                continue
+
+            self.residual[name] = expected
+            if name == 'role_name':
+                candidates = self._role_name_roles(expected)
+            elif name == 'c_name':
+                candidates = self._c_name_roles(expected)
+            else:
+                continue
+            if candidates is not None:
+                roles = candidates if roles is None else roles & candidates
+
+        if roles is not None and 'AXRole' not in self.native:
+            if not roles:
+                self.impossible = True
+            else:
+                pattern = self._role_pattern(roles)
+                if pattern:
+                    self.native['AXRole'] = pattern
+
+    @property
+    def has_residual(self):
+        return bool(self.attributes or self.residual)
+
+    @classmethod
+    def _role_trie(cls, role_name_map):
+        """
+        Gets trie of role name abbreviations of role name map, trie is built
+        once per map.
+
+        Arguments:
+            - role_name_map: dict of AX role and role name abbreviation.
+
+        Returns:
+            - PrefixTrie where value of abbreviation is AX role, None is value
+            of unknown role name.
+        """
+
+        cached = cls._tries.get(id(role_name_map))
+        if cached is not None and cached[0] is role_name_map:
+            return cached[1]
+
+        trie = PrefixTrie(sorted((role_name, role) for role, role_name in
+                                 role_name_map.items()))
+        trie.add(cls.UNKNOWN_ROLE_NAME, None)
+        # Map is kept in cache to keep its id unique.
+        cls._tries[id(role_name_map)] = (role_name_map, trie)
+
+        return trie
+
+    @staticmethod
+    def _roles(entries):
+        """
+        Gets AX roles of trie entries.
+
+        Arguments:
+            - entries: list of (role name, AX roles) found in trie.
+
+        Returns:
+            - set of AX roles or None if any role out of the map is possible.
+        """
+
+        roles = set()
+        for _, values in entries:
+            if None in values:
+                return None
+            roles.update(values)
+
+        return roles
+
+    @staticmethod
+    def _split_wildcard(expected):
+        literal = re.split(r'[*?]', expected, 1)[0]
+
+        return literal, len(literal) < len(expected)
+
+    def _role_name_roles(self, expected):
+        if type(expected) is FunctionType:
+            entries = self._trie.with_prefix('')
+        else:
+            literal, has_wildcard = self._split_wildcard(expected)
+            if not has_wildcard:
+                values = self._trie.get(literal)
+                return self._roles([(literal, values)] if values else [])
+            entries = self._trie.with_prefix(literal)
+
+        return self._roles([(role_name, values) for role_name, values in
+                            entries if match_value(expected, role_name)])
+
+    def _c_name_roles(self, expected):
+        """
+        Gets AX roles of elements which c_name (role name + name) can match
+        wildcard. Role name is abbreviation the literal beginning of wildcard
+        starts with or, if wildcard follows, abbreviation that starts with
+        the literal.
+
+        Arguments:
+            - expected: string with wildcard or lambda.
+
+        Returns:
+            - set of AX roles or None if role can't be narrowed.
+        """
+
+        if type(expected) is FunctionType or match_value(expected, ''):
+            # Element with empty name has empty c_name whatever role is.
+            return None
+
+        literal, has_wildcard = self._split_wildcard(expected)
+        # Without wildcard name after role name is not empty.
+        entries = [(role_name, values) for role_name, values in
+                   self._trie.prefixes_of(literal) if
+                   has_wildcard or len(role_name) < len(literal)]
+        if has_wildcard:
+            entries.extend((role_name, values) for role_name, values in
+                           self._trie.with_prefix(literal) if
+                           len(role_name) > len(literal))
+
+        return self._roles(entries)
+
+    @staticmethod
+    def _role_pattern(roles):
+        """
+        Gets atomac wildcard that matches all roles.
+
+        Arguments:
+            - roles: set of AX roles.
+
+        Returns:
+            - string or None if wildcard would match every role.
+        """
+
+        if len(roles) == 1:
+            return next(iter(roles))
+
+        prefix = os.path.commonprefix(sorted(roles))
+        if len(prefix) <= len('AX'):
+            return None
+
+        return prefix + '*'
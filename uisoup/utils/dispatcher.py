@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import logging
+import sys
+import threading
+import Queue
+
+from .. import TooSaltyUISoupException
+
+
+_logger = logging.getLogger(__name__)
+
+
+class InputFuture(object):
+    """
+    Result of command submitted to InputDispatcher.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._result = None
+        self._exc_info = None
+        self._callbacks = []
+
+    def done(self):
+        """
+        Indicates is command already executed.
+        """
+
+        return self._event.is_set()
+
+    def _wait(self, timeout):
+        if not self._event.wait(timeout):
+            raise TooSaltyUISoupException(
+                'Input command was not executed in %s seconds.' % timeout)
+
+    def result(self, timeout=None):
+        """
+        Waits for command and returns its result.
+
+        Arguments:
+            - timeout: float, time to wait in seconds, if not defined will
+            wait forever.
+
+        Returns:
+            - Result of command, exception raised by command will be
+            re-raised.
+        """
+
+        self._wait(timeout)
+        if self._exc_info:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+
+        return self._result
+
+    def exception(self, timeout=None):
+        """
+        Waits for command and returns exception raised by it.
+
+        Arguments:
+            - timeout: float, time to wait in seconds, if not defined will
+            wait forever.
+
+        Returns:
+            - Exception instance or None.
+        """
+
+        self._wait(timeout)
+
+        return self._exc_info[1] if self._exc_info else None
+
+    def add_done_callback(self, callback):
+        """
+        Adds callback that will be called with this future when command is
+        executed.
+
+        Arguments:
+            - callback: callable.
+
+        Returns:
+            - None
+        """
+
+        with self._lock:
+            if not self.done():
+                self._callbacks.append(callback)
+                return
+
+        callback(self)
+
+    def _set(self, result=None, exc_info=None):
+        with self._lock:
+            self._result = result
+            self._exc_info = exc_info
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception:
+                # Other callbacks and worker should not suffer from it.
+                _logger.exception('Callback %r of input future failed.',
+                                  callback)
+
+
+class _InputProxy(object):
+    """
+    Proxy that submits method calls of mouse or keyboard to dispatcher and
+    returns futures instead of results.
+    """
+
+    def __init__(self, dispatcher, target):
+        self._dispatcher = dispatcher
+        self._target = target
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr) or name.startswith('_'):
+            return attr
+
+        def submit(*args, **kwargs):
+            return self._dispatcher.submit(attr, *args, **kwargs)
+
+        return submit
+
+
+class SerialExecutor(object):
+    """
+    Executes submitted commands in order of submission on a single worker
+    thread. If there are max_pending commands in queue, submitting thread
+    is blocked until worker catches up.
+    """
+
+    _STOP = object()
+
+    def __init__(self, max_pending=64, name='uisoup-worker'):
+        """
+        Constructor.
+
+        Arguments:
+            - max_pending: int, max number of commands in queue.
+            - name: string, name of worker thread.
+        """
+
+        self.name = name
+        self._queue = Queue.Queue(max_pending)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def pending(self):
+        """
+        Property for approximate number of commands in queue.
+        """
+
+        return self._queue.qsize()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run,
+                                                name=self.name)
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is self._STOP:
+                    break
+                future, action, args, kwargs = item
+                try:
+                    result = action(*args, **kwargs)
+                except BaseException:
+                    future._set(exc_info=sys.exc_info())
+                else:
+                    future._set(result)
+            finally:
+                self._queue.task_done()
+
+    def _check_not_worker(self, operation):
+        if threading.current_thread() is self._thread:
+            raise TooSaltyUISoupException(
+                '%s of %s can not be called by its command, it would wait '
+                'for itself.' % (operation, self.name))
+
+    def submit(self, action, *args, **kwargs):
+        """
+        Submits command to worker thread.
+
+        Arguments:
+            - action: callable, command.
+            - *args: arguments of command.
+            - **kwargs: keyword arguments of command.
+
+        Returns:
+            - InputFuture instance.
+        """
+
+        self._ensure_started()
+        future = InputFuture()
+        self._queue.put((future, action, args, kwargs))
+
+        return future
+
+    def flush(self, timeout=None):
+        """
+        Waits until all submitted commands are executed.
+
+        Arguments:
+            - timeout: float, time to wait in seconds, if not defined will
+            wait forever.
+
+        Returns:
+            - None
+        """
+
+        self._check_not_worker('flush')
+        self.submit(lambda: None).result(timeout)
+
+    def stop(self, timeout=None):
+        """
+        Executes submitted commands and stops worker thread.
+
+        Arguments:
+            - timeout: float, time to wait in seconds, if not defined will
+            wait forever.
+
+        Returns:
+            - None
+        """
+
+        self._check_not_worker('stop')
+        with self._lock:
+            thread, self._thread = self._thread, None
+
+        if thread is not None and thread.is_alive():
+            self._queue.put(self._STOP)
+            thread.join(timeout)
+
+
+class InputDispatcher(SerialExecutor):
+    """
+    Owns OS input calls on a single worker thread.
+
+    Commands are executed in order of submission. Element properties should
+    be resolved on caller thread, only input itself should be submitted,
+    e.g.:
+
+        x, y, w, h = element.acc_location
+        dispatcher.mouse.click(x + w / 2, y + h / 2)
+
+    Order is kept among commands submitted to dispatcher only: direct calls
+    of soup.mouse, soup.keyboard and element input methods (click, drag_to
+    etc.) are executed on caller thread at once and may interleave with
+    queued commands, call flush() before them.
+    """
+
+    def __init__(self, mouse, keyboard, max_pending=64):
+        """
+        Constructor.
+
+        Arguments:
+            - mouse: IMouse instance.
+            - keyboard: IKeyboard instance.
+            - max_pending: int, max number of commands in queue.
+        """
+
+        super(InputDispatcher, self).__init__(max_pending, 'uisoup-input')
+        self.mouse = _InputProxy(self, mouse)
+        self.keyboard = _InputProxy(self, keyboard)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import os
+import threading
+import weakref
+
+from .tracing import Tracer
+
+
+class ElementPool(object):
+    """
+    Interning pool of element wrappers keyed by element identity. Pool keeps
+    weak references only, so wrapper lives while somebody uses it and all
+    that time the same UI object is represented by the same wrapper.
+
+    Every thread has own table in every pool, so wrappers (and COM pointers
+    inside them) never pass from one thread to another through pool. Lookups
+    use default pool unless other pool is activated by "with pool:" block,
+    e.g. every Session has own pool. When pooled wrapper is handed out by
+    new lookup it takes UI object reference of fresh wrapper and new empty
+    caches, caches that are iterated at the moment are not touched.
+
+    Pool is enabled by default, UISOUP_ELEMENT_POOL=0 disables it.
+    """
+
+    enabled = os.environ.get('UISOUP_ELEMENT_POOL', '1') != '0'
+
+    default = None
+
+    _active = threading.local()
+    _pools = weakref.WeakSet()
+    _pools_lock = threading.Lock()
+
+    def __init__(self):
+        # Thread -> table of wrappers used by that thread.
+        self._tables = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._counters = {'interned': 0, 'reused': 0, 'unhashable': 0}
+
+        with self._pools_lock:
+            self._pools.add(self)
+
+    def __enter__(self):
+        stack = self._active.__dict__.setdefault('stack', [])
+        stack.append(self)
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._active.stack.pop()
+
+    @classmethod
+    def current(cls):
+        """
+        Gets pool used by lookups of calling thread.
+
+        Arguments:
+            - None
+
+        Returns:
+            - ElementPool instance activated last by this thread, default
+            pool if there is no active pool.
+        """
+
+        stack = getattr(cls._active, 'stack', None)
+
+        return stack[-1] if stack else cls.default
+
+    @classmethod
+    def intern(cls, element):
+        """
+        Gets pooled wrapper of the same UI object from current pool or adds
+        element to it.
+
+        Arguments:
+            - element: IElement instance that was just created.
+
+        Returns:
+            - pooled IElement instance.
+        """
+
+        return cls.current().add(element)
+
+    def add(self, element):
+        """
+        Gets pooled wrapper of the same UI object or adds element to this
+        pool.
+
+        Arguments:
+            - element: IElement instance that was just created.
+
+        Returns:
+            - pooled IElement instance.
+        """
+
+        if not self.enabled:
+            return element
+
+        try:
+            key = (type(element), element.identity)
+        except Exception:
+            # Object disappeared, its wrapper is not worth pooling.
+            with self._lock:
+                self._counters['unhashable'] += 1
+            return element
+
+        thread = threading.current_thread()
+        with self._lock:
+            table = self._tables.get(thread)
+            if table is None:
+                table = self._tables[thread] = weakref.WeakValueDictionary()
+            pooled = table.get(key)
+            if pooled is None:
+                table[key] = element
+                self._counters['interned'] += 1
+                return element
+            self._counters['reused'] += 1
+
+        pooled._refresh(element)
+
+        if Tracer.enabled:
+            Tracer.count('elements_reused')
+
+        return pooled
+
+    def get_stats(self):
+        """
+        Gets counters of this pool, see stats.
+
+        Arguments:
+            - None
+
+        Returns:
+            - dict with counters.
+        """
+
+        with self._lock:
+            result = dict(self._counters)
+            result['alive'] = sum(len(table) for table in
+                                  self._tables.values())
+
+        return result
+
+    def clear_pool(self):
+        """
+        Removes all wrappers from this pool and resets its counters.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        with self._lock:
+            self._tables.clear()
+            for counter in self._counters:
+                self._counters[counter] = 0
+
+    @classmethod
+    def _all_pools(cls):
+        with cls._pools_lock:
+            return list(cls._pools)
+
+    @classmethod
+    def set_enabled(cls, enabled):
+        """
+        Enables or disables pools, disabling clears them.
+
+        Arguments:
+            - enabled: bool.
+
+        Returns:
+            - None
+        """
+
+        cls.enabled = enabled
+        if not enabled:
+            cls.clear()
+
+    @classmethod
+    def stats(cls):
+        """
+        Gets counters summed over all pools.
+
+        Arguments:
+            - None
+
+        Returns:
+            - dict with "interned" (wrappers added to pool), "reused"
+            (duplicate wrappers replaced by pooled ones), "unhashable"
+            (wrappers without identity), "alive" (wrappers in pool now) and
+            "reuse_ratio" (share of lookups served from pool).
+        """
+
+        result = {'interned': 0, 'reused': 0, 'unhashable': 0, 'alive': 0}
+        for pool in cls._all_pools():
+            for counter, value in pool.get_stats().items():
+                result[counter] += value
+
+        lookups = result['interned'] + result['reused']
+        result['reuse_ratio'] = \
+            float(result['reused']) / lookups if lookups else 0.0
+
+        return result
+
+    @classmethod
+    def reset_stats(cls):
+        for pool in cls._all_pools():
+            with pool._lock:
+                for counter in pool._counters:
+                    pool._counters[counter] = 0
+
+    @classmethod
+    def clear(cls):
+        """
+        Removes all wrappers from all pools and resets counters.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        for pool in cls._all_pools():
+            pool.clear_pool()
+
+
+ElementPool.default = ElementPool()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import difflib
+import os
+import thread
+import threading
+import time
+from collections import deque, namedtuple
+
+from .timeline import clock
+
+
+FlightRecord = namedtuple('FlightRecord', ['time', 'thread_id', 'name',
+                                           'args', 'kwargs', 'duration',
+                                           'error'])
+
+
+def _format_value(value, max_length=80):
+    if callable(value) and hasattr(value, '__name__'):
+        result = '<%s>' % value.__name__
+    else:
+        result = repr(value)
+
+    return result if len(result) <= max_length else \
+        result[:max_length] + '...'
+
+
+def format_record(record):
+    """
+    Formats flight record as one line of text.
+
+    Arguments:
+        - record: FlightRecord instance.
+
+    Returns:
+        - string.
+    """
+
+    arguments = [_format_value(arg) for arg in record.args]
+    arguments.extend('%s=%s' % (k, _format_value(v)) for k, v in
+                     sorted(record.kwargs.items()))
+    result = '%s.%03d [%s] %s(%s) %.4fs' % (
+        time.strftime('%H:%M:%S', time.localtime(record.time)),
+        int(record.time * 1000) % 1000, record.thread_id, record.name,
+        ', '.join(arguments), record.duration)
+    if record.error:
+        result += ' error: %s' % record.error
+
+    return result
+
+
+class FlightRecorder(object):
+    """
+    Bounded ring buffer of last public operations with their timings.
+    Every TooSaltyUISoupException marks the buffer and reads records up to
+    the mark when its log is requested.
+
+    Capacity is defined by UISOUP_FLIGHT_RECORDER environment variable,
+    zero disables recorder.
+    """
+
+    _capacity = int(os.environ.get('UISOUP_FLIGHT_RECORDER', 256))
+    enabled = _capacity > 0
+    _records = deque(maxlen=_capacity or 1)
+    _lock = threading.Lock()
+
+    @classmethod
+    def set_capacity(cls, capacity):
+        """
+        Changes capacity of buffer, last records are kept.
+
+        Arguments:
+            - capacity: int, number of kept records, zero disables recorder.
+
+        Returns:
+            - None
+        """
+
+        with cls._lock:
+            cls._capacity = capacity
+            cls._records = deque(cls._records, maxlen=capacity or 1)
+            cls.enabled = capacity > 0
+
+    @classmethod
+    def record(cls, name, args, kwargs, duration, error=None):
+        """
+        Adds operation to buffer.
+
+        Arguments:
+            - name: string, operation name.
+            - args: tuple of positional arguments.
+            - kwargs: dict of keyword arguments.
+            - duration: float, duration in seconds.
+            - error: exception raised by operation or None.
+
+        Returns:
+            - FlightRecord instance.
+        """
+
+        if error is not None:
+            error = repr(error)
+        record = FlightRecord(time.time(), thread.get_ident(), name, args,
+                              kwargs, duration, error)
+        # deque.append is atomic, so lock is not needed here.
+        cls._records.append(record)
+
+        return record
+
+    @classmethod
+    def mark(cls):
+        """
+        Gets last record, it marks current end of buffer for snapshot.
+
+        Arguments:
+            - None
+
+        Returns:
+            - FlightRecord instance or None if buffer is empty.
+        """
+
+        try:
+            return cls._records[-1]
+        except IndexError:
+            return None
+
+    @classmethod
+    def snapshot(cls, mark=None):
+        """
+        Gets copy of buffer.
+
+        Arguments:
+            - mark: record returned by mark, if defined records added after
+            it are skipped.
+
+        Returns:
+            - list of FlightRecord, oldest first, empty if mark was pushed
+            out of buffer.
+        """
+
+        with cls._lock:
+            records = list(cls._records)
+
+        if mark is not None:
+            for index in xrange(len(records) - 1, -1, -1):
+                if records[index] is mark:
+                    return records[:index + 1]
+            return []
+
+        return records
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._records.clear()
+
+    @classmethod
+    def dump(cls, stream):
+        """
+        Writes buffer to stream.
+
+        Arguments:
+            - stream: file-like object.
+
+        Returns:
+            - None
+        """
+
+        for record in cls.snapshot():
+            stream.write(format_record(record) + '\n')
+
+
+class SearchDiagnostics(object):
+    """
+    Diagnostics of one element search: criteria, nodes visited, depth
+    reached, time spent and names of visited elements which are nearest to
+    searched one. Names are recorded while elements are matched, elements
+    themselves are not kept.
+    """
+
+    # Maximal number of distinct names kept to find near misses.
+    MAX_SAMPLES = 2000
+
+    def __init__(self, criteria):
+        self.criteria = dict(criteria)
+        self.nodes_visited = 0
+        # Stays None while backend can't tell depth of visited elements.
+        self.max_depth = None
+        self.start = clock()
+        self.duration = None
+        # Criterion which values are recorded, c_name or name.
+        self.criterion = None
+        for criterion in ('c_name', 'name'):
+            if isinstance(self.criteria.get(criterion), basestring):
+                self.criterion = criterion
+                break
+        self._samples = set()
+
+    def visit(self, depth=None):
+        """
+        Accounts visited element.
+
+        Arguments:
+            - depth: int, depth of element relative to search root, None if
+            unknown.
+
+        Returns:
+            - None
+        """
+
+        self.nodes_visited += 1
+        if depth is not None and (self.max_depth is None or
+                                  depth > self.max_depth):
+            self.max_depth = depth
+
+    def sample(self, value):
+        """
+        Records value of searched criterion read from visited element.
+
+        Arguments:
+            - value: string, name or c_name.
+
+        Returns:
+            - None
+        """
+
+        if value and len(self._samples) < self.MAX_SAMPLES:
+            self._samples.add(value)
+
+    def finish(self):
+        """
+        Marks search as finished.
+        """
+
+        if self.duration is None:
+            self.duration = clock() - self.start
+
+    def near_misses(self, limit=5):
+        """
+        Gets recorded names nearest to searched name or c_name.
+
+        Arguments:
+            - limit: int, maximal number of results.
+
+        Returns:
+            - list of tuples (similarity ratio, name), best first.
+        """
+
+        if self.criterion is None:
+            return []
+
+        wanted = self.criteria[self.criterion]
+        wanted = wanted.replace('*', '').replace('?', '')
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(wanted)
+        result = {}
+        for name in self._samples:
+            matcher.set_seq1(name)
+            if matcher.real_quick_ratio() > .5 and matcher.quick_ratio() > .5:
+                result[name] = matcher.ratio()
+
+        return sorted(((ratio, name) for name, ratio in result.items()
+                       if ratio > .5), reverse=True)[:limit]
+
+    def __str__(self):
+        criteria = '; '.join('%s=%s' % (k, _format_value(v)) for k, v in
+                             sorted(self.criteria.items()))
+        depth = ', depth %d' % self.max_depth \
+            if self.max_depth is not None else ''
+        result = 'Search %s: %d nodes visited%s, %.4fs' % (
+            criteria, self.nodes_visited, depth,
+            self.duration if self.duration is not None else
+            clock() - self.start)
+        near_misses = self.near_misses()
+        if near_misses:
+            result += '\nNear misses: ' + ', '.join(
+                '%r (%.2f)' % (name, ratio) for ratio, name in near_misses)
+
+        return result
@@ -0,0 +1,392 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+# Bulk geometry over element rectangles. Rectangles are (x, y, width,
+# height) like acc_location. With NumPy (pip install uisoup-yandex[geometry])
+# operations are vectorized, otherwise the same results are computed in pure
+# Python. Masks are NumPy bool arrays or lists of bools respectively.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .. import TooSaltyUISoupException
+
+
+class RectArray(object):
+    """
+    Rectangles of many elements loaded once. Order of rectangles is z-order:
+    later rectangle is above earlier one, as children of element are.
+    """
+
+    __slots__ = ('elements', '_rects')
+
+    def __init__(self, rects, elements=None):
+        """
+        Constructor.
+
+        Arguments:
+            - rects: sequence of (x, y, width, height) or NumPy array with
+            shape (n, 4).
+            - elements: list of elements rectangles belong to.
+        """
+
+        if numpy is not None:
+            self._rects = numpy.asarray(rects, dtype=numpy.int64). \
+                reshape(-1, 4)
+        else:
+            self._rects = [self._as_rect(rect) for rect in rects]
+        self.elements = elements
+
+    @classmethod
+    def from_elements(cls, elements):
+        """
+        Reads location of every element once.
+
+        Arguments:
+            - elements: list of elements, location of element that can't be
+            read is considered empty.
+
+        Returns:
+            - RectArray instance.
+        """
+
+        elements = list(elements)
+        rects = []
+        for element in elements:
+            try:
+                rects.append(tuple(element.acc_location))
+            except Exception:
+                rects.append((0, 0, 0, 0))
+
+        return cls(rects, elements)
+
+    @staticmethod
+    def _as_rect(rect):
+        """
+        Validates rectangle and truncates its values to ints, as NumPy
+        array of rectangles does.
+
+        Arguments:
+            - rect: sequence (x, y, width, height).
+
+        Returns:
+            - tuple of 4 ints.
+        """
+
+        try:
+            x, y, w, h = rect
+            return int(x), int(y), int(w), int(h)
+        except (TypeError, ValueError):
+            raise TooSaltyUISoupException(
+                'Rectangle (x, y, width, height) is expected, got %r.' %
+                (rect,))
+
+    def __len__(self):
+        return len(self._rects)
+
+    def __getitem__(self, index):
+        return tuple(int(value) for value in self._rects[index])
+
+    def __iter__(self):
+        for index in xrange(len(self)):
+            yield self[index]
+
+    def take(self, indices):
+        """
+        Gets rectangles by indices, e.g. parents of elements.
+
+        Arguments:
+            - indices: sequence of ints.
+
+        Returns:
+            - RectArray instance.
+        """
+
+        indices = list(indices)
+        elements = [self.elements[i] for i in indices] \
+            if self.elements is not None else None
+        if numpy is not None:
+            return RectArray(self._rects[numpy.asarray(indices, dtype=int)]
+                             if indices else [], elements)
+
+        return RectArray([self._rects[i] for i in indices], elements)
+
+    def select(self, mask):
+        """
+        Gets rectangles where mask is true.
+
+        Arguments:
+            - mask: mask returned by one of filters.
+
+        Returns:
+            - RectArray instance.
+        """
+
+        return self.take(i for i, flag in enumerate(mask) if flag)
+
+    def where(self, mask):
+        """
+        Gets elements where mask is true.
+
+        Arguments:
+            - mask: mask returned by one of filters.
+
+        Returns:
+            - list of elements.
+        """
+
+        if self.elements is None:
+            raise TooSaltyUISoupException('Rectangles have no elements.')
+
+        return [element for element, flag in zip(self.elements, mask) if
+                flag]
+
+    def _columns(self):
+        rects = self._rects
+        return rects[:, 0], rects[:, 1], rects[:, 2], rects[:, 3]
+
+    def non_empty(self):
+        """
+        Mask of rectangles with positive width and height.
+        """
+
+        if numpy is not None:
+            x, y, w, h = self._columns()
+            return (w > 0) & (h > 0)
+
+        return [w > 0 and h > 0 for _, _, w, h in self._rects]
+
+    def intersects(self, rect):
+        """
+        Mask of rectangles that have common area with rect.
+
+        Arguments:
+            - rect: tuple (x, y, width, height).
+
+        Returns:
+            - mask.
+        """
+
+        r_x, r_y, r_w, r_h = self._as_rect(rect)
+        if numpy is not None:
+            x, y, w, h = self._columns()
+            return (x < r_x + r_w) & (r_x < x + w) & \
+                (y < r_y + r_h) & (r_y < y + h) & (w > 0) & (h > 0)
+
+        return [x < r_x + r_w and r_x < x + w and y < r_y + r_h and
+                r_y < y + h and w > 0 and h > 0 for x, y, w, h in
+                self._rects]
+
+    def on_screen(self, screen):
+        """
+        Mask of rectangles that are at least partially visible on screen.
+
+        Arguments:
+            - screen: tuple (width, height) or (x, y, width, height) of
+            screen.
+
+        Returns:
+            - mask.
+        """
+
+        rect = (0, 0) + tuple(screen) if len(screen) == 2 else screen
+
+        return self.intersects(rect)
+
+    def contained_in(self, other):
+        """
+        Mask of rectangles that lie inside other rectangle.
+
+        Arguments:
+            - other: tuple (x, y, width, height) or RectArray of the same
+            length, then rectangles are compared pairwise, e.g. with
+            rectangles of parents.
+
+        Returns:
+            - mask.
+        """
+
+        if isinstance(other, RectArray):
+            if len(other) != len(self):
+                raise TooSaltyUISoupException(
+                    'Rectangle arrays have different lengths %d and %d.' %
+                    (len(self), len(other)))
+            others = other._rects
+        else:
+            others = None
+            o_x, o_y, o_w, o_h = self._as_rect(other)
+
+        if numpy is not None:
+            x, y, w, h = self._columns()
+            if others is not None:
+                o_x, o_y, o_w, o_h = others[:, 0], others[:, 1], \
+                    others[:, 2], others[:, 3]
+            return (x >= o_x) & (y >= o_y) & (x + w <= o_x + o_w) & \
+                (y + h <= o_y + o_h)
+
+        if others is None:
+            others = [(o_x, o_y, o_w, o_h)] * len(self._rects)
+
+        return [x >= o_x and y >= o_y and x + w <= o_x + o_w and
+                y + h <= o_y + o_h for (x, y, w, h), (o_x, o_y, o_w, o_h) in
+                zip(self._rects, others)]
+
+    def overlaps(self):
+        """
+        Finds pairs of rectangles with common area.
+
+        Arguments:
+            - None
+
+        Returns:
+            - list of tuples (i, j) where i < j.
+        """
+
+        result = []
+        if numpy is not None:
+            x, y, w, h = self._columns()
+            valid = (w > 0) & (h > 0)
+            for i in xrange(len(self) - 1):
+                if not valid[i]:
+                    continue
+                rest = slice(i + 1, None)
+                hits = (x[rest] < x[i] + w[i]) & (x[i] < x[rest] + w[rest]) & \
+                    (y[rest] < y[i] + h[i]) & (y[i] < y[rest] + h[rest]) & \
+                    valid[rest]
+                result.extend((i, i + 1 + int(j)) for j in
+                              numpy.flatnonzero(hits))
+
+            return result
+
+        # Sweep over rectangles sorted by left edge.
+        order = sorted((rect[0], i) for i, rect in enumerate(self._rects) if
+                       rect[2] > 0 and rect[3] > 0)
+        active = []
+        for left, i in order:
+            _, y, _, h = self._rects[i]
+            active = [j for j in active if
+                      self._rects[j][0] + self._rects[j][2] > left]
+            for j in active:
+                _, j_y, _, j_h = self._rects[j]
+                if j_y < y + h and y < j_y + j_h:
+                    result.append((min(i, j), max(i, j)))
+            active.append(i)
+
+        return sorted(result)
+
+    def occluders(self):
+        """
+        Finds rectangles above every rectangle that cover part of it.
+
+        Arguments:
+            - None
+
+        Returns:
+            - list where item i is list of indices of rectangles above i
+            that overlap it.
+        """
+
+        result = [[] for _ in xrange(len(self))]
+        for i, j in self.overlaps():
+            result[i].append(j)
+
+        return result
+
+    def fully_occluded(self):
+        """
+        Mask of rectangles that are completely covered by one rectangle
+        above them.
+        """
+
+        if numpy is not None:
+            x, y, w, h = self._columns()
+            result = numpy.zeros(len(self), dtype=bool)
+            for i in xrange(len(self) - 1):
+                if w[i] <= 0 or h[i] <= 0:
+                    continue
+                rest = slice(i + 1, None)
+                result[i] = numpy.any(
+                    (x[rest] <= x[i]) & (y[rest] <= y[i]) &
+                    (x[rest] + w[rest] >= x[i] + w[i]) &
+                    (y[rest] + h[rest] >= y[i] + h[i]) &
+                    (w[rest] > 0) & (h[rest] > 0))
+
+            return result
+
+        result = [False] * len(self)
+        for i, occluders in enumerate(self.occluders()):
+            x, y, w, h = self._rects[i]
+            for j in occluders:
+                o_x, o_y, o_w, o_h = self._rects[j]
+                if o_x <= x and o_y <= y and o_x + o_w >= x + w and \
+                        o_y + o_h >= y + h:
+                    result[i] = True
+                    break
+
+        return result
+
+    def reading_order(self, row_tolerance=None):
+        """
+        Sorts rectangles in reading order: rows from top to bottom and
+        rectangles in row from left to right.
+
+        Arguments:
+            - row_tolerance: int, max difference of top edges of rectangles
+            in one row, by default half of median height.
+
+        Returns:
+            - list of indices.
+        """
+
+        if not len(self):
+            return []
+
+        if numpy is not None:
+            x, y, w, h = self._columns()
+            if row_tolerance is None:
+                row_tolerance = int(numpy.median(h)) / 2
+            by_top = numpy.argsort(y, kind='mergesort')
+            tops = y[by_top]
+        else:
+            if row_tolerance is None:
+                heights = sorted(rect[3] for rect in self._rects)
+                middle = len(heights) / 2
+                median = heights[middle] if len(heights) % 2 else \
+                    (heights[middle - 1] + heights[middle]) / 2.0
+                row_tolerance = int(median) / 2
+            by_top = sorted(xrange(len(self)), key=lambda i: self._rects[i][1])
+            tops = [self._rects[i][1] for i in by_top]
+
+        # Row starts where top edge is lower than top of row start by more
+        # than tolerance.
+        rows = [0] * len(self)
+        row = 0
+        row_top = tops[0]
+        for position, index in enumerate(by_top):
+            if tops[position] - row_top > row_tolerance:
+                row += 1
+                row_top = tops[position]
+            rows[index] = row
+
+        if numpy is not None:
+            return [int(i) for i in numpy.lexsort((x, numpy.asarray(rows)))]
+
+        return sorted(xrange(len(self)),
+                      key=lambda i: (rows[i], self._rects[i][0]))
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import re
+import threading
+from collections import OrderedDict
+
+
+class GlobMatcher(object):
+    """
+    Compiled wildcard where "*" is any string and "?" is any character.
+    Matches the same values as regex made by
+    _Utils.convert_wildcard_to_regex, but simple wildcards are matched by
+    string operations and any wildcard is matched in time linear in length
+    of value, without backtracking.
+    """
+
+    __slots__ = ('pattern', 'kind', 'ignore_case', '_head', '_tail',
+                 '_segments', '_min_length')
+
+    EXACT = 'exact'
+    PREFIX = 'prefix'
+    SUFFIX = 'suffix'
+    CONTAINS = 'contains'
+    GENERAL = 'general'
+
+    cache_size = 1024
+
+    _cache = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, pattern, ignore_case=False):
+        """
+        Constructor.
+
+        Arguments:
+            - pattern: string, wildcard.
+            - ignore_case: bool, if True case of letters is ignored.
+        """
+
+        self.pattern = pattern
+        self.ignore_case = ignore_case
+        if ignore_case:
+            pattern = pattern.lower()
+
+        parts = pattern.split('*')
+        self._head = self._segment(parts[0])
+        self._tail = self._segment(parts[-1]) if len(parts) > 1 else None
+        self._segments = [self._segment(part) for part in parts[1:-1] if
+                          part]
+        self._min_length = len(pattern) - len(parts) + 1
+
+        if '?' in pattern:
+            self.kind = self.GENERAL
+        elif len(parts) == 1:
+            self.kind = self.EXACT
+        elif not self._segments and not parts[-1]:
+            self.kind = self.PREFIX
+        elif not self._segments and not parts[0]:
+            self.kind = self.SUFFIX
+        elif len(self._segments) == 1 and not parts[0] and not parts[-1]:
+            self.kind = self.CONTAINS
+        else:
+            self.kind = self.GENERAL
+
+    def __repr__(self):
+        return '<GlobMatcher %s %r>' % (self.kind, self.pattern)
+
+    @staticmethod
+    def _segment(text):
+        """
+        Compiles part of wildcard between stars.
+
+        Arguments:
+            - text: string without stars.
+
+        Returns:
+            - tuple (length, text itself or compiled regex if text has "?").
+        """
+
+        if '?' not in text:
+            return len(text), text
+
+        return len(text), re.compile(
+            '(?s)' + '.'.join(re.escape(chunk) for chunk in text.split('?')))
+
+    @classmethod
+    def get(cls, pattern, ignore_case=False):
+        """
+        Gets compiled wildcard, recently used wildcards are cached.
+
+        Arguments:
+            - pattern: string, wildcard.
+            - ignore_case: bool, if True case of letters is ignored.
+
+        Returns:
+            - GlobMatcher instance.
+        """
+
+        key = (type(pattern), pattern, ignore_case)
+        with cls._lock:
+            matcher = cls._cache.pop(key, None)
+            if matcher is not None:
+                cls._cache[key] = matcher
+                return matcher
+
+        matcher = cls(pattern, ignore_case)
+        with cls._lock:
+            cls._cache[key] = matcher
+            while len(cls._cache) > cls.cache_size:
+                cls._cache.popitem(last=False)
+
+        return matcher
+
+    @classmethod
+    def clear_cache(cls):
+        with cls._lock:
+            cls._cache.clear()
+
+    def match(self, value):
+        """
+        Checks that whole value matches wildcard.
+
+        Arguments:
+            - value: string.
+
+        Returns:
+            - True if value matches otherwise False.
+        """
+
+        if not isinstance(value, basestring):
+            raise TypeError('Expected string, got %r.' % type(value))
+
+        if self.ignore_case:
+            value = value.lower()
+
+        if self._match(value):
+            return True
+
+        # Regex "$" matches before trailing new line too.
+        return value[-1:] == '\n' and self._match(value[:-1])
+
+    def _match(self, value):
+        kind = self.kind
+        if kind == self.EXACT:
+            return value == self._head[1]
+        elif kind == self.PREFIX:
+            return value.startswith(self._head[1])
+        elif kind == self.SUFFIX:
+            return value.endswith(self._tail[1])
+        elif kind == self.CONTAINS:
+            return self._segments[0][1] in value
+
+        if len(value) < self._min_length:
+            return False
+
+        # Head and tail are anchored, segments between stars are placed
+        # leftmost one after another, leftmost placement never prevents
+        # match of the rest.
+        head_length, head = self._head
+        if not self._at(head, value, 0):
+            return False
+        if self._tail is None:
+            return len(value) == head_length
+
+        end = len(value) - self._tail[0]
+        if not self._at(self._tail[1], value, end):
+            return False
+
+        position = head_length
+        for length, segment in self._segments:
+            if isinstance(segment, basestring):
+                found = value.find(segment, position, end)
+            else:
+                found = segment.search(value, position, end)
+                found = found.start() if found is not None else -1
+            if found < 0:
+                return False
+            position = found + length
+
+        return True
+
+    @staticmethod
+    def _at(segment, value, position):
+        if isinstance(segment, basestring):
+            return value.startswith(segment, position)
+
+        return segment.match(value, position) is not None
+
+
+def glob_match(pattern, value, ignore_case=False):
+    """
+    Matches value with wildcard using cached GlobMatcher.
+
+    Arguments:
+        - pattern: string, wildcard.
+        - value: string.
+        - ignore_case: bool, if True case of letters is ignored.
+
+    Returns:
+        - True if value matches otherwise False.
+    """
+
+    return GlobMatcher.get(pattern, ignore_case).match(value)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import threading
+
+from .timeline import clock
+
+
+class InputState(object):
+    """
+    Software shadow of input state: cursor position, held mouse buttons and
+    held keys.
+
+    Cursor position is trusted for resync_interval seconds after it was
+    written or queried, after that it is queried from OS again, so
+    position changes made by a real user are picked up. Move is skipped
+    only when real cursor position is at target, shadow only saves the
+    query when cursor is surely elsewhere.
+    """
+
+    def __init__(self, resync_interval=1.0):
+        """
+        Constructor.
+
+        Arguments:
+            - resync_interval: float, time in seconds while shadow cursor
+            position is trusted.
+        """
+
+        self.resync_interval = resync_interval
+        self._lock = threading.RLock()
+        self._position = None
+        self._position_time = None
+        self._buttons = set()
+        self._keys = []
+        self.stats = {'position_queries': 0,
+                      'skipped_queries': 0,
+                      'skipped_moves': 0}
+
+    @property
+    def held_buttons(self):
+        """
+        Property for set of held mouse button names.
+        """
+
+        with self._lock:
+            return set(self._buttons)
+
+    @property
+    def held_keys(self):
+        """
+        Property for list of held key codes in order of pressing.
+        """
+
+        with self._lock:
+            return list(self._keys)
+
+    def _is_fresh(self):
+        return self._position is not None and \
+            clock() - self._position_time < self.resync_interval
+
+    def get_position(self, query_position):
+        """
+        Gets cursor position from shadow or from OS if shadow is stale.
+
+        Arguments:
+            - query_position: callable, that returns real cursor position.
+
+        Returns:
+            - tuple of two integers with x and y coordinates.
+        """
+
+        with self._lock:
+            if self._is_fresh():
+                self.stats['skipped_queries'] += 1
+                return self._position
+
+        return self.resync(query_position)
+
+    def resync(self, query_position):
+        """
+        Queries real cursor position and stores it in shadow.
+
+        Arguments:
+            - query_position: callable, that returns real cursor position.
+
+        Returns:
+            - tuple of two integers with x and y coordinates.
+        """
+
+        x, y = query_position()
+        with self._lock:
+            self.stats['position_queries'] += 1
+            self._position = (x, y)
+            self._position_time = clock()
+
+        return x, y
+
+    def set_position(self, x, y):
+        """
+        Stores cursor position that was set by input event.
+
+        Arguments:
+            - x: integer value with x coordinate.
+            - y: integer value with y coordinate.
+
+        Returns:
+            - None
+        """
+
+        with self._lock:
+            self._position = (x, y)
+            self._position_time = clock()
+
+    def is_at(self, x, y, query_position):
+        """
+        Verifies is cursor at coordinates, so move to them can be skipped.
+        Real position is queried unless fresh shadow position differs from
+        coordinates, real user could move cursor since it was set.
+
+        Arguments:
+            - x: integer value with x coordinate.
+            - y: integer value with y coordinate.
+            - query_position: callable, that returns real cursor position.
+
+        Returns:
+            - True if cursor is at coordinates otherwise False.
+        """
+
+        with self._lock:
+            if self._is_fresh() and self._position != (x, y):
+                self.stats['skipped_queries'] += 1
+                return False
+
+        result = self.resync(query_position) == (x, y)
+        if result:
+            with self._lock:
+                self.stats['skipped_moves'] += 1
+
+        return result
+
+    def invalidate(self):
+        """
+        Forgets shadow cursor position.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        with self._lock:
+            self._position = None
+
+    def press_button(self, button_name):
+        with self._lock:
+            self._buttons.add(button_name)
+
+    def release_button(self, button_name):
+        with self._lock:
+            self._buttons.discard(button_name)
+
+    def press_key(self, key_code):
+        with self._lock:
+            if key_code not in self._keys:
+                self._keys.append(key_code)
+
+    def release_key(self, key_code):
+        with self._lock:
+            if key_code in self._keys:
+                self._keys.remove(key_code)
@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import os
+import math
+import threading
+
+from .timeline import clock
+
+
+def primitive(name):
+    """
+    Marks function or property getter as backend primitive. Marking does
+    not change function, so it costs nothing while instrumentation is
+    disabled.
+
+    Arguments:
+        - name: string, primitive name e.g. "com.accName".
+
+    Returns:
+        - decorator.
+    """
+
+    def decorator(func):
+        func._primitive_name = name
+        return func
+
+    return decorator
+
+
+class _Histogram(object):
+    """
+    Call counter with log2 buckets of latency.
+    """
+
+    # Upper bound of first bucket in seconds (1 microsecond).
+    BASE = 1e-6
+    BUCKETS = 32
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = [0] * self.BUCKETS
+
+    def add(self, seconds, error):
+        self.count += 1
+        self.errors += error
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+        if seconds <= self.BASE:
+            index = 0
+        else:
+            index = min(int(math.ceil(math.log(seconds / self.BASE, 2))),
+                        self.BUCKETS - 1)
+        self.buckets[index] += 1
+
+    def to_dict(self):
+        return {'count': self.count,
+                'errors': self.errors,
+                'total': self.total,
+                'mean': self.total / self.count if self.count else None,
+                'min': self.min,
+                'max': self.max,
+                # List of (upper bound in seconds, count) for not empty
+                # buckets.
+                'buckets': [(self.BASE * 2 ** i, count) for i, count in
+                            enumerate(self.buckets) if count]}
+
+
+class Instrumentation(object):
+    """
+    Opt-in counters and latency histograms of backend primitives.
+
+    Classes with primitives are registered by Instrumentation.register
+    class decorator. While instrumentation is disabled registered classes
+    keep their original functions, enabling swaps in timing wrappers.
+    Instrumentation is enabled on import if UISOUP_INSTRUMENTATION
+    environment variable is set.
+    """
+
+    enabled = False
+    _lock = threading.RLock()
+    _classes = []
+    _patched = []
+    _histograms = {}
+    _listeners = []
+
+    @classmethod
+    def register(cls, klass):
+        """
+        Class decorator that registers class with primitives.
+
+        Arguments:
+            - klass: class.
+
+        Returns:
+            - class.
+        """
+
+        with cls._lock:
+            cls._classes.append(klass)
+            if cls.enabled:
+                cls._patch(klass)
+
+        return klass
+
+    @classmethod
+    def add_listener(cls, listener):
+        """
+        Adds listener that will be called with primitive name, duration in
+        seconds and error flag on every instrumented call.
+
+        Arguments:
+            - listener: callable.
+
+        Returns:
+            - None
+        """
+
+        with cls._lock:
+            if listener not in cls._listeners:
+                cls._listeners.append(listener)
+
+    @classmethod
+    def remove_listener(cls, listener):
+        with cls._lock:
+            if listener in cls._listeners:
+                cls._listeners.remove(listener)
+
+    @classmethod
+    def record(cls, name, seconds, error=False):
+        """
+        Records primitive call.
+
+        Arguments:
+            - name: string, primitive name.
+            - seconds: float, call duration.
+            - error: bool, indicates was call failed.
+
+        Returns:
+            - None
+        """
+
+        with cls._lock:
+            histogram = cls._histograms.get(name)
+            if histogram is None:
+                histogram = cls._histograms[name] = _Histogram()
+            histogram.add(seconds, error)
+            listeners = list(cls._listeners)
+
+        for listener in listeners:
+            listener(name, seconds, error)
+
+    @classmethod
+    def _wrap(cls, name, func):
+        def wrapper(*args, **kwargs):
+            start = clock()
+            error = True
+            try:
+                result = func(*args, **kwargs)
+                error = False
+                return result
+            finally:
+                cls.record(name, clock() - start, error)
+
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        wrapper._primitive_name = name
+
+        return wrapper
+
+    @classmethod
+    def _instrument(cls, descriptor):
+        """
+        Gets instrumented version of class attribute or None if attribute
+        is not a primitive.
+        """
+
+        if isinstance(descriptor, property):
+            name = getattr(descriptor.fget, '_primitive_name', None)
+            if name:
+                return property(cls._wrap(name, descriptor.fget),
+                                descriptor.fset, descriptor.fdel,
+                                descriptor.__doc__)
+        elif isinstance(descriptor, (classmethod, staticmethod)):
+            name = getattr(descriptor.__func__, '_primitive_name', None)
+            if name:
+                return type(descriptor)(
+                    cls._wrap(name, descriptor.__func__))
+        else:
+            name = getattr(descriptor, '_primitive_name', None)
+            if name:
+                return cls._wrap(name, descriptor)
+
+        return None
+
+    @classmethod
+    def _patch(cls, klass):
+        for attr, descriptor in klass.__dict__.items():
+            instrumented = cls._instrument(descriptor)
+            if instrumented is not None:
+                setattr(klass, attr, instrumented)
+                cls._patched.append((klass, attr, descriptor, instrumented))
+
+    @classmethod
+    def enable(cls):
+        """
+        Enables instrumentation.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        with cls._lock:
+            if not cls.enabled:
+                cls.enabled = True
+                for klass in cls._classes:
+                    cls._patch(klass)
+
+    @classmethod
+    def disable(cls):
+        """
+        Disables instrumentation and restores original functions.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        with cls._lock:
+            cls.enabled = False
+            for klass, attr, descriptor, instrumented in \
+                    reversed(cls._patched):
+                # Attribute could be patched by somebody else meanwhile.
+                if klass.__dict__.get(attr) is instrumented:
+                    setattr(klass, attr, descriptor)
+            cls._patched = []
+
+    @classmethod
+    def snapshot(cls):
+        """
+        Gets counters and histograms of all primitives.
+
+        Arguments:
+            - None
+
+        Returns:
+            - dict where key is primitive name and value is dict with
+            count, errors, total, mean, min, max and buckets.
+        """
+
+        with cls._lock:
+            return dict((name, histogram.to_dict()) for name, histogram in
+                        cls._histograms.items())
+
+    @classmethod
+    def reset(cls):
+        """
+        Resets counters and histograms.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        with cls._lock:
+            cls._histograms = {}
+
+    @classmethod
+    def dump(cls, stream):
+        """
+        Writes human readable report sorted by total time.
+
+        Arguments:
+            - stream: file-like object.
+
+        Returns:
+            - None
+        """
+
+        snapshot = cls.snapshot()
+        stream.write('%-45s %8s %6s %10s %10s %10s\n' %
+                     ('primitive', 'count', 'errors', 'total', 'mean', 'max'))
+        for name, stats in sorted(snapshot.items(),
+                                  key=lambda x: -x[1]['total']):
+            stream.write('%-45s %8d %6d %10.4f %10.6f %10.6f\n' % (
+                name, stats['count'], stats['errors'], stats['total'],
+                stats['mean'], stats['max']))
+
+
+if os.environ.get('UISOUP_INSTRUMENTATION'):
+    Instrumentation.enable()
@@ -21,13 +21,27 @@ __author__ = 'f1ashhimself@gmail.com'
 import struct
 from AppKit import NSAppleScript
 from Carbon import AppleEvents
-from retrying import retry
 from ..utils import _Utils
+from ..utils.instrumentation import Instrumentation, primitive
+from ..utils.retry_policy import RetryPolicy, retried
 from .. import TooSaltyUISoupException
 
 
+class AppleScriptError(TooSaltyUISoupException):
+    """
+    AppleScript command failed.
+    """
+
+    def __init__(self, message, number=None):
+        super(AppleScriptError, self).__init__(message)
+        # AppleScript error number, e.g. -1728 for "Can't get".
+        self.number = number
+
+
 class AppleEventDescriptor(object):
 
+    __slots__ = ('_event_descriptor',)
+
     @classmethod
     def _get_aeKeyword(cls, four_char_code):
         """
@@ -183,10 +197,36 @@ class AppleEventDescriptor(object):
         return specifier
 
 
+@Instrumentation.register
 class MacUtils(_Utils):
 
+    # AppleScript errors of System Events that is busy or restarts.
+    ERR_AE_TIMEOUT = -1712
+    ERR_CONNECTION_INVALID = -609
+
+    TRANSIENT_APPLESCRIPT_ERRORS = set([ERR_AE_TIMEOUT,
+                                        ERR_CONNECTION_INVALID])
+
     @classmethod
-    @retry(stop_max_attempt_number=5)
+    def is_transient_applescript_error(cls, error):
+        """
+        Checks that AppleScript command may succeed if it is retried. Errors
+        of script itself, e.g. "Can't get" missing element, are not
+        transient.
+
+        Arguments:
+            - error: exception raised by execute_applescript_command.
+
+        Returns:
+            - True if error is transient otherwise False.
+        """
+
+        return getattr(error, 'number', None) in \
+            cls.TRANSIENT_APPLESCRIPT_ERRORS
+
+    @classmethod
+    @primitive('applescript.execute')
+    @retried('applescript', target='System Events')
     def execute_applescript_command(cls, cmd):
         """
         Executes applescript command.
@@ -207,8 +247,10 @@ class MacUtils(_Utils):
         if not result[0]:
             error_message = 'Error when executing applescript command: %s' %\
                             result[1]['NSAppleScriptErrorMessage']
-            raise TooSaltyUISoupException(error_message.encode('utf-8',
-                                                               'ignore'))
+            number = result[1].get('NSAppleScriptErrorNumber')
+            raise AppleScriptError(error_message.encode('utf-8', 'ignore'),
+                                   int(number) if number is not None else
+                                   None)
 
         return AppleEventDescriptor(result[0])
 
@@ -328,3 +370,11 @@ class MacUtils(_Utils):
                 result = False
 
             return result
+
+
+# Busy System Events fails commands for a while, so they are retried with
+# growing delays and suspended if System Events doesn't recover.
+RetryPolicy.register(RetryPolicy(
+    'applescript', max_attempts=5, base_delay=0.1, max_delay=2.0,
+    deadline=10.0, transient=MacUtils.is_transient_applescript_error,
+    failure_threshold=3, reset_timeout=10.0))
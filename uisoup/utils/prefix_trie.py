@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+
+class PrefixTrie(object):
+    """
+    Trie of string keys, every key holds list of values. Lookups cost is
+    proportional to length of looked up string, not to number of keys.
+    """
+
+    __slots__ = ('_root', '_size')
+
+    def __init__(self, items=()):
+        """
+        Constructor.
+
+        Arguments:
+            - items: sequence of (key, value) pairs, values of equal keys
+            are collected in order of items.
+        """
+
+        # Node is [children dict, values list or None].
+        self._root = [{}, None]
+        self._size = 0
+        for key, value in items:
+            self.add(key, value)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, key):
+        node = self._node(key)
+
+        return node is not None and node[1] is not None
+
+    def add(self, key, value):
+        """
+        Adds value to key.
+
+        Arguments:
+            - key: string.
+            - value: any object.
+
+        Returns:
+            - None
+        """
+
+        node = self._root
+        for char in key:
+            node = node[0].setdefault(char, [{}, None])
+        if node[1] is None:
+            node[1] = []
+            self._size += 1
+        node[1].append(value)
+
+    def _node(self, key):
+        node = self._root
+        for char in key:
+            node = node[0].get(char)
+            if node is None:
+                return None
+
+        return node
+
+    def get(self, key, default=None):
+        """
+        Gets values of key.
+
+        Arguments:
+            - key: string.
+            - default: value returned if there is no such key.
+
+        Returns:
+            - list of values or default.
+        """
+
+        node = self._node(key)
+        if node is None or node[1] is None:
+            return default
+
+        return list(node[1])
+
+    def prefixes_of(self, text):
+        """
+        Finds keys that text starts with.
+
+        Arguments:
+            - text: string.
+
+        Returns:
+            - list of (key, values) from shortest key to longest.
+        """
+
+        result = []
+        node = self._root
+        if node[1] is not None:
+            result.append(('', list(node[1])))
+        for position, char in enumerate(text):
+            node = node[0].get(char)
+            if node is None:
+                break
+            if node[1] is not None:
+                result.append((text[:position + 1], list(node[1])))
+
+        return result
+
+    def longest_prefix(self, text):
+        """
+        Finds the longest key that text starts with.
+
+        Arguments:
+            - text: string.
+
+        Returns:
+            - tuple (key, values) or None if no key is prefix of text.
+        """
+
+        prefixes = self.prefixes_of(text)
+
+        return prefixes[-1] if prefixes else None
+
+    def with_prefix(self, prefix):
+        """
+        Finds keys that start with prefix.
+
+        Arguments:
+            - prefix: string.
+
+        Returns:
+            - list of (key, values) sorted by key.
+        """
+
+        node = self._node(prefix)
+        if node is None:
+            return []
+
+        result = []
+        stack = [(prefix, node)]
+        while stack:
+            key, node = stack.pop()
+            if node[1] is not None:
+                result.append((key, list(node[1])))
+            for char, child in node[0].items():
+                stack.append((key + char, child))
+
+        return sorted(result)
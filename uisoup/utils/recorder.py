@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import json
+import threading
+import time
+
+from .. import TooSaltyUISoupException
+from ..interfaces.i_element import IElement
+from ..interfaces.i_keyboard import Key
+from .timeline import clock, IdleTimeReport
+
+
+_LOG_VERSION = 1
+
+
+def _element_classes():
+    result = []
+    queue = [IElement]
+    while queue:
+        cls = queue.pop(0)
+        for subclass in cls.__subclasses__():
+            queue.append(subclass)
+            if not getattr(subclass, '__abstractmethods__', None):
+                result.append(subclass)
+
+    return result
+
+
+class Recorder(object):
+    """
+    Records mouse, keyboard and element actions to JSON Lines log.
+
+    Each line after header is a list:
+        [time offset in seconds, target, action, args, kwargs]
+    where target is "mouse", "keyboard" or "element". Element actions are
+    stored with element locator (role name and name) instead of element.
+    Nested actions (e.g. mouse move inside of click) are not recorded.
+    """
+
+    MOUSE_ACTIONS = ('move', 'drag', 'press_button', 'release_button',
+                     'click', 'double_click')
+    KEYBOARD_ACTIONS = ('press_key', 'press_key_and_hold', 'release_key',
+                        'send')
+    ELEMENT_ACTIONS = ('set_focus', 'set_value')
+
+    def __init__(self, soup, output):
+        """
+        Constructor.
+
+        Arguments:
+            - soup: ISoup instance which actions will be recorded.
+            - output: string with file path or file-like object.
+        """
+
+        self._soup = soup
+        self._output = output
+        self._stream = None
+        self._patched = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._start = None
+        self.count = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _write(self, target, action, args, kwargs):
+        if target == 'keyboard' and action == 'send':
+            args = [key.to_data() for key in args]
+        line = json.dumps([round(clock() - self._start, 4), target, action,
+                           list(args), kwargs], separators=(',', ':'))
+        with self._lock:
+            self._stream.write(line + '\n')
+            self.count += 1
+
+    def _wrap(self, target, action, method):
+        recorder = self
+
+        def wrapper(obj, *args, **kwargs):
+            depth = getattr(recorder._local, 'depth', 0)
+            if not depth:
+                if target == 'element':
+                    locator = {'role_name': obj.acc_role_name,
+                               'name': obj.acc_name}
+                    recorder._write(target, action, [locator] + list(args),
+                                    kwargs)
+                else:
+                    recorder._write(target, action, args, kwargs)
+
+            recorder._local.depth = depth + 1
+            try:
+                return method(obj, *args, **kwargs)
+            finally:
+                recorder._local.depth = depth
+
+        wrapper.__name__ = method.__name__
+        wrapper.__doc__ = method.__doc__
+
+        return wrapper
+
+    def _patch(self, cls, target, actions):
+        for action in actions:
+            if action in cls.__dict__:
+                method = cls.__dict__[action]
+                setattr(cls, action, self._wrap(target, action, method))
+                self._patched.append((cls, action, method))
+
+    def start(self):
+        """
+        Starts recording.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        if self._stream is not None:
+            raise TooSaltyUISoupException('Recording is already started.')
+
+        if isinstance(self._output, basestring):
+            self._stream = open(self._output, 'w')
+        else:
+            self._stream = self._output
+        self._stream.write(json.dumps({'version': _LOG_VERSION,
+                                       'soup': type(self._soup).__name__,
+                                       'started': time.time()}) + '\n')
+        self._start = clock()
+        self.count = 0
+
+        self._patch(type(self._soup.mouse), 'mouse', self.MOUSE_ACTIONS)
+        self._patch(type(self._soup.keyboard), 'keyboard',
+                    self.KEYBOARD_ACTIONS)
+        for cls in _element_classes():
+            self._patch(cls, 'element', self.ELEMENT_ACTIONS)
+
+    def stop(self):
+        """
+        Stops recording and restores original methods.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        for cls, action, method in reversed(self._patched):
+            setattr(cls, action, method)
+        self._patched = []
+
+        if self._stream is not None:
+            self._stream.flush()
+            if self._stream is not self._output:
+                self._stream.close()
+            self._stream = None
+
+
+class Replayer(object):
+    """
+    Replays log written by Recorder.
+    """
+
+    def __init__(self, soup, root=None):
+        """
+        Constructor.
+
+        Arguments:
+            - soup: ISoup instance which will be used to replay actions.
+            - root: element that will be used to find elements of element
+            actions, if not defined Desktop Window will be used.
+        """
+
+        self._soup = soup
+        self._root = root
+        self._methods = {}
+        self._elements = {}
+
+    def _get_method(self, target, action):
+        key = (target, action)
+        if key not in self._methods:
+            if target == 'mouse':
+                self._methods[key] = getattr(self._soup.mouse, action)
+            elif target == 'keyboard':
+                self._methods[key] = getattr(self._soup.keyboard, action)
+            else:
+                raise TooSaltyUISoupException(
+                    'Unknown replay target "%s".' % target)
+
+        return self._methods[key]
+
+    def _get_element(self, locator):
+        key = (locator['role_name'], locator['name'])
+        if key not in self._elements:
+            if self._root is None:
+                self._root = self._soup.get_window()
+            name = locator['name']
+            self._elements[key] = self._root.find(
+                role_name=locator['role_name'],
+                name=lambda x: x == name)
+
+        return self._elements[key]
+
+    def _execute(self, target, action, args, kwargs):
+        kwargs = dict((str(k), v) for k, v in kwargs.items())
+
+        if target == 'element':
+            element = self._get_element(args[0])
+            getattr(element, action)(*args[1:], **kwargs)
+        else:
+            if target == 'keyboard' and action == 'send':
+                args = [Key.from_data(key) for key in args]
+            self._get_method(target, action)(*args, **kwargs)
+
+    def replay(self, source, speed=1.0):
+        """
+        Replays log.
+
+        Arguments:
+            - source: string with file path or file-like object.
+            - speed: float, replay speed multiplier, e.g. 2.0 replays two
+            times faster than recorded. If 0 or None actions will be
+            replayed as fast as possible.
+
+        Returns:
+            - int, number of replayed actions.
+        """
+
+        stream = open(source) if isinstance(source, basestring) else source
+        count = 0
+        idle = 0.0
+
+        try:
+            header = json.loads(stream.readline() or 'null')
+            if not isinstance(header, dict) or \
+                    header.get('version') != _LOG_VERSION:
+                raise TooSaltyUISoupException('Unsupported replay log.')
+
+            start = clock()
+            for line in stream:
+                if not line.strip():
+                    continue
+                offset, target, action, args, kwargs = json.loads(line)
+
+                if speed:
+                    delay = start + offset / speed - clock()
+                    if delay > 0:
+                        time.sleep(delay)
+                        idle += delay
+
+                self._execute(target, action, args, kwargs)
+                count += 1
+        finally:
+            if stream is not source:
+                stream.close()
+
+        IdleTimeReport.add('replay', idle)
+
+        return count
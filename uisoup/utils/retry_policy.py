@@ -0,0 +1,502 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import random
+import sys
+import threading
+import time
+
+from .. import TooSaltyUISoupException
+from .instrumentation import Instrumentation
+from .timeline import clock
+from .tracing import Tracer
+
+
+class CircuitOpenError(TooSaltyUISoupException):
+    """
+    Call was rejected because circuit breaker of its target is open.
+    """
+
+    def __init__(self, policy, target):
+        super(CircuitOpenError, self).__init__(
+            'Calls "%s" to %r are suspended after repeated failures.' %
+            (policy, target))
+        self.policy = policy
+        self.target = target
+
+
+class CircuitBreaker(object):
+    """
+    Counts consecutive failures of calls to one target. After
+    failure_threshold failures circuit opens and calls are rejected for
+    reset_timeout seconds, then one trial call is let through: its success
+    closes circuit, its failure opens circuit again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=clock):
+        """
+        Constructor.
+
+        Arguments:
+            - failure_threshold: int, number of consecutive failures that
+            opens circuit.
+            - reset_timeout: float, seconds circuit stays open.
+            - clock: function that returns current time in seconds.
+        """
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._state = self.CLOSED
+        self._opened_at = None
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<CircuitBreaker %s failures=%d>' % (self.state, self.failures)
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and \
+                    self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """
+        Checks whether call may be made now, in half open state only one
+        trial call is allowed.
+
+        Arguments:
+            - None
+
+        Returns:
+            - True if call is allowed otherwise False.
+        """
+
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and \
+                    self._clock() - self._opened_at >= self.reset_timeout:
+                # Trial call, concurrent calls are rejected until it ends.
+                self._state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._state = self.CLOSED
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._state == self.HALF_OPEN or \
+                    self.failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+
+class RetryPolicy(object):
+    """
+    Retries calls of backend primitives that failed with transient error.
+    Delay before retry grows exponentially from base_delay up to max_delay
+    and is shortened by random jitter, so callers don't retry in lockstep.
+    Retrying stops after max_attempts attempts or when next retry would
+    end after deadline. Calls that finally failed with transient error
+    are counted by circuit breaker of call target (e.g. process). Breaker
+    of target that is not called for two reset timeouts, e.g. of process
+    that is gone, is forgotten.
+
+    Policies are registered by name, backends look them up on every call,
+    so RetryPolicy.configure changes behavior of running code.
+    """
+
+    _OPTIONS = ('max_attempts', 'base_delay', 'max_delay', 'multiplier',
+                'jitter', 'deadline', 'transient', 'failure_threshold',
+                'reset_timeout', 'sleep', 'clock', 'random')
+    _COUNTERS = ('calls', 'attempts', 'retries', 'failures', 'permanent',
+                 'rejected')
+
+    _policies = {}
+    _lock = threading.Lock()
+
+    def __init__(self, name, max_attempts=3, base_delay=0.05, max_delay=1.0,
+                 multiplier=2.0, jitter=0.5, deadline=None,
+                 transient=(Exception,), failure_threshold=5,
+                 reset_timeout=30.0, sleep=time.sleep, clock=clock,
+                 random=random.random):
+        """
+        Constructor.
+
+        Arguments:
+            - name: string, policy name.
+            - max_attempts: int, max number of attempts including first one.
+            - base_delay: float, delay before first retry in seconds.
+            - max_delay: float, max delay between attempts in seconds.
+            - multiplier: float, growth factor of delay.
+            - jitter: float from 0 to 1, max share of delay cut randomly.
+            - deadline: float, max seconds from first attempt to end of last
+            delay, None means no limit.
+            - transient: tuple of exception classes or function that gets
+            exception and returns True if call may succeed when retried.
+            - failure_threshold: int, failed calls of target in a row that
+            open its circuit, None disables circuit breaking.
+            - reset_timeout: float, seconds circuit stays open.
+            - sleep: function that waits given seconds.
+            - clock: function that returns current time in seconds.
+            - random: function that returns float from 0 to 1.
+        """
+
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.deadline = deadline
+        self.transient = transient
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.sleep = sleep
+        self.clock = clock
+        self.random = random
+
+        self._counters = dict.fromkeys(self._COUNTERS, 0)
+        self._breakers = {}
+        # Targets which breakers have failures and time of last call to
+        # them, while it is empty target of call is not resolved at all.
+        self._failing = {}
+        self._breakers_lock = threading.Lock()
+
+    def __repr__(self):
+        return '<RetryPolicy %s>' % self.name
+
+    @classmethod
+    def register(cls, policy):
+        """
+        Registers policy under its name, replacing policy with the same
+        name.
+
+        Arguments:
+            - policy: RetryPolicy instance.
+
+        Returns:
+            - RetryPolicy instance.
+        """
+
+        with cls._lock:
+            cls._policies[policy.name] = policy
+
+        return policy
+
+    @classmethod
+    def get(cls, name):
+        """
+        Gets registered policy.
+
+        Arguments:
+            - name: string, policy name.
+
+        Returns:
+            - RetryPolicy instance.
+        """
+
+        try:
+            return cls._policies[name]
+        except KeyError:
+            raise TooSaltyUISoupException(
+                'Retry policy "%s" is not registered.' % name)
+
+    @classmethod
+    def configure(cls, name, **options):
+        """
+        Changes options of registered policy, circuit breakers of policy
+        are reset.
+
+        Arguments:
+            - name: string, policy name.
+            - options: constructor arguments, e.g. max_attempts=1 disables
+            retries.
+
+        Returns:
+            - RetryPolicy instance.
+        """
+
+        policy = cls.get(name)
+        for option, value in options.items():
+            if option not in cls._OPTIONS:
+                raise TooSaltyUISoupException(
+                    'Unknown retry policy option "%s".' % option)
+            setattr(policy, option, value)
+        policy.reset()
+
+        return policy
+
+    @classmethod
+    def stats(cls):
+        """
+        Gets counters and circuit breaker states of all policies.
+
+        Arguments:
+            - None
+
+        Returns:
+            - dict where key is policy name and value is dict with "calls",
+            "attempts", "retries", "failures" (calls failed after retries),
+            "permanent" (calls failed with not transient error), "rejected"
+            (calls rejected by open circuit) and "breakers" (dict of target
+            and circuit state).
+        """
+
+        with cls._lock:
+            policies = list(cls._policies.values())
+
+        result = {}
+        for policy in policies:
+            with policy._breakers_lock:
+                stats = dict(policy._counters)
+                breakers = dict(policy._breakers)
+            stats['breakers'] = dict((target, breaker.state) for
+                                     target, breaker in breakers.items())
+            result[policy.name] = stats
+
+        return result
+
+    def reset(self):
+        """
+        Resets counters and circuit breakers of policy.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        with self._breakers_lock:
+            self._counters = dict.fromkeys(self._COUNTERS, 0)
+            self._breakers = {}
+            self._failing = {}
+
+    def is_transient(self, error):
+        if isinstance(self.transient, tuple):
+            return isinstance(error, self.transient)
+
+        return bool(self.transient(error))
+
+    def delays(self):
+        """
+        Generates delays before retries.
+
+        Arguments:
+            - None
+
+        Returns:
+            - generator of floats, max_attempts - 1 delays in seconds.
+        """
+
+        delay = self.base_delay
+        for _ in xrange(self.max_attempts - 1):
+            yield min(delay, self.max_delay) * \
+                (1 - self.jitter * self.random())
+            delay *= self.multiplier
+
+    def breaker(self, target):
+        """
+        Gets circuit breaker of target.
+
+        Arguments:
+            - target: hashable key of target, e.g. process id.
+
+        Returns:
+            - CircuitBreaker instance.
+        """
+
+        with self._breakers_lock:
+            breaker = self._breakers.get(target)
+            if breaker is None:
+                breaker = self._breakers[target] = CircuitBreaker(
+                    self.failure_threshold, self.reset_timeout, self.clock)
+
+            return breaker
+
+    def _count(self, counter):
+        with self._breakers_lock:
+            self._counters[counter] += 1
+
+    def _forget_idle_targets(self):
+        """
+        Forgets breakers of failing targets that were not called for two
+        reset timeouts.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        expired_at = self.clock() - 2 * self.reset_timeout
+        with self._breakers_lock:
+            for target_key, called_at in self._failing.items():
+                if called_at < expired_at:
+                    del self._failing[target_key]
+                    self._breakers.pop(target_key, None)
+
+    def _touch(self, target_key):
+        with self._breakers_lock:
+            if target_key in self._failing:
+                self._failing[target_key] = self.clock()
+
+    @staticmethod
+    def _resolve(target, args, kwargs):
+        if not callable(target):
+            return target
+
+        try:
+            return target(*args, **kwargs)
+        except Exception:
+            # Target is unknown e.g. process is gone, calls share breaker.
+            return None
+
+    def _record(self, target_key, success):
+        """
+        Records result of call in circuit breaker of target.
+
+        Arguments:
+            - target_key: key of circuit breaker.
+            - success: bool, False if call finally failed with transient
+            error.
+
+        Returns:
+            - None
+        """
+
+        if success:
+            if target_key in self._failing:
+                self.breaker(target_key).record_success()
+                with self._breakers_lock:
+                    self._failing.pop(target_key, None)
+        else:
+            self.breaker(target_key).record_failure()
+            with self._breakers_lock:
+                self._failing[target_key] = self.clock()
+
+    def call(self, func, args=(), kwargs=None, target=None):
+        """
+        Calls function with retries.
+
+        Arguments:
+            - func: function to call.
+            - args: tuple of positional arguments of func.
+            - kwargs: dict of keyword arguments of func.
+            - target: key of circuit breaker or function that gets it from
+            arguments of func, it is called only when circuit breaking
+            needs it.
+
+        Returns:
+            - result of func.
+        """
+
+        kwargs = kwargs or {}
+        breaking = self.failure_threshold is not None
+        resolved = False
+        target_key = None
+        self._count('calls')
+
+        if breaking and self._failing:
+            self._forget_idle_targets()
+        if breaking and self._failing:
+            target_key = self._resolve(target, args, kwargs)
+            resolved = True
+            self._touch(target_key)
+            if not self.breaker(target_key).allow():
+                self._count('rejected')
+                raise CircuitOpenError(self.name, target_key)
+
+        start = self.clock()
+        delays = self.delays()
+        while True:
+            self._count('attempts')
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                exc_info = sys.exc_info()
+                transient = self.is_transient(exc_info[1])
+                delay = next(delays, None) if transient else None
+                if delay is not None and self.deadline is not None and \
+                        self.clock() - start + delay > self.deadline:
+                    delay = None
+
+                if delay is None:
+                    # Not transient error means target responded.
+                    self._count('failures' if transient else 'permanent')
+                    if breaking and (transient or self._failing):
+                        if not resolved:
+                            target_key = self._resolve(target, args, kwargs)
+                        self._record(target_key, not transient)
+                    raise exc_info[0], exc_info[1], exc_info[2]
+
+                self._count('retries')
+                if Instrumentation.enabled:
+                    Instrumentation.record('retry.' + self.name, delay)
+                if Tracer.enabled:
+                    Tracer.count('retries')
+                self.sleep(delay)
+            else:
+                if breaking and self._failing:
+                    if not resolved:
+                        target_key = self._resolve(target, args, kwargs)
+                    self._record(target_key, True)
+
+                return result
+
+
+def retried(policy_name, target=None):
+    """
+    Decorates backend primitive, so its calls are made by registered retry
+    policy.
+
+    Arguments:
+        - policy_name: string, name of registered policy.
+        - target: key of circuit breaker or function that gets it from
+        arguments of decorated function.
+
+    Returns:
+        - decorator.
+    """
+
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            return RetryPolicy.get(policy_name).call(func, args, kwargs,
+                                                     target)
+
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+
+        return wrapper
+
+    return decorator
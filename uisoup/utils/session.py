@@ -0,0 +1,378 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import threading
+import weakref
+
+from .. import TooSaltyUISoupException, create_soup
+from .glob_matcher import GlobMatcher
+from .dispatcher import SerialExecutor
+from .element_pool import ElementPool
+
+
+class _LockedInput(object):
+    """
+    Proxy that calls methods of mouse or keyboard under input lock.
+    """
+
+    def __init__(self, target, lock):
+        self._target = target
+        self._lock = lock
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr) or name.startswith('_'):
+            return attr
+
+        def locked(*args, **kwargs):
+            with self._lock:
+                return attr(*args, **kwargs)
+
+        return locked
+
+
+class Session(object):
+    """
+    Scopes own soup instance, element pool and window cache to set of
+    windows. Every entry point of session that returns elements checks that
+    they belong to windows of session. Elements looked up by session, by
+    tasks of SessionRunner and inside "with session:" block are pooled in
+    pool of session, so sessions never share element wrappers.
+
+    Mouse and keyboard are shared by whole OS, mouse and keyboard of session
+    take input_lock for every call and element input should be done inside
+    "with session.input_lock:" block. Lock belongs to session, sessions that
+    send input concurrently should be created with the same input_lock.
+    """
+
+    def __init__(self, windows=(), soup=None, backend=None, input_lock=None):
+        """
+        Constructor.
+
+        Arguments:
+            - windows: list of window names (wildcards) or handles session
+            is allowed to work with, if empty all windows are allowed.
+            - soup: soup instance, if not defined new soup of backend will be
+            created.
+            - backend: string, backend name, if not defined backend that is
+            used by uisoup will be created.
+            - input_lock: lock that serializes real input, if not defined
+            session has own lock.
+        """
+
+        self.soup = soup or create_soup(backend)
+        self.windows = list(windows)
+        self._window_matchers = [
+            GlobMatcher.get(window) for window in self.windows if
+            isinstance(window, basestring)]
+        self._cache = {}
+        self.pool = ElementPool()
+        self.input_lock = input_lock or threading.RLock()
+        self.mouse = _LockedInput(self.soup.mouse, self.input_lock)
+        self.keyboard = _LockedInput(self.soup.keyboard, self.input_lock)
+
+    def __repr__(self):
+        return '<Session %r>' % (self.windows,)
+
+    def __enter__(self):
+        self.pool.__enter__()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.pool.__exit__(exc_type, exc_val, exc_tb)
+
+    def _is_in_scope(self, obj_window, obj_handle=None):
+        if not self.windows or obj_handle in self.windows:
+            return True
+
+        name = obj_window.acc_name or ''
+        if any(matcher.match(name) for matcher in self._window_matchers):
+            return True
+
+        for window in self.windows:
+            if isinstance(window, basestring) or window == obj_handle:
+                continue
+            try:
+                if self.soup.get_window(window) == obj_window:
+                    return True
+            except TooSaltyUISoupException:
+                continue
+
+        return False
+
+    @staticmethod
+    def _top_level_window(obj_element):
+        while obj_element is not None and \
+                not obj_element.is_top_level_window:
+            obj_element = obj_element.acc_parent
+
+        return obj_element
+
+    def _check_scope(self, obj_element):
+        obj_window = self._top_level_window(obj_element)
+        if obj_window is None or not self._is_in_scope(obj_window):
+            raise TooSaltyUISoupException(
+                'Element %s is out of scope of %r.' % (obj_element, self))
+
+        return obj_element
+
+    def get_window(self, obj_handle=None, refresh=False):
+        """
+        Gets window of this session, windows are cached per session.
+
+        Arguments:
+            - obj_handle: window name (string) or window handler (int), if
+            not defined and session has only one window it will be returned.
+            - refresh: bool, if True window will be looked up again.
+
+        Returns:
+            - Window object.
+        """
+
+        if obj_handle is None:
+            if len(self.windows) != 1:
+                raise TooSaltyUISoupException(
+                    'Window should be specified for session with %d '
+                    'windows.' % len(self.windows))
+            obj_handle = self.windows[0]
+
+        obj_window = None if refresh else self._cache.get(obj_handle)
+        if obj_window is None:
+            with self.pool:
+                obj_window = self.soup.get_window(obj_handle)
+            if not self._is_in_scope(obj_window, obj_handle):
+                raise TooSaltyUISoupException(
+                    'Window %r is out of scope of %r.' % (obj_handle, self))
+            self._cache[obj_handle] = obj_window
+
+        return obj_window
+
+    def is_window_exists(self, obj_handle):
+        """
+        Verifies is window of this session exists.
+
+        Arguments:
+            - obj_handle: window name (string) or window handler (int).
+
+        Returns:
+            - True if window exists and it is in scope of session otherwise
+            False.
+        """
+
+        try:
+            self.get_window(obj_handle, refresh=True)
+            return True
+        except TooSaltyUISoupException:
+            return False
+
+    def get_object_by_coordinates(self, x, y):
+        """
+        Gets object by coordinates, object should be in window of session.
+
+        Arguments:
+            - x: int, x coordinate.
+            - y: int, y coordinate.
+
+        Returns:
+            - Element object, exception is raised if it is out of scope.
+        """
+
+        with self.pool:
+            return self._check_scope(
+                self.soup.get_object_by_coordinates(x, y))
+
+    def get_visible_window_list(self):
+        """
+        Gets list of visible windows in scope of session.
+
+        Arguments:
+            - None
+
+        Returns:
+            - List of window objects.
+        """
+
+        with self.pool:
+            windows = self.soup.get_visible_window_list()
+            top_level_windows = {}
+            result = []
+            for obj_window in windows:
+                obj_top = self._top_level_window(obj_window)
+                if obj_top is None:
+                    continue
+                in_scope = top_level_windows.get(obj_top)
+                if in_scope is None:
+                    in_scope = top_level_windows[obj_top] = \
+                        self._is_in_scope(obj_top)
+                if in_scope:
+                    result.append(obj_window)
+
+        return result
+
+    def get_visible_object_list(self, obj_handle=None):
+        """
+        Gets list of visible objects of window of this session.
+
+        Arguments:
+            - obj_handle: window name (string) or window handler (int), see
+            get_window.
+
+        Returns:
+            - List of objects.
+        """
+
+        obj_window = self.get_window(obj_handle)
+        with self.pool:
+            return obj_window.findall(
+                only_visible=True,
+                role_name=lambda x: x != 'frm',
+                location=lambda x: 0 not in x[2:])
+
+    def clear_cache(self):
+        """
+        Forgets cached windows and pooled elements.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        self._cache.clear()
+        self.pool.clear_pool()
+
+
+class SessionRunner(object):
+    """
+    Runs tasks of sessions on pool of worker threads. Every session is bound
+    to one worker, so tasks of session are executed in order and elements
+    pooled by them are used by one thread only, while tasks of different
+    sessions are executed concurrently. Tasks submitted by submit_input are
+    serialized by input_lock of runner and of session.
+    """
+
+    def __init__(self, max_workers=4):
+        """
+        Constructor.
+
+        Arguments:
+            - max_workers: int, number of worker threads.
+        """
+
+        self._executors = [SerialExecutor(name='uisoup-session-%d' % i) for
+                           i in xrange(max_workers)]
+        self._assigned = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.input_lock = threading.RLock()
+
+    def _executor_for(self, session):
+        with self._lock:
+            index = self._assigned.get(session)
+            if index is None:
+                loads = [0] * len(self._executors)
+                for assigned_index in self._assigned.values():
+                    loads[assigned_index] += 1
+                index = loads.index(min(loads))
+                self._assigned[session] = index
+
+        return self._executors[index]
+
+    def _run_task(self, session, hold_input, task, args, kwargs):
+        session.soup.init_thread()
+        with session:
+            if not hold_input:
+                return task(session, *args, **kwargs)
+            with self.input_lock, session.input_lock:
+                return task(session, *args, **kwargs)
+
+    def submit(self, session, task, *args, **kwargs):
+        """
+        Submits task that does not send input, e.g. lookups or assertions.
+
+        Arguments:
+            - session: Session instance.
+            - task: callable, it is called with session and arguments.
+            - *args: arguments of task.
+            - **kwargs: keyword arguments of task.
+
+        Returns:
+            - InputFuture with result of task.
+        """
+
+        return self._executor_for(session).submit(
+            self._run_task, session, False, task, args, kwargs)
+
+    def submit_input(self, session, task, *args, **kwargs):
+        """
+        Submits task that sends input, whole task is executed under input
+        lock.
+
+        Arguments:
+            - session: Session instance.
+            - task: callable, it is called with session and arguments.
+            - *args: arguments of task.
+            - **kwargs: keyword arguments of task.
+
+        Returns:
+            - InputFuture with result of task.
+        """
+
+        return self._executor_for(session).submit(
+            self._run_task, session, True, task, args, kwargs)
+
+    def map(self, task, sessions, timeout=None):
+        """
+        Runs task for every session and waits for results.
+
+        Arguments:
+            - task: callable, it is called with session.
+            - sessions: list of Session instances.
+            - timeout: float, time to wait for every result in seconds, if
+            not defined will wait forever.
+
+        Returns:
+            - List of results in order of sessions, first exception raised by
+            task will be re-raised.
+        """
+
+        futures = [self.submit(session, task) for session in sessions]
+
+        return [future.result(timeout) for future in futures]
+
+    def shutdown(self, timeout=None):
+        """
+        Executes submitted tasks and stops worker threads.
+
+        Arguments:
+            - timeout: float, time to wait for every worker in seconds, if
+            not defined will wait forever.
+
+        Returns:
+            - None
+        """
+
+        for executor in self._executors:
+            executor.stop(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
@@ -0,0 +1,514 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+# Columnar snapshot of element tree for offline queries.
+#
+# Nodes are stored in depth-first order (the order of find/findall), so
+# subtree of node i is range (i, subtree_end[i]). Strings are interned into
+# one table and columns keep their codes, -1 is None. Search criteria are
+# evaluated once per distinct value of column and spread to rows by codes,
+# with NumPy (extra "geometry") columns are arrays and masks are vectorized.
+
+import json
+from types import FunctionType
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .. import TooSaltyUISoupException
+from .glob_matcher import GlobMatcher
+from .text_normalizer import TextNormalizer
+from .geometry import RectArray
+
+
+def _column(values):
+    return numpy.asarray(values, dtype=numpy.int64) if numpy is not None \
+        else list(values)
+
+
+def _matcher(expected):
+    """
+    Makes predicate that matches value the same way as IElement._match.
+    """
+
+    if type(expected) is FunctionType:
+        def match(value):
+            try:
+                return bool(expected(value))
+            except Exception:
+                return False
+    else:
+        matcher = GlobMatcher.get(expected)
+
+        def match(value):
+            try:
+                return matcher.match(value)
+            except Exception:
+                return False
+
+    return match
+
+
+class SnapshotNode(object):
+    """
+    Lightweight record of snapshot node with read-only element properties.
+    """
+
+    __slots__ = ('snapshot', 'index')
+
+    def __init__(self, snapshot, index):
+        self.snapshot = snapshot
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, SnapshotNode) and \
+            other.snapshot is self.snapshot and other.index == self.index
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((id(self.snapshot), self.index))
+
+    def __str__(self):
+        return '[Role: %s(0x%X) | Name: %r | Child count: %d]' % \
+               (self.acc_role_name, self.acc_role or 0, self.acc_name,
+                self.acc_child_count)
+
+    def _string(self, column):
+        return self.snapshot._string(column, self.index)
+
+    def _has_state(self, flag):
+        return bool(self.snapshot._columns['state'][self.index] & flag)
+
+    @property
+    def acc_role(self):
+        role = int(self.snapshot._columns['role'][self.index])
+        return role if role >= 0 else None
+
+    @property
+    def acc_role_name(self):
+        return self._string('role_name')
+
+    @property
+    def acc_name(self):
+        return self._string('name')
+
+    @property
+    def acc_c_name(self):
+        name = self.acc_name
+        return (self.acc_role_name or '') + name if name else ''
+
+    @property
+    def acc_value(self):
+        return self._string('value')
+
+    @property
+    def acc_description(self):
+        return self._string('description')
+
+    @property
+    def acc_location(self):
+        return tuple(int(value) for value in
+                     self.snapshot._columns['rect'][self.index])
+
+    @property
+    def acc_child_count(self):
+        return int(self.snapshot._columns['child_count'][self.index])
+
+    @property
+    def acc_parent_count(self):
+        return int(self.snapshot._columns['depth'][self.index]) + \
+            self.snapshot.root_parent_count
+
+    @property
+    def acc_parent(self):
+        parent = int(self.snapshot._columns['parent'][self.index])
+        return SnapshotNode(self.snapshot, parent) if parent >= 0 else None
+
+    @property
+    def is_visible(self):
+        return self._has_state(Snapshot.VISIBLE)
+
+    @property
+    def is_enabled(self):
+        return self._has_state(Snapshot.ENABLED)
+
+    @property
+    def is_selected(self):
+        return self._has_state(Snapshot.SELECTED)
+
+    @property
+    def is_checked(self):
+        return self._has_state(Snapshot.CHECKED)
+
+    def __iter__(self):
+        end = int(self.snapshot._subtree_end[self.index])
+        child = self.index + 1
+        while child < end:
+            yield SnapshotNode(self.snapshot, child)
+            child = int(self.snapshot._subtree_end[child])
+
+    def find(self, only_visible=True, **kwargs):
+        return self.snapshot.find(only_visible, _root=self.index, **kwargs)
+
+    def findall(self, only_visible=True, **kwargs):
+        return self.snapshot.findall(only_visible, _root=self.index,
+                                     **kwargs)
+
+
+class Snapshot(object):
+    """
+    Element tree captured into columns. Supports find/findall with the same
+    criteria as elements, lambdas are expected to be pure functions because
+    they are called once per distinct value.
+    """
+
+    VISIBLE = 0x1
+    ENABLED = 0x2
+    SELECTED = 0x4
+    CHECKED = 0x8
+
+    _STRING_COLUMNS = ('role_name', 'name', 'value', 'description')
+    _INT_COLUMNS = ('role', 'state', 'parent', 'depth', 'child_count')
+    _STATES = (('is_visible', VISIBLE), ('is_enabled', ENABLED),
+               ('is_selected', SELECTED), ('is_checked', CHECKED))
+
+    def __init__(self, strings, columns, root_parent_count=0):
+        """
+        Constructor, use capture or load to create snapshot.
+
+        Arguments:
+            - strings: list of interned strings.
+            - columns: dict of column name and list of values, rect column
+            is list of (x, y, width, height).
+            - root_parent_count: int, parent count of root element.
+        """
+
+        self.strings = strings
+        self.root_parent_count = root_parent_count
+        self._columns = dict((name, _column(columns[name])) for name in
+                             self._STRING_COLUMNS + self._INT_COLUMNS)
+        self._columns['rect'] = RectArray(columns['rect'])._rects
+
+        # Subtree of node ends where next node of the same or lower depth
+        # starts.
+        depths = columns['depth']
+        subtree_end = [len(depths)] * len(depths)
+        stack = []
+        for index, depth in enumerate(depths):
+            while stack and depths[stack[-1]] >= depth:
+                subtree_end[stack.pop()] = index
+            stack.append(index)
+        self._subtree_end = _column(subtree_end)
+
+    @classmethod
+    def capture(cls, element, max_depth=None):
+        """
+        Captures element tree, every property of every element is read once.
+
+        Arguments:
+            - element: root element.
+            - max_depth: int, maximal depth of captured tree, if not defined
+            whole tree will be captured.
+
+        Returns:
+            - Snapshot instance.
+        """
+
+        def read(obj_element, name, default=None):
+            try:
+                return getattr(obj_element, name)
+            except Exception:
+                return default
+
+        strings = []
+        codes = {}
+
+        def code(value):
+            if value is None:
+                return -1
+            result = codes.get(value)
+            if result is None:
+                result = codes[value] = len(strings)
+                strings.append(value)
+            return result
+
+        columns = dict((name, []) for name in
+                       cls._STRING_COLUMNS + cls._INT_COLUMNS + ('rect',))
+        path = []
+        for event, obj_element, depth in element._iterwalk(max_depth):
+            if event == 'end':
+                path.pop()
+                continue
+
+            columns['parent'].append(path[-1] if path else -1)
+            path.append(len(columns['depth']))
+            columns['depth'].append(depth)
+            for name in cls._STRING_COLUMNS:
+                columns[name].append(code(read(obj_element, 'acc_' + name)))
+            role = read(obj_element, 'acc_role')
+            columns['role'].append(role if isinstance(role, (int, long))
+                                   else -1)
+            columns['child_count'].append(
+                read(obj_element, 'acc_child_count', 0) or 0)
+            columns['rect'].append(
+                tuple(read(obj_element, 'acc_location') or (0, 0, 0, 0)))
+
+            state = 0
+            for name, flag in cls._STATES:
+                if read(obj_element, name, False):
+                    state |= flag
+            columns['state'].append(state)
+
+        return cls(strings, columns,
+                   read(element, 'acc_parent_count', 0) or 0)
+
+    def __len__(self):
+        return len(self._subtree_end)
+
+    @property
+    def root(self):
+        return SnapshotNode(self, 0)
+
+    def node(self, index):
+        return SnapshotNode(self, index)
+
+    def nodes(self):
+        return [SnapshotNode(self, index) for index in xrange(len(self))]
+
+    def _string(self, column, index):
+        code = int(self._columns[column][index])
+        return self.strings[code] if code >= 0 else None
+
+    def rects(self, nodes=None):
+        """
+        Gets rectangles of nodes for bulk geometry operations.
+
+        Arguments:
+            - nodes: list of SnapshotNode, by default all nodes.
+
+        Returns:
+            - RectArray instance with nodes as elements.
+        """
+
+        if nodes is None:
+            return RectArray(self._columns['rect'], self.nodes())
+
+        nodes = list(nodes)
+        result = RectArray(self._columns['rect']).take(
+            node.index for node in nodes)
+        result.elements = nodes
+
+        return result
+
+    def _string_table_mask(self, codes, match):
+        # Code -1 takes last item of table, i.e. result for None.
+        table = [match(value) for value in self.strings] + [match(None)]
+        if numpy is not None:
+            return numpy.asarray(table, dtype=bool)[codes]
+
+        return [table[code] for code in codes]
+
+    def _unique_mask(self, values, match, decode=None):
+        if numpy is not None:
+            unique, inverse = numpy.unique(values, return_inverse=True)
+            table = numpy.asarray(
+                [match(decode(value) if decode else value) for value in
+                 unique.tolist()], dtype=bool)
+            return table[inverse] if len(unique) else numpy.zeros(0, bool)
+
+        cache = {}
+        result = []
+        for value in values:
+            flag = cache.get(value)
+            if flag is None:
+                flag = cache[value] = \
+                    match(decode(value) if decode else value)
+            result.append(flag)
+
+        return result
+
+    def _criterion_mask(self, name, match, start, stop):
+        columns = self._columns
+
+        if name in self._STRING_COLUMNS:
+            return self._string_table_mask(columns[name][start:stop], match)
+
+        if name == 'c_name':
+            # Pair of role name and name codes shifted to be non-negative.
+            size = len(self.strings) + 1
+            role_names = columns['role_name'][start:stop]
+            names = columns['name'][start:stop]
+            if numpy is not None:
+                keys = (role_names + 1) * size + names + 1
+            else:
+                keys = [(role_name + 1) * size + name + 1 for role_name, name
+                        in zip(role_names, names)]
+
+            def decode(key):
+                role_name, name = divmod(key, size)
+                name = self.strings[name - 1] if name else None
+                if not name:
+                    return ''
+                return (self.strings[role_name - 1] if role_name else '') + \
+                    name
+
+            return self._unique_mask(keys, match, decode)
+
+        if name == 'role':
+            return self._unique_mask(
+                columns['role'][start:stop], match,
+                lambda role: role if role >= 0 else None)
+
+        if name == 'child_count':
+            return self._unique_mask(columns['child_count'][start:stop],
+                                     match)
+
+        if name == 'parent_count':
+            return self._unique_mask(
+                columns['depth'][start:stop], match,
+                lambda depth: depth + self.root_parent_count)
+
+        if name == 'location':
+            rects = columns['rect'][start:stop]
+            if numpy is not None:
+                rects = [tuple(rect) for rect in rects.tolist()]
+            cache = {}
+            result = []
+            for rect in rects:
+                flag = cache.get(rect)
+                if flag is None:
+                    flag = cache[rect] = match(rect)
+                result.append(flag)
+
+            return numpy.asarray(result, dtype=bool) if numpy is not None \
+                else result
+
+        raise TooSaltyUISoupException(
+            'Snapshot can\'t be searched by "%s".' % name)
+
+    def _search(self, only_visible, root, kwargs):
+        # Root itself is not searched, as in element search.
+        start = root + 1
+        stop = int(self._subtree_end[root])
+
+        if only_visible:
+            states = self._columns['state'][start:stop]
+            if numpy is not None:
+                mask = (states & self.VISIBLE) != 0
+            else:
+                mask = [bool(state & self.VISIBLE) for state in states]
+        else:
+            mask = numpy.ones(stop - start, dtype=bool) \
+                if numpy is not None else [True] * (stop - start)
+
+        kwargs = TextNormalizer.normalize_criteria(kwargs)
+        for name, expected in kwargs.items():
+            criterion = self._criterion_mask(name, _matcher(expected), start,
+                                             stop)
+            if numpy is not None:
+                mask &= criterion
+            else:
+                mask = [a and b for a, b in zip(mask, criterion)]
+
+        if numpy is not None:
+            return [start + int(i) for i in numpy.flatnonzero(mask)]
+
+        return [start + i for i, flag in enumerate(mask) if flag]
+
+    def findall(self, only_visible=True, _root=0, **kwargs):
+        """
+        Finds all nodes, see IElement.findall.
+
+        Arguments:
+            - only_visible: bool, flag that indicates will we search only
+            through visible nodes.
+            - kwargs: role, name, c_name, location, value, description,
+            role_name, parent_count or child_count, strings are wildcards.
+
+        Returns:
+            - List of SnapshotNode in the order of element search.
+        """
+
+        return [SnapshotNode(self, index) for index in
+                self._search(only_visible, _root, kwargs)]
+
+    def find(self, only_visible=True, _root=0, **kwargs):
+        """
+        Finds first node, see IElement.find.
+
+        Arguments:
+            - only_visible: bool, flag that indicates will we search only
+            through visible nodes.
+            - kwargs: search criteria, see findall.
+
+        Returns:
+            - SnapshotNode that was found otherwise exception will be raised.
+        """
+
+        indices = self._search(only_visible, _root, kwargs)
+        if not indices:
+            attrs = ['%s=%s' % (k, v) for k, v in kwargs.iteritems()]
+            raise TooSaltyUISoupException(
+                'Can\'t find object with attributes "%s" in snapshot.' %
+                '; '.join(attrs))
+
+        return SnapshotNode(self, indices[0])
+
+    def count(self, only_visible=True, **kwargs):
+        return len(self._search(only_visible, 0, kwargs))
+
+    def save(self, stream):
+        """
+        Writes snapshot to stream as JSON.
+
+        Arguments:
+            - stream: file-like object.
+
+        Returns:
+            - None
+        """
+
+        columns = dict((name, [int(value) for value in values]) for
+                       name, values in self._columns.items() if
+                       name != 'rect')
+        columns['rect'] = [[int(value) for value in rect] for rect in
+                           self._columns['rect']]
+        json.dump({'strings': self.strings, 'columns': columns,
+                   'root_parent_count': self.root_parent_count}, stream,
+                  separators=(',', ':'))
+
+    @classmethod
+    def load(cls, stream):
+        """
+        Reads snapshot written by save.
+
+        Arguments:
+            - stream: file-like object.
+
+        Returns:
+            - Snapshot instance.
+        """
+
+        data = json.load(stream)
+
+        return cls(data['strings'], data['columns'],
+                   data['root_parent_count'])
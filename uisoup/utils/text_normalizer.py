@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import json
+import os
+import re
+import threading
+import unicodedata
+
+
+class TextNormalizer(object):
+    """
+    Normalizes names and titles before they are matched: symbols that look
+    alike (non-breaking spaces, dashes) are replaced by ASCII ones and
+    invisible symbols (zero-width spaces, soft hyphen) are removed by one
+    translate table, optionally text is folded to lower case and NFC form.
+    Normalized text is memoized, names repeat a lot across tree.
+
+    Configuration:
+        - UISOUP_NORMALIZE: comma separated options "case" and "nfc".
+        - UISOUP_NORMALIZE_MAP: JSON object of extra symbol replacements,
+        null value removes symbol.
+    """
+
+    DEFAULT_MAP = dict(
+        # No-break and typographic spaces.
+        [(unichr(code), u' ') for code in
+         [0xa0, 0x202f, 0x205f, 0x3000] + range(0x2000, 0x200b)] +
+        # Hyphens, dashes and minus signs.
+        [(unichr(code), u'-') for code in
+         range(0x2010, 0x2016) + [0x2212, 0xfe58, 0xfe63, 0xff0d]] +
+        # Soft hyphen, zero-width spaces and joiners, byte order mark.
+        [(unichr(code), None) for code in
+         [0xad, 0x200b, 0x200c, 0x200d, 0x2060, 0xfeff]])
+
+    # Search criteria compared with normalized names.
+    NAME_CRITERIA = ('name', 'c_name')
+
+    memo_size = 4096
+
+    fold_case = False
+    nfc = False
+
+    _table = {}
+    _symbols = None
+    _memo = {}
+    # Incremented by configure, so stored normalized names become stale.
+    _version = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, mapping=None, fold_case=None, nfc=None):
+        """
+        Rebuilds translate table and clears memoized texts.
+
+        Arguments:
+            - mapping: dict of symbol and its replacement (None removes
+            symbol) added to DEFAULT_MAP.
+            - fold_case: bool, if True text is converted to lower case, not
+            changed if None.
+            - nfc: bool, if True text is converted to Unicode NFC form, not
+            changed if None.
+
+        Returns:
+            - None
+        """
+
+        symbols = dict(cls.DEFAULT_MAP)
+        symbols.update(mapping or {})
+
+        with cls._lock:
+            if fold_case is not None:
+                cls.fold_case = fold_case
+            if nfc is not None:
+                cls.nfc = nfc
+            cls._table = dict((ord(symbol), replacement) for
+                              symbol, replacement in symbols.items())
+            cls._symbols = re.compile(u'[%s]' % u''.join(
+                re.escape(symbol) for symbol in sorted(symbols)))
+            cls._memo = {}
+            cls._version += 1
+
+    @classmethod
+    def configure_from_env(cls):
+        options = [option.strip().lower() for option in
+                   os.environ.get('UISOUP_NORMALIZE', '').split(',')]
+        mapping = json.loads(os.environ.get('UISOUP_NORMALIZE_MAP') or '{}')
+        cls.configure(mapping, 'case' in options, 'nfc' in options)
+
+    @classmethod
+    def translate(cls, text):
+        """
+        Replaces and removes symbols of translate table only.
+
+        Arguments:
+            - text: string.
+
+        Returns:
+            - unicode string.
+        """
+
+        text = unicode(text)
+        if cls._symbols.search(text) is None:
+            return text
+
+        return text.translate(cls._table)
+
+    @classmethod
+    def normalize(cls, text):
+        """
+        Normalizes text for matching.
+
+        Arguments:
+            - text: string.
+
+        Returns:
+            - unicode string.
+        """
+
+        memo = cls._memo
+        result = memo.get(text)
+        if result is not None:
+            return result
+
+        result = cls.translate(text)
+        if cls.nfc:
+            result = unicodedata.normalize('NFC', result)
+        if cls.fold_case:
+            result = result.lower()
+
+        if len(memo) >= cls.memo_size:
+            memo.clear()
+        memo[text] = result
+
+        return result
+
+    @classmethod
+    def normalize_pair(cls, pair, text):
+        """
+        Normalizes text unless it is raw text of pair, so element keeps its
+        raw and normalized name next to each other and normalizes name once.
+
+        Arguments:
+            - pair: tuple (raw text, normalized text, version) or None.
+            - text: string, raw text.
+
+        Returns:
+            - tuple (raw text, normalized text, version).
+        """
+
+        if pair is not None and pair[0] == text and pair[2] == cls._version:
+            return pair
+
+        return text, cls.normalize(text), cls._version
+
+    @classmethod
+    def normalize_criteria(cls, kwargs):
+        """
+        Normalizes wildcards of name criteria, so they are matched with
+        names normalized the same way.
+
+        Arguments:
+            - kwargs: dict of search criteria.
+
+        Returns:
+            - dict of search criteria.
+        """
+
+        result = kwargs
+        for name in cls.NAME_CRITERIA:
+            expected = kwargs.get(name)
+            if isinstance(expected, basestring):
+                if result is kwargs:
+                    result = dict(kwargs)
+                result[name] = cls.normalize(expected)
+
+        return result
+
+
+TextNormalizer.configure_from_env()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import time
+import threading
+from platform import system
+
+
+def _native_monotonic_clock():
+    """
+    Gets monotonic clock of OS through ctypes, Python 2 has no
+    time.monotonic: clock_gettime(CLOCK_MONOTONIC) on Linux and
+    mach_absolute_time on Mac OS.
+
+    Arguments:
+        - None
+
+    Returns:
+        - function that returns seconds or None if clock is not available.
+    """
+
+    import ctypes
+
+    try:
+        # Symbols of libc loaded by interpreter.
+        libc = ctypes.CDLL(None, use_errno=True)
+        if system() == 'Darwin':
+            class TimebaseInfo(ctypes.Structure):
+                _fields_ = [('numer', ctypes.c_uint32),
+                            ('denom', ctypes.c_uint32)]
+
+            info = TimebaseInfo()
+            libc.mach_timebase_info(ctypes.byref(info))
+            mach_absolute_time = libc.mach_absolute_time
+            mach_absolute_time.restype = ctypes.c_uint64
+            factor = info.numer / (info.denom * 1e9)
+
+            return lambda: mach_absolute_time() * factor
+
+        if system() != 'Linux':
+            return None
+
+        class Timespec(ctypes.Structure):
+            _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+        try:
+            clock_gettime = libc.clock_gettime
+        except AttributeError:
+            # glibc older than 2.17.
+            clock_gettime = ctypes.CDLL('librt.so.1',
+                                        use_errno=True).clock_gettime
+    except (OSError, AttributeError):
+        return None
+
+    clock_monotonic = 1
+
+    def monotonic():
+        timespec = Timespec()
+        if clock_gettime(clock_monotonic, ctypes.byref(timespec)):
+            raise OSError(ctypes.get_errno(), 'clock_gettime failed')
+        return timespec.tv_sec + timespec.tv_nsec * 1e-9
+
+    return monotonic
+
+
+if hasattr(time, 'monotonic'):
+    clock = time.monotonic
+elif system() == 'Windows':
+    # time.clock is based on QueryPerformanceCounter on Windows.
+    clock = time.clock
+else:
+    # Wall clock is used only if OS clock is not available, then pacing
+    # of timelines is broken by system time changes.
+    clock = _native_monotonic_clock() or time.time
+
+
+class IdleTimeReport(object):
+    """
+    Accumulates intentional idle time (waits that are part of input
+    timelines) grouped by timeline name.
+    """
+
+    _lock = threading.Lock()
+    _totals = {}
+
+    @classmethod
+    def add(cls, name, seconds):
+        """
+        Adds idle time to report.
+
+        Arguments:
+            - name: string, timeline name.
+            - seconds: float, idle time in seconds.
+
+        Returns:
+            - None
+        """
+
+        with cls._lock:
+            count, total = cls._totals.get(name, (0, 0.0))
+            cls._totals[name] = (count + 1, total + seconds)
+
+    @classmethod
+    def snapshot(cls):
+        """
+        Gets current report.
+
+        Arguments:
+            - None
+
+        Returns:
+            - dict where key is timeline name and value is dict with
+            "count" of dispatched timelines and "idle" time in seconds.
+        """
+
+        with cls._lock:
+            return dict((name, {'count': count, 'idle': total})
+                        for name, (count, total) in cls._totals.items())
+
+    @classmethod
+    def total(cls):
+        """
+        Gets total idle time of all timelines in seconds.
+        """
+
+        with cls._lock:
+            return sum(total for _, total in cls._totals.values())
+
+    @classmethod
+    def reset(cls):
+        """
+        Resets report, e.g. at the beginning of a test.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        with cls._lock:
+            cls._totals = {}
+
+
+class _TimelineEvent(object):
+
+    def __init__(self, offset, action, args, coalesce):
+        self.offset = offset
+        self.action = action
+        self.args = args
+        self.coalesce = coalesce
+
+
+class Timeline(object):
+    """
+    Sequence of input events with timestamps relative to timeline start.
+
+    Events are dispatched against absolute deadlines, so time spent inside
+    event handlers does not accumulate into the following waits.
+    """
+
+    def __init__(self, name='timeline'):
+        """
+        Constructor.
+
+        Arguments:
+            - name: string, timeline name used in idle time report.
+        """
+
+        self.name = name
+        self._events = []
+        self._cursor = 0.0
+
+    @property
+    def duration(self):
+        """
+        Property for timeline duration in seconds.
+        """
+
+        return self._cursor
+
+    def __len__(self):
+        return len(self._events)
+
+    def wait(self, seconds):
+        """
+        Moves timeline cursor forward.
+
+        Arguments:
+            - seconds: float, time to wait in seconds.
+
+        Returns:
+            - None
+        """
+
+        if seconds > 0:
+            self._cursor += seconds
+
+    def add(self, action, *args, **kwargs):
+        """
+        Adds event at current timeline cursor.
+
+        Arguments:
+            - action: callable, that will be called with args.
+            - *args: arguments of action.
+            - coalesce: hashable, key of coalescing group. Event from the
+            group is skipped if next event of the same group is already
+            overdue or has the same arguments, e.g. mouse moves.
+
+        Returns:
+            - None
+        """
+
+        coalesce = kwargs.get('coalesce')
+        if coalesce is not None and self._events:
+            last = self._events[-1]
+            if last.coalesce == coalesce and last.args == args:
+                return
+
+        self._events.append(
+            _TimelineEvent(self._cursor, action, args, coalesce))
+
+    def dispatch(self):
+        """
+        Dispatches all events.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        start = clock()
+        idle = 0.0
+        events = self._events
+        last_index = len(events) - 1
+
+        for i, event in enumerate(events):
+            now = clock()
+            if event.coalesce is not None and i < last_index:
+                next_event = events[i + 1]
+                if next_event.coalesce == event.coalesce and \
+                        start + next_event.offset <= now:
+                    continue
+
+            delay = start + event.offset - now
+            if delay > 0:
+                time.sleep(delay)
+                idle += delay
+
+            event.action(*event.args)
+
+        # Trailing wait is a part of the timeline too.
+        delay = start + self._cursor - clock()
+        if delay > 0:
+            time.sleep(delay)
+            idle += delay
+
+        IdleTimeReport.add(self.name, idle)
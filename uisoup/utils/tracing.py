@@ -0,0 +1,403 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+import atexit
+import functools
+import json
+import os
+import thread
+import threading
+
+from .timeline import clock
+from .instrumentation import Instrumentation
+from .flight_recorder import FlightRecorder
+
+
+class Span(object):
+    """
+    Traced operation.
+    """
+
+    def __init__(self, name, args, parent=None):
+        self.name = name
+        self.args = args
+        self.parent = parent
+        self.counters = {}
+        self.error = None
+        self.start = clock()
+        self.end = None
+
+    @property
+    def duration(self):
+        return (self.end or clock()) - self.start
+
+    def count(self, counter, value=1):
+        """
+        Adds value to counter of this span and all its parents.
+
+        Arguments:
+            - counter: string, counter name e.g. "nodes_visited".
+            - value: int or float, value to add.
+
+        Returns:
+            - None
+        """
+
+        span = self
+        while span is not None:
+            span.counters[counter] = span.counters.get(counter, 0) + value
+            span = span.parent
+
+
+class _NullSpan(object):
+    """
+    Context manager returned by Tracer.span while tracing is disabled.
+    """
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+class _SpanContext(object):
+
+    def __init__(self, name, args):
+        self._name = name
+        self._args = args
+
+    def __enter__(self):
+        return Tracer.open_span(self._name, self._args)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        Tracer.close_span(exc_val)
+        return False
+
+
+def format_arg(value, max_length=120):
+    """
+    Converts argument of traced operation to JSON friendly value.
+
+    Arguments:
+        - value: argument value.
+        - max_length: int, maximal length of representation.
+
+    Returns:
+        - value itself for numbers, bools and None, otherwise string.
+    """
+
+    if value is None or isinstance(value, (bool, int, long, float)):
+        return value
+    if isinstance(value, basestring):
+        result = value if isinstance(value, unicode) else \
+            value.decode('utf-8', 'replace')
+    elif callable(value) and hasattr(value, '__name__'):
+        result = u'<%s>' % value.__name__
+    else:
+        result = repr(value).decode('utf-8', 'replace')
+
+    if len(result) > max_length:
+        result = result[:max_length] + u'...'
+
+    return result
+
+
+class Tracer(object):
+    """
+    Collects spans of high-level operations and exports them in Chrome trace
+    event format, which can be opened in chrome://tracing or Perfetto.
+
+    Tracing is started by Tracer.start or by UISOUP_TRACE environment
+    variable holding path of trace file.
+    """
+
+    enabled = False
+    _lock = threading.RLock()
+    _local = threading.local()
+    _output = None
+    _owns_output = False
+    _events = None
+    _written = 0
+    _origin = 0
+    _instrumentation_was_enabled = False
+
+    @classmethod
+    def start(cls, output=None):
+        """
+        Starts tracing.
+
+        Arguments:
+            - output: path to trace file or file-like object, if not
+            defined events are kept in memory and available by
+            Tracer.get_events.
+
+        Returns:
+            - None
+        """
+
+        with cls._lock:
+            if cls.enabled:
+                cls.stop()
+
+            if isinstance(output, basestring):
+                cls._output = open(output, 'w')
+                cls._owns_output = True
+            else:
+                cls._output = output
+                cls._owns_output = False
+            if cls._output is not None:
+                cls._output.write('[')
+            cls._events = []
+            cls._written = 0
+            cls._origin = clock()
+
+            # Backend calls are counted by instrumentation.
+            cls._instrumentation_was_enabled = Instrumentation.enabled
+            Instrumentation.enable()
+            Instrumentation.add_listener(cls._on_primitive)
+
+            cls.enabled = True
+
+    @classmethod
+    def stop(cls):
+        """
+        Stops tracing and finalizes trace file.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        with cls._lock:
+            if not cls.enabled:
+                return
+            cls.enabled = False
+
+            Instrumentation.remove_listener(cls._on_primitive)
+            if not cls._instrumentation_was_enabled:
+                Instrumentation.disable()
+
+            if cls._output is not None:
+                cls._output.write('\n]\n')
+                cls._output.flush()
+                if cls._owns_output:
+                    cls._output.close()
+                cls._output = None
+
+    @classmethod
+    def get_events(cls):
+        """
+        Gets trace events collected in memory.
+
+        Arguments:
+            - None
+
+        Returns:
+            - list of dicts in Chrome trace event format.
+        """
+
+        with cls._lock:
+            return list(cls._events or [])
+
+    @classmethod
+    def export(cls, path):
+        """
+        Writes trace events collected in memory to file.
+
+        Arguments:
+            - path: string, path to trace file.
+
+        Returns:
+            - None
+        """
+
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': cls.get_events(),
+                       'displayTimeUnit': 'ms'}, f)
+
+    @classmethod
+    def _stack(cls):
+        try:
+            return cls._local.stack
+        except AttributeError:
+            cls._local.stack = []
+            return cls._local.stack
+
+    @classmethod
+    def current(cls):
+        """
+        Gets innermost open span of current thread.
+
+        Arguments:
+            - None
+
+        Returns:
+            - Span instance or None.
+        """
+
+        stack = cls._stack()
+
+        return stack[-1] if stack else None
+
+    @classmethod
+    def count(cls, counter, value=1):
+        """
+        Adds value to counter of current span and its parents.
+
+        Arguments:
+            - counter: string, counter name.
+            - value: int or float, value to add.
+
+        Returns:
+            - None
+        """
+
+        span = cls.current()
+        if span is not None:
+            span.count(counter, value)
+
+    @classmethod
+    def span(cls, name, **kwargs):
+        """
+        Context manager that traces block of code.
+
+        Arguments:
+            - name: string, span name.
+            - kwargs: span arguments.
+
+        Returns:
+            - context manager.
+        """
+
+        if not cls.enabled:
+            return _NullSpan()
+
+        return _SpanContext(name, kwargs)
+
+    @classmethod
+    def open_span(cls, name, args):
+        stack = cls._stack()
+        span = Span(name, dict((k, format_arg(v)) for k, v in args.items()),
+                    stack[-1] if stack else None)
+        stack.append(span)
+
+        return span
+
+    @classmethod
+    def close_span(cls, error=None):
+        stack = cls._stack()
+        if not stack:
+            return
+        span = stack.pop()
+        span.end = clock()
+        if error is not None:
+            span.error = '%s: %s' % (type(error).__name__,
+                                     format_arg(unicode(error)))
+        if cls.enabled:
+            cls._emit(span)
+
+    @classmethod
+    def _on_primitive(cls, name, seconds, error):
+        span = cls.current()
+        if span is not None:
+            span.count('backend_calls')
+            span.count('backend_time', seconds)
+
+    @classmethod
+    def _emit(cls, span):
+        args = dict(span.args)
+        args.update(span.counters)
+        if span.error:
+            args['error'] = span.error
+        event = {'name': span.name,
+                 'cat': 'uisoup',
+                 'ph': 'X',
+                 'ts': (span.start - cls._origin) * 1e6,
+                 'dur': (span.end - span.start) * 1e6,
+                 'pid': os.getpid(),
+                 'tid': thread.get_ident(),
+                 'args': args}
+
+        with cls._lock:
+            if cls._output is not None:
+                cls._output.write(',\n' if cls._written else '\n')
+                cls._output.write(json.dumps(event))
+                cls._written += 1
+            else:
+                cls._events.append(event)
+
+
+def traced(name=None):
+    """
+    Decorator that opens span on every call of function while tracing is
+    enabled and adds call to flight recorder. Positional and keyword
+    arguments except first one (self or cls) are recorded as span arguments.
+
+    Arguments:
+        - name: string, span name, by default function name is used.
+
+    Returns:
+        - decorator.
+    """
+
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracing = Tracer.enabled
+            if not tracing and not FlightRecorder.enabled:
+                return func(*args, **kwargs)
+
+            if tracing:
+                span_args = dict(kwargs)
+                for i, arg in enumerate(args[1:]):
+                    span_args['arg%d' % i] = arg
+                if args:
+                    span_args['target'] = type(args[0]).__name__
+                Tracer.open_span(span_name, span_args)
+
+            start = clock()
+            error = None
+            try:
+                return func(*args, **kwargs)
+            except BaseException as ex:
+                error = ex
+                raise
+            finally:
+                if tracing:
+                    Tracer.close_span(error)
+                if FlightRecorder.enabled:
+                    record = FlightRecorder.record(
+                        span_name, args[1:], kwargs, clock() - start, error)
+                    # Operation is recorded after its exception was created.
+                    attach = getattr(error, '_attach_flight_record', None)
+                    if attach is not None:
+                        attach(record)
+
+        return wrapper
+
+    return decorator
+
+
+if os.environ.get('UISOUP_TRACE'):
+    Tracer.start(os.environ['UISOUP_TRACE'])
+    atexit.register(Tracer.stop)
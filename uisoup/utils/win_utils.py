@@ -19,7 +19,55 @@ __author__ = 'f1ashhimself@gmail.com'
 
 
 from ..utils import _Utils
+from ..utils.retry_policy import RetryPolicy
 
 
 class WinUtils(_Utils):
-    pass
+
+    # HRESULTs of COM calls that server rejected because it is busy.
+    RPC_E_CALL_REJECTED = -2147418111
+    RPC_E_SERVERCALL_RETRYLATER = -2147417846
+    RPC_E_TIMEOUT = -2147417825
+
+    TRANSIENT_HRESULTS = set([RPC_E_CALL_REJECTED,
+                              RPC_E_SERVERCALL_RETRYLATER,
+                              RPC_E_TIMEOUT])
+
+    @classmethod
+    def is_transient_com_error(cls, error):
+        """
+        Checks that COM call may succeed if it is retried.
+
+        Arguments:
+            - error: exception raised by COM call, COMError or WindowsError.
+
+        Returns:
+            - True if error is transient otherwise False.
+        """
+
+        hresult = getattr(error, 'hresult', None)
+        if hresult is None:
+            hresult = getattr(error, 'winerror', None)
+
+        return hresult in cls.TRANSIENT_HRESULTS
+
+    @classmethod
+    def get_element_proc_id(cls, element, *args, **kwargs):
+        """
+        Gets process of element, target of retried element primitives.
+
+        Arguments:
+            - element: WinElement instance.
+            - args, kwargs: other arguments of primitive.
+
+        Returns:
+            - int, process id.
+        """
+
+        return element.proc_id
+
+
+RetryPolicy.register(RetryPolicy('com', max_attempts=3, base_delay=0.02,
+                                 max_delay=0.5, deadline=2.0,
+                                 transient=WinUtils.is_transient_com_error,
+                                 failure_threshold=5, reset_timeout=5.0))
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+#    Copyright (c) 2014 Max Beloborodko.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+__author__ = 'f1ashhimself@gmail.com'
+
+
+def escape_attribute(value):
+    """
+    Escapes attribute value the same way as xml.dom.minidom does.
+
+    Arguments:
+        - value: string, attribute value.
+
+    Returns:
+        - escaped string.
+    """
+
+    return value.replace('&', '&amp;').replace('<', '&lt;'). \
+        replace('"', '&quot;').replace('>', '&gt;')
+
+
+class XmlTreeWriter(object):
+    """
+    Streaming writer of element tree. Output is identical to
+    xml.dom.minidom toprettyxml() of the same tree, but nothing except
+    current path is kept in memory.
+    """
+
+    def __init__(self, write, indent='\t', newl='\n', encoding=None):
+        """
+        Constructor.
+
+        Arguments:
+            - write: callable that takes string.
+            - indent: string, indentation of one level.
+            - newl: string, new line.
+            - encoding: string, encoding of output, if defined strings are
+            encoded before writing and encoding is declared in header.
+        """
+
+        self._write = write
+        self._indent = indent
+        self._newl = newl
+        self._encoding = encoding
+        self._tags = []
+        # Start tag of last element is not closed until it is known whether
+        # element has children.
+        self._open_tag = False
+
+    def _out(self, data):
+        if self._encoding is not None and isinstance(data, unicode):
+            data = data.encode(self._encoding)
+        self._write(data)
+
+    def start_document(self):
+        if self._encoding is None:
+            self._out('<?xml version="1.0" ?>' + self._newl)
+        else:
+            self._out('<?xml version="1.0" encoding="%s"?>%s' %
+                      (self._encoding, self._newl))
+
+    def start_element(self, tag, attributes):
+        """
+        Writes start tag.
+
+        Arguments:
+            - tag: string, tag name.
+            - attributes: dict of attribute names and values.
+
+        Returns:
+            - None
+        """
+
+        if self._open_tag:
+            self._out('>' + self._newl)
+
+        parts = [self._indent * len(self._tags), '<', tag]
+        for name in sorted(attributes):
+            parts.extend([' ', name, '="', escape_attribute(attributes[name]),
+                          '"'])
+        self._out(''.join(parts))
+
+        self._open_tag = True
+        self._tags.append(tag)
+
+    def end_element(self):
+        """
+        Writes end tag of last started element.
+
+        Arguments:
+            - None
+
+        Returns:
+            - None
+        """
+
+        tag = self._tags.pop()
+        if self._open_tag:
+            self._out('/>' + self._newl)
+            self._open_tag = False
+        else:
+            self._out('%s</%s>%s' % (self._indent * len(self._tags), tag,
+                                     self._newl))
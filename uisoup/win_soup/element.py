@@ -24,13 +24,20 @@ import comtypes.client
 
 from .mouse import WinMouse
 from ..interfaces.i_element import IElement
+from ..utils.text_normalizer import TextNormalizer
+from ..utils.instrumentation import Instrumentation, primitive
+from ..utils.retry_policy import retried
 from ..utils.win_utils import WinUtils
+from ..utils.tracing import Tracer, traced
+from ..utils.element_pool import ElementPool
+from ..utils.flight_recorder import SearchDiagnostics
 from .. import TooSaltyUISoupException
 
 
 CO_E_OBJNOTCONNECTED = -2147220995
 
 
+@Instrumentation.register
 class WinElement(IElement):
     """
     http://msdn.microsoft.com/en-us/library/dd318466(v=VS.85).aspx
@@ -105,6 +112,9 @@ class WinElement(IElement):
 
     _mouse = WinMouse()
 
+    __slots__ = ('_i_accessible', '_i_object_id', '_cached_children',
+                 '_identity', '_path', '_name', '__weakref__')
+
     class _StateFlag(object):
         SYSTEM_NORMAL = 0
         SYSTEM_UNAVAILABLE = 0x1
@@ -149,46 +159,54 @@ class WinElement(IElement):
         REMOVESELECTION = 0x10
         VALID = 0x20
 
-    class _EnumWindowsCallback(object):
-
-        same_proc_handles = set()
-
-        @classmethod
-        def callback(cls, handle, proc_id):
-
-            curr_proc_id = ctypes.c_long()
-
-            ctypes.windll.user32.GetWindowThreadProcessId(
-                handle, ctypes.byref(curr_proc_id))
-
-            if curr_proc_id.value == proc_id:
-                cls.same_proc_handles.add(handle)
-
-            return True
-
-    def __init__(self, obj_handle, i_object_id):
+    def __init__(self, obj_handle, i_object_id, path=None):
         """
         Constructor.
 
         Arguments:
             - obj_handle: instance of i_accessible or window handle.
             - i_object_id: int, object id.
+            - path: tuple (window handle, anchor, tuple of child indexes
+            from anchor to i_accessible), anchor is None for object of that
+            window, if not defined path will be found when identity is
+            needed.
         """
 
         if isinstance(obj_handle, comtypes.gen.Accessibility.IAccessible):
             i_accessible = obj_handle
         else:
-            i_accessible = ctypes.POINTER(
-                comtypes.gen.Accessibility.IAccessible)()
-            ctypes.oledll.oleacc.AccessibleObjectFromWindow(
-                obj_handle,
-                0,
-                ctypes.byref(comtypes.gen.Accessibility.IAccessible._iid_),
-                ctypes.byref(i_accessible))
+            i_accessible = self._accessible_object_from_window(obj_handle)
+            path = obj_handle, None, ()
 
         self._i_accessible = i_accessible
         self._i_object_id = i_object_id
         self._cached_children = set()
+        self._identity = None
+        self._path = path
+        # Raw and normalized name.
+        self._name = None
+
+    @staticmethod
+    @primitive('oleacc.AccessibleObjectFromWindow')
+    def _accessible_object_from_window(hwnd):
+        """
+        Gets IAccessible of window.
+
+        Arguments:
+            - hwnd: int, window handle.
+
+        Returns:
+            - instance of i_accessible.
+        """
+
+        i_accessible = ctypes.POINTER(comtypes.gen.Accessibility.IAccessible)()
+        ctypes.oledll.oleacc.AccessibleObjectFromWindow(
+            hwnd,
+            0,
+            ctypes.byref(comtypes.gen.Accessibility.IAccessible._iid_),
+            ctypes.byref(i_accessible))
+
+        return i_accessible
 
     def _check_state(self, state):
         """
@@ -203,6 +221,7 @@ class WinElement(IElement):
 
         return bool(self._acc_state & state)
 
+    @primitive('user32.EnumWindows')
     def _find_windows_by_same_proc(self):
         """
         Find window by same process id.
@@ -214,23 +233,35 @@ class WinElement(IElement):
             - list of windows.
         """
 
+        # Handles are collected by this call only, so concurrent calls
+        # don't overwrite results of each other.
+        same_proc_handles = set()
+
+        def callback(handle, proc_id):
+            curr_proc_id = ctypes.c_long()
+
+            ctypes.windll.user32.GetWindowThreadProcessId(
+                handle, ctypes.byref(curr_proc_id))
+
+            if curr_proc_id.value == proc_id:
+                same_proc_handles.add(handle)
+
+            return True
+
         enum_windows_proc = \
             ctypes.WINFUNCTYPE(ctypes.c_bool, ctypes.c_long,
                                ctypes.c_long)
-        self._EnumWindowsCallback.same_proc_handles = set()
-        ctypes.windll.user32.EnumWindows(
-            enum_windows_proc(
-                self._EnumWindowsCallback.callback), self.proc_id)
+        ctypes.windll.user32.EnumWindows(enum_windows_proc(callback),
+                                         self.proc_id)
 
-        if self._hwnd in self._EnumWindowsCallback.same_proc_handles:
-            self._EnumWindowsCallback.same_proc_handles.remove(self._hwnd)
+        same_proc_handles.discard(self._hwnd)
 
-        result = [WinElement(hwnd, 0) for hwnd in
-                  self._EnumWindowsCallback.same_proc_handles]
+        result = [WinElement(hwnd, 0) for hwnd in same_proc_handles]
 
         return result
 
     @property
+    @primitive('oleacc.WindowFromAccessibleObject')
     def _hwnd(self):
         """
         Property for window handler.
@@ -243,6 +274,8 @@ class WinElement(IElement):
         return hwnd.value
 
     @property
+    @primitive('com.accRole')
+    @retried('com', target=WinUtils.get_element_proc_id)
     def _role(self):
         """
         Property for element role.
@@ -259,12 +292,14 @@ class WinElement(IElement):
 
         return obj_role.value
 
+    @primitive('com.accSelect')
     def _select(self, i_selection):
         if self._i_object_id:
             return self._i_accessible.accSelect(i_selection, self._i_object_id)
         else:
             return self._i_accessible.accSelect(i_selection)
 
+    @traced('element.click')
     def click(self, x_offset=0, y_offset=0):
         x, y, w, h = self.acc_location
         x += x_offset if x_offset is not None else w / 2
@@ -272,6 +307,7 @@ class WinElement(IElement):
 
         self._mouse.click(x, y)
 
+    @traced('element.right_click')
     def right_click(self, x_offset=0, y_offset=0):
         x, y, w, h = self.acc_location
         x += x_offset if x_offset is not None else w / 2
@@ -279,6 +315,7 @@ class WinElement(IElement):
 
         self._mouse.click(x, y, self._mouse.RIGHT_BUTTON)
 
+    @traced('element.double_click')
     def double_click(self, x_offset=0, y_offset=0, click_interval=0.5):
         x, y, w, h = self.acc_location
         x += x_offset if x_offset is not None else w / 2
@@ -286,6 +323,7 @@ class WinElement(IElement):
 
         self._mouse.double_click(x, y, click_interval=click_interval)
 
+    @traced('element.drag_to')
     def drag_to(self, x, y, x_offset=None, y_offset=None, smooth=True):
         el_x, el_y, el_w, el_h = self.acc_location
         el_x += x_offset if x_offset is not None else el_w / 2
@@ -294,6 +332,7 @@ class WinElement(IElement):
         self._mouse.drag(el_x, el_y, x, y, smooth)
 
     @property
+    @primitive('user32.GetWindowThreadProcessId')
     def proc_id(self):
         hwnd = ctypes.c_long(self._hwnd)
         proc_id = ctypes.c_ulong()
@@ -342,6 +381,12 @@ class WinElement(IElement):
 
     @property
     def acc_name(self):
+        return self._normalized_name
+
+    @property
+    @primitive('com.accName')
+    @retried('com', target=WinUtils.get_element_proc_id)
+    def acc_raw_name(self):
         obj_child_id = comtypes.automation.VARIANT()
         obj_child_id.vt = comtypes.automation.VT_I4
         obj_child_id.value = self._i_object_id
@@ -350,18 +395,20 @@ class WinElement(IElement):
 
         self._i_accessible._IAccessible__com__get_accName(
             obj_child_id, ctypes.byref(obj_name))
-        result = obj_name.value or ''
-
-        return WinUtils.replace_inappropriate_symbols(result)
+        return obj_name.value or ''
 
+    @traced('element.set_focus')
     def set_focus(self):
         self._select(self._SelectionFlag.TAKEFOCUS)
 
     @property
     def acc_c_name(self):
-        return self.acc_role_name + self.acc_name if self.acc_name else ''
+        name = self.acc_name
+        return self.acc_role_name + name if name else ''
 
     @property
+    @primitive('com.accLocation')
+    @retried('com', target=WinUtils.get_element_proc_id)
     def acc_location(self):
         obj_child_id = comtypes.automation.VARIANT()
         obj_child_id.vt = comtypes.automation.VT_I4
@@ -379,6 +426,8 @@ class WinElement(IElement):
         return obj_l.value, obj_t.value, obj_w.value, obj_h.value
 
     @property
+    @primitive('com.accValue')
+    @retried('com', target=WinUtils.get_element_proc_id)
     def acc_value(self):
         obj_child_id = comtypes.automation.VARIANT()
         obj_child_id.vt = comtypes.automation.VT_I4
@@ -389,6 +438,8 @@ class WinElement(IElement):
 
         return obj_bstr_value.value
 
+    @traced('element.set_value')
+    @primitive('com.accValue.set')
     def set_value(self, value):
         obj_child_id = comtypes.automation.VARIANT()
         obj_child_id.vt = comtypes.automation.VT_I4
@@ -397,6 +448,8 @@ class WinElement(IElement):
         self._i_accessible._IAccessible__com__set_accValue(obj_child_id, value)
 
     @property
+    @primitive('com.accDescription')
+    @retried('com', target=WinUtils.get_element_proc_id)
     def acc_description(self):
         obj_child_id = comtypes.automation.VARIANT()
         obj_child_id.vt = comtypes.automation.VT_I4
@@ -408,15 +461,25 @@ class WinElement(IElement):
         return obj_description.value
 
     @property
+    @primitive('com.accParent')
+    @retried('com', target=WinUtils.get_element_proc_id)
     def acc_parent(self):
         result = None
         if self._i_accessible.accParent:
-            result = \
-                WinElement(self._i_accessible.accParent, self._i_object_id)
+            path = None
+            if not self._i_object_id and self._identity is not None and \
+                    self._identity[3]:
+                # Parent is in the same window one level up.
+                hwnd, _, anchor, indexes = self._identity
+                path = hwnd, anchor, indexes[:-1]
+            result = ElementPool.intern(
+                WinElement(self._i_accessible.accParent, self._i_object_id,
+                           path))
 
         return result
 
     @property
+    @primitive('com.accSelection')
     def acc_selection(self):
         obj_children = comtypes.automation.VARIANT()
         self._i_accessible._IAccessible__com__get_accSelection(
@@ -425,6 +488,8 @@ class WinElement(IElement):
         return obj_children.value
 
     @property
+    @primitive('com.accState')
+    @retried('com', target=WinUtils.get_element_proc_id)
     def _acc_state(self):
         obj_child_id = comtypes.automation.VARIANT()
         obj_child_id.vt = comtypes.automation.VT_I4
@@ -436,10 +501,13 @@ class WinElement(IElement):
         return obj_state.value
 
     @property
+    @primitive('com.accFocus')
     def acc_focused_element(self):
         result = None
         if self._i_accessible.accFocus:
-            result = WinElement(self._i_accessible.accFocus, self._i_object_id)
+            # Not pooled for the same reason as object got by point.
+            result = WinElement(self._i_accessible.accFocus,
+                                self._i_object_id)
 
         return result
 
@@ -447,9 +515,18 @@ class WinElement(IElement):
     def acc_role_name(self):
         return self._acc_role_name_map.get(self._role, 'unknown')
 
-    def __iter__(self):
-        if self._i_object_id > 0:
-            raise StopIteration()
+    @primitive('oleacc.AccessibleChildren')
+    @retried('com', target=WinUtils.get_element_proc_id)
+    def _get_children(self):
+        """
+        Gets children of element.
+
+        Arguments:
+            - None
+
+        Returns:
+            - list of VARIANT with child IDispatch or child id.
+        """
 
         obj_acc_child_array = (comtypes.automation.VARIANT *
                                self._i_accessible.accChildCount)()
@@ -462,13 +539,26 @@ class WinElement(IElement):
             obj_acc_child_array,
             ctypes.byref(obj_acc_child_count))
 
-        for i in xrange(obj_acc_child_count.value):
-            obj_acc_child = obj_acc_child_array[i]
+        return obj_acc_child_array[:obj_acc_child_count.value]
+
+    def __iter__(self):
+        if self._i_object_id > 0:
+            raise StopIteration()
+
+        hwnd, _, anchor, path = self.identity
+        for index, obj_acc_child in enumerate(self._get_children()):
             if obj_acc_child.vt == comtypes.automation.VT_DISPATCH:
-                yield WinElement(obj_acc_child.value.QueryInterface(
-                    comtypes.gen.Accessibility.IAccessible), 0)
+                yield ElementPool.intern(WinElement(
+                    obj_acc_child.value.QueryInterface(
+                        comtypes.gen.Accessibility.IAccessible), 0,
+                    (hwnd, anchor, path + (index,))))
             else:
-                yield WinElement(self._i_accessible, obj_acc_child.value)
+                # Simple child shares object and window of this element.
+                obj_element = WinElement(self._i_accessible,
+                                         obj_acc_child.value)
+                obj_element._identity = \
+                    hwnd, obj_acc_child.value, anchor, path
+                yield ElementPool.intern(obj_element)
 
     def __findcacheiter(self, only_visible, **kwargs):
         """
@@ -481,8 +571,10 @@ class WinElement(IElement):
             - Yield found element.
         """
 
-        for obj_element in self._cached_children:
-            if obj_element._match(only_visible, **kwargs):
+        kwargs = TextNormalizer.normalize_criteria(kwargs)
+        # Cache is copied, search that runs meanwhile adds elements to it.
+        for obj_element in tuple(self._cached_children):
+            if obj_element._match_criteria(only_visible, kwargs):
                 yield obj_element
 
     def _finditer(self, only_visible, **kwargs):
@@ -496,37 +588,65 @@ class WinElement(IElement):
             - Yield found element.
         """
 
-        lst_queue = list(self)
+        return self._search_iter(only_visible, kwargs)
+
+    def _search_iter(self, only_visible, kwargs, diagnostics=None):
+        """
+        Walks subtree and yields matched elements.
+
+        Arguments:
+            - only_visible: bool, flag that indicates will we search only
+            through visible elements.
+            - kwargs: dict of search criteria.
+            - diagnostics: SearchDiagnostics instance or None.
+
+        Returns:
+            - Yield found element.
+        """
+
+        # Criteria are normalized once per search.
+        kwargs = TextNormalizer.normalize_criteria(kwargs)
+        lst_queue = [(el, 1) for el in self]
 
         if self.is_top_level_window:
-            lst_queue.extend(self._find_windows_by_same_proc())
+            lst_queue.extend((el, 1) for el in
+                             self._find_windows_by_same_proc())
 
         while lst_queue:
-            obj_element = lst_queue.pop(0)
+            obj_element, depth = lst_queue.pop(0)
             self._cached_children.add(obj_element)
+            if diagnostics is not None:
+                diagnostics.visit(depth)
+            if Tracer.enabled:
+                Tracer.count('nodes_visited')
 
-            if obj_element._match(only_visible, **kwargs):
+            if obj_element._match_criteria(only_visible, kwargs,
+                                           diagnostics):
                 yield obj_element
 
             if obj_element.acc_child_count:
-                childs = [el for el in list(obj_element) if
+                childs = [(el, depth + 1) for el in list(obj_element) if
                           el._i_accessible != obj_element._i_accessible]
                 lst_queue[:0] = childs
 
+    @traced('element.find')
     def find(self, only_visible=True, **kwargs):
         try:
             return self.__findcacheiter(only_visible,
                                         **kwargs).next()
         except StopIteration:
+            diagnostics = SearchDiagnostics(kwargs)
             try:
-                return self._finditer(only_visible,
-                                      **kwargs).next()
+                return self._search_iter(only_visible, kwargs,
+                                         diagnostics).next()
             except StopIteration:
+                diagnostics.finish()
                 attrs = ['%s=%s' % (k, v) for k, v in kwargs.iteritems()]
                 raise TooSaltyUISoupException(
                     'Can\'t find object with attributes "%s".' %
-                    '; '.join(attrs))
+                    '; '.join(attrs), diagnostics=diagnostics)
 
+    @traced('element.findall')
     def findall(self, only_visible=True, **kwargs):
         result = self._finditer(only_visible, **kwargs)
         if result:
@@ -541,6 +661,128 @@ class WinElement(IElement):
         except TooSaltyUISoupException:
             return False
 
+    @property
+    def identity(self):
+        # oleacc proxies return new COM object on every call, so object is
+        # identified by its window and child indexes from object of that
+        # window instead of COM pointer. Indexes start from anchor, anchor is
+        # None for object of window and COM identity of this object if its
+        # place among children of parent is ambiguous, such identity is not
+        # equal to identity of any other wrapper.
+        if self._identity is None:
+            hwnd = self._hwnd
+            if self._path is None:
+                anchor, path = self._find_path(hwnd)
+            elif self._path[0] == hwnd:
+                anchor, path = self._path[1:]
+            else:
+                # Child listed by object of other window is object of own
+                # window.
+                anchor, path = None, ()
+            self._identity = hwnd, self._i_object_id, anchor, path
+
+        return self._identity
+
+    @staticmethod
+    @primitive('com.QueryInterface')
+    def _com_identity(i_accessible):
+        """
+        Gets COM identity of object, i.e. address of its IUnknown.
+
+        Arguments:
+            - i_accessible: instance of i_accessible.
+
+        Returns:
+            - int, address.
+        """
+
+        return ctypes.cast(i_accessible.QueryInterface(comtypes.IUnknown),
+                           ctypes.c_void_p).value
+
+    def _find_path(self, hwnd):
+        """
+        Finds child indexes from object of window to object of this element
+        by walking up parents. Object is recognized among children of its
+        parent by COM identity and, if proxy of parent returns new COM
+        objects, by role and location when only one child has them.
+
+        Arguments:
+            - hwnd: int, window handle of element.
+
+        Returns:
+            - tuple (anchor, tuple of child indexes), anchor is None if
+            indexes start from object of window otherwise it is COM
+            identity of this element.
+        """
+
+        indexes = []
+        obj_element = WinElement(self._i_accessible, 0, ())
+        while True:
+            i_parent = obj_element._i_accessible.accParent
+            if not i_parent:
+                break
+            obj_parent = WinElement(i_parent.QueryInterface(
+                comtypes.gen.Accessibility.IAccessible), 0, ())
+            if obj_parent._hwnd != hwnd:
+                break
+
+            index = obj_parent._child_index(obj_element)
+            if index is None:
+                return self._com_identity(self._i_accessible), ()
+            indexes.append(index)
+            obj_element = obj_parent
+
+        return None, tuple(reversed(indexes))
+
+    def _child_index(self, obj_element):
+        """
+        Finds index of element among children of this element.
+
+        Arguments:
+            - obj_element: WinElement instance.
+
+        Returns:
+            - int, index or None if it is not found or several children
+            could be the element.
+        """
+
+        com_identity = self._com_identity(obj_element._i_accessible)
+        candidates = []
+        for index, obj_acc_child in enumerate(self._get_children()):
+            if obj_acc_child.vt != comtypes.automation.VT_DISPATCH:
+                continue
+            i_child = obj_acc_child.value.QueryInterface(
+                comtypes.gen.Accessibility.IAccessible)
+            if self._com_identity(i_child) == com_identity:
+                return index
+            candidates.append((index, i_child))
+
+        key = obj_element._role, obj_element.acc_location
+        matched = []
+        for index, i_child in candidates:
+            obj_child = WinElement(i_child, 0, ())
+            if (obj_child._role, obj_child.acc_location) == key:
+                matched.append(index)
+
+        return matched[0] if len(matched) == 1 else None
+
+    def _refresh(self, element):
+        # Previous COM pointer could belong to removed object.
+        self._i_accessible = element._i_accessible
+        self._cached_children = set()
+
+    def is_alive(self):
+        try:
+            hwnd = self.identity[0]
+            if hwnd and not ctypes.windll.user32.IsWindow(hwnd):
+                return False
+            self._acc_state
+        except Exception:
+            return False
+
+        return True
+
+    @primitive('com.accChildCount')
     def _get_child_count_safely(self, i_accessible):
         """
         Safely gets child count.
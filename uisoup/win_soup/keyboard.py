@@ -17,9 +17,12 @@
 __author__ = 'f1ashhimself@gmail.com'
 
 import ctypes
-from time import sleep
 
 from ..interfaces.i_keyboard import Key, IKeyboard
+from ..utils.timeline import Timeline
+from ..utils.instrumentation import Instrumentation, primitive
+from ..utils.tracing import traced
+from .mouse import WinMouse
 
 send_input = ctypes.windll.user32.SendInput
 pointer_unsigned_long = ctypes.POINTER(ctypes.c_ulong)
@@ -74,6 +77,7 @@ class Input(ctypes.Structure):
                 ("ii", EventStorage)]
 
 
+@Instrumentation.register
 class WinKeyboard(IKeyboard):
 
     class _KeyCodes(object):
@@ -189,6 +193,7 @@ class WinKeyboard(IKeyboard):
         OEM_7 = Key(0xDE)  # For the US standard keyboard, the ''/"' key
 
     codes = _KeyCodes
+    _state = WinMouse._state
 
     def press_key(self, hex_key_code):
         """Presses (and releases) key specified by a hex code.
@@ -203,6 +208,7 @@ class WinKeyboard(IKeyboard):
         self.press_key_and_hold(hex_key_code)
         self.release_key(hex_key_code)
 
+    @primitive('user32.SendInput')
     def press_key_and_hold(self, hex_key_code):
         """Presses (and holds) key specified by a hex code.
 
@@ -218,7 +224,9 @@ class WinKeyboard(IKeyboard):
         ii_.ki = KeyboardInput(hex_key_code, 0x48, 0, 0, ctypes.pointer(extra))
         x = Input(ctypes.c_ulong(1), ii_)
         send_input(1, ctypes.pointer(x), ctypes.sizeof(x))
+        self._state.press_key(hex_key_code)
 
+    @primitive('user32.SendInput')
     def release_key(self, hex_key_code):
         """Releases key specified by a hex code.
 
@@ -235,7 +243,9 @@ class WinKeyboard(IKeyboard):
             hex_key_code, 0x48, 0x0002, 0, ctypes.pointer(extra))
         x = Input(ctypes.c_ulong(1), ii_)
         send_input(1, ctypes.pointer(x), ctypes.sizeof(x))
+        self._state.release_key(hex_key_code)
 
+    @traced('keyboard.send')
     def send(self, *args, **kwargs):
         """Send key events as specified by Keys.
 
@@ -248,19 +258,13 @@ class WinKeyboard(IKeyboard):
             - None
         """
 
-        delay = kwargs.get('delay', 0)
-
-        for key in args:
-            if key.children:
-                self.press_key_and_hold(key.code)
-                self.send(*key.children)
-                self.release_key(key.code)
-            else:
-                self.press_key(key.code)
-            self._wait_for_key_combo_to_be_processed()
-            sleep(delay)
-
-    def _wait_for_key_combo_to_be_processed(self):
-        # For key combinations timeout is needed to be processed.
-        # This method is expressive shortcut to be used where needed.
-        sleep(.05)
+        held_keys = self._state.held_keys
+        timeline = Timeline('send')
+        self._compile_keys(timeline, args, kwargs.get('delay', 0))
+        try:
+            timeline.dispatch()
+        finally:
+            # Modifiers pressed by this sequence should not stay stuck if
+            # dispatching was interrupted.
+            self.release_held_keys([code for code in self._state.held_keys
+                                    if code not in held_keys])
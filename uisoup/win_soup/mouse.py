@@ -18,12 +18,16 @@ __author__ = 'f1ashhimself@gmail.com'
 
 import ctypes
 import ctypes.wintypes
-from time import sleep
 
 from ..interfaces.i_mouse import IMouse
 from ..utils.win_utils import WinUtils
+from ..utils.timeline import Timeline
+from ..utils.input_state import InputState
+from ..utils.instrumentation import Instrumentation, primitive
+from ..utils.tracing import traced
 
 
+@Instrumentation.register
 class WinMouse(IMouse):
     _MOUSEEVENTF_MOVE = 0x0001  # mouse move
     _MOUSEEVENTF_LEFTDOWN = 0x0002  # left button down
@@ -45,6 +49,9 @@ class WinMouse(IMouse):
     RIGHT_BUTTON = u'b3c'
     _SUPPORTED_BUTTON_NAMES = [LEFT_BUTTON, RIGHT_BUTTON]
 
+    # Shared by all mouse and keyboard instances as there is only one cursor.
+    _state = InputState()
+
     def _compose_mouse_event(self, name, press=True, release=False):
         """
         Composes mouse event based on button name and action flags.
@@ -75,6 +82,7 @@ class WinMouse(IMouse):
 
         return mouse_event
 
+    @primitive('user32.mouse_event')
     def _do_event(self, flags, x, y, data, extra_info):
         """
         Generates mouse event fo a special coordinate.
@@ -126,23 +134,32 @@ class WinMouse(IMouse):
         ctypes.windll.user32.mouse_event(
             flags, x_calc, y_calc, data, extra_info)
 
+    @traced('mouse.move')
     def move(self, x, y, smooth=False):
         WinUtils.verify_xy_coordinates(x, y)
 
+        if self._state.is_at(x, y, self.get_position):
+            return
+
         if smooth:
-            curr_x, curr_y = self.get_position()
+            curr_x, curr_y = self._state.get_position(self.get_position)
             delta_x = (x - curr_x) / 100.0
             delta_y = (y - curr_y) / 100.0
+            timeline = Timeline('move')
             for i in xrange(100):
-                sleep(.01)
+                timeline.wait(.01)
                 curr_x += delta_x
                 curr_y += delta_y
-                self._do_event(self._MOUSEEVENTF_MOVE + self._MOUSEEVENTF_ABSOLUTE,
-                               int(curr_x), int(curr_y), 0, 0)
+                timeline.add(self._do_event,
+                             self._MOUSEEVENTF_MOVE + self._MOUSEEVENTF_ABSOLUTE,
+                             int(curr_x), int(curr_y), 0, 0, coalesce='move')
+            timeline.dispatch()
         else:
             self._do_event(self._MOUSEEVENTF_MOVE + self._MOUSEEVENTF_ABSOLUTE,
                            int(x), int(y), 0, 0)
+        self._state.set_position(x, y)
 
+    @traced('mouse.drag')
     def drag(self, x1, y1, x2, y2, smooth=True):
         WinUtils.verify_xy_coordinates(x1, y1)
         WinUtils.verify_xy_coordinates(x2, y2)
@@ -160,15 +177,18 @@ class WinMouse(IMouse):
         self._do_event(
             self._compose_mouse_event(button_name, press=True, release=False),
             0, 0, 0, 0)
+        self._state.press_button(button_name)
 
     def release_button(self, button_name=LEFT_BUTTON):
         WinUtils.verify_mouse_button_name(button_name,
                                           self._SUPPORTED_BUTTON_NAMES)
-        curr_x, curr_y = self.get_position()
+        curr_x, curr_y = self._state.get_position(self.get_position)
         self._do_event(
             self._compose_mouse_event(button_name, press=False, release=True),
             curr_x, curr_y, 0, 0)
+        self._state.release_button(button_name)
 
+    @traced('mouse.click')
     def click(self, x, y, button_name=LEFT_BUTTON):
         WinUtils.verify_xy_coordinates(x, y)
         WinUtils.verify_mouse_button_name(button_name,
@@ -179,21 +199,23 @@ class WinMouse(IMouse):
             self._compose_mouse_event(button_name, press=True, release=True),
             0, 0, 0, 0)
 
+    @traced('mouse.double_click')
     def double_click(self, x, y, button_name=LEFT_BUTTON, click_interval=0.5):
         WinUtils.verify_xy_coordinates(x, y)
         WinUtils.verify_mouse_button_name(button_name,
                                           self._SUPPORTED_BUTTON_NAMES)
 
         self.move(x, y)
-        self._do_event(
-            self._compose_mouse_event(button_name, press=True, release=True),
-            0, 0, 0, 0)
+        mouse_event = \
+            self._compose_mouse_event(button_name, press=True, release=True)
+        timeline = Timeline('double_click')
+        timeline.add(self._do_event, mouse_event, 0, 0, 0, 0)
         # https://msdn.microsoft.com/en-us/library/windows/desktop/ms646263%28v=vs.85%29.aspx
-        sleep(click_interval)
-        self._do_event(
-            self._compose_mouse_event(button_name, press=True, release=True),
-            0, 0, 0, 0)
+        timeline.wait(click_interval)
+        timeline.add(self._do_event, mouse_event, 0, 0, 0, 0)
+        timeline.dispatch()
 
+    @primitive('user32.GetCursorPos')
     def get_position(self):
         obj_point = ctypes.wintypes.POINT()
         ctypes.windll.user32.GetCursorPos(ctypes.byref(obj_point))
@@ -17,15 +17,19 @@
 
 __author__ = 'f1ashhimself@gmail.com'
 
-import re
 import ctypes
 import ctypes.wintypes
 import comtypes
 import comtypes.automation
 import comtypes.client
 import sys
+import threading
 
 from ..utils.win_utils import WinUtils
+from ..utils.glob_matcher import GlobMatcher
+from ..utils.instrumentation import Instrumentation, primitive
+from ..utils.tracing import traced
+from ..utils.element_pool import ElementPool
 from .. import TooSaltyUISoupException
 from ..interfaces.i_soup import ISoup
 from .element import WinElement
@@ -35,31 +39,22 @@ from .keyboard import WinKeyboard
 comtypes.client.GetModule('oleacc.dll')
 
 
+@Instrumentation.register
 class WinSoup(ISoup):
 
     mouse = WinMouse()
     keyboard = WinKeyboard()
     _default_sys_encoding = sys.stdout.encoding or sys.getdefaultencoding()
+    _thread_state = threading.local()
 
-    class _EnumWindowsCallback(object):
-
-        last_handle = None
-
-        @classmethod
-        def callback(cls, handle, wildcard):
-            wildcard = ctypes.cast(wildcard, ctypes.c_wchar_p).value
-
-            wildcard = WinUtils.replace_inappropriate_symbols(wildcard)
-            length = ctypes.windll.user32.GetWindowTextLengthW(handle) + 1
-            buff = ctypes.create_unicode_buffer(length)
-            ctypes.windll.user32.GetWindowTextW(handle, buff, length)
-            win_text = WinUtils.replace_inappropriate_symbols(buff.value)
-
-            if re.match(wildcard, win_text):
-                cls.last_handle = handle
-
-            return True
+    def init_thread(self):
+        # COM is initialized once per thread, main thread is initialized by
+        # comtypes on import.
+        if not getattr(self._thread_state, 'com_initialized', False):
+            comtypes.CoInitialize()
+            self._thread_state.com_initialized = True
 
+    @primitive('oleacc.AccessibleObjectFromPoint')
     def get_object_by_coordinates(self, x, y):
         obj_point = ctypes.wintypes.POINT()
         obj_point.x = x
@@ -71,6 +66,8 @@ class WinSoup(ISoup):
             ctypes.byref(i_accessible),
             ctypes.byref(obj_child_id))
 
+        # Wrapper is not pooled, pooling needs identity and identity of
+        # object got by point is found by walking its parents.
         return WinElement(i_accessible, obj_child_id.value or 0)
 
     def is_window_exists(self, obj_handle):
@@ -80,23 +77,50 @@ class WinSoup(ISoup):
         except TooSaltyUISoupException:
             return False
 
+    @primitive('user32.EnumWindows')
+    def _find_window_handle(self, wildcard):
+        """
+        Finds handle of last top level window which title matches wildcard.
+
+        Arguments:
+            - wildcard: string, window title wildcard.
+
+        Returns:
+            - int, window handle or None.
+        """
+
+        matcher = GlobMatcher.get(
+            WinUtils.replace_inappropriate_symbols(wildcard))
+        # Handles are collected by this call only, so concurrent lookups
+        # don't overwrite results of each other.
+        handles = []
+
+        def callback(handle, _):
+            length = ctypes.windll.user32.GetWindowTextLengthW(handle) + 1
+            buff = ctypes.create_unicode_buffer(length)
+            ctypes.windll.user32.GetWindowTextW(handle, buff, length)
+            win_text = WinUtils.replace_inappropriate_symbols(buff.value)
+
+            if matcher.match(win_text):
+                handles.append(handle)
+
+            return True
+
+        enum_windows_proc = \
+            ctypes.WINFUNCTYPE(ctypes.c_bool, ctypes.POINTER(ctypes.c_int),
+                               ctypes.POINTER(ctypes.c_int))
+        ctypes.windll.user32.EnumWindows(enum_windows_proc(callback), 0)
+
+        return handles[-1] if handles else None
+
+    @traced('soup.get_window')
     def get_window(self, obj_handle=None):
         if obj_handle in (0, None):
             obj_handle = ctypes.windll.user32.GetDesktopWindow()
         elif isinstance(obj_handle, basestring):
             obj_name = unicode(obj_handle)
 
-            regex = WinUtils.convert_wildcard_to_regex(obj_name)
-
-            enum_windows_proc = \
-                ctypes.WINFUNCTYPE(ctypes.c_bool, ctypes.POINTER(ctypes.c_int),
-                                   ctypes.POINTER(ctypes.c_int))
-            self._EnumWindowsCallback.last_handle = None
-            ctypes.windll.user32.EnumWindows(enum_windows_proc(
-                self._EnumWindowsCallback.callback),
-                ctypes.c_wchar_p(regex))
-
-            obj_handle = self._EnumWindowsCallback.last_handle
+            obj_handle = self._find_window_handle(obj_name)
 
             if not obj_handle:
                 obj_name = obj_name.encode(self._default_sys_encoding,
@@ -105,7 +129,7 @@ class WinSoup(ISoup):
                                               obj_name)
 
         try:
-            return WinElement(obj_handle, 0)
+            return ElementPool.intern(WinElement(obj_handle, 0))
         except:
             raise TooSaltyUISoupException(
                 'Error when retrieving window with handle=%r' % obj_handle)